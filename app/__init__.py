@@ -0,0 +1,5 @@
+# Settings are read from the environment at import time throughout the package,
+# so a local .env file is loaded before any submodule runs
+from dotenv import load_dotenv
+
+load_dotenv()
@@ -1,21 +1,25 @@
 """Authentication utilities for password hashing and JWT tokens."""
 
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, object_session
+import hashlib
+import json
 import os
+import time
+import uuid
 
-from app.db import get_db
+from app.cache import MemoryCache, create_cache
+from app.db import get_read_db
+from app.hashing import hash_password, verify_password, verify_password_async
 from app.models import User
 
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # OAuth2 scheme for token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -24,15 +28,60 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production"
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+# Authenticated-user cache settings. "memory" caches per worker process; "redis"
+# shares entries (and invalidations) between workers.
+USER_CACHE_BACKEND = os.getenv("USER_CACHE_BACKEND", "memory")
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
+user_cache = create_cache(USER_CACHE_BACKEND, maxsize=USER_CACHE_SIZE, prefix="user:")
+
+# Verified token claims, per worker. A token is presented on every request for
+# its whole lifetime, so its signature is only checked the first time; entries
+# expire with the token. TOKEN_CACHE_SIZE=0 turns the cache off.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+token_cache = MemoryCache(maxsize=TOKEN_CACHE_SIZE)
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """The authenticated user as seen by request handlers, detached from any session."""
+    id: uuid.UUID
+    username: str
+    email: str
+    is_active: bool
+    created_at: datetime
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserPrincipal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            is_active=user.is_active,
+            created_at=user.created_at,
+        )
 
-def hash_password(password: str) -> str:
-    """Hash a password using bcrypt."""
-    return pwd_context.hash(password)
-
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    def to_json(self) -> bytes:
+        return json.dumps({
+            "id": str(self.id),
+            "username": self.username,
+            "email": self.email,
+            "is_active": self.is_active,
+            "created_at": self.created_at.isoformat(),
+        }).encode()
+
+    @classmethod
+    def from_json(cls, raw: bytes) -> "UserPrincipal":
+        data = json.loads(raw)
+        return cls(
+            id=uuid.UUID(data["id"]),
+            username=data["username"],
+            email=data["email"],
+            is_active=data["is_active"],
+            created_at=datetime.fromisoformat(data["created_at"]),
+        )
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -47,11 +96,28 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+def decode_access_token(token: str) -> dict:
+    """
+    Verify and decode a JWT, raising JWTError if it is invalid or expired.
+
+    Claims of valid tokens with an expiry are cached until that expiry, keyed by
+    a digest of the token, so later calls skip the signature check.
+    """
+    key = hashlib.sha256(token.encode()).hexdigest()
+    claims = token_cache.get_nowait(key)
+    if claims is not None:
+        return claims
+    claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    expires_at = claims.get("exp")
+    if isinstance(expires_at, (int, float)) and expires_at > time.time():
+        token_cache.set_nowait(key, claims, expires_at - time.time())
+    return claims
+
+
 def verify_token(token: str) -> dict:
     """Verify and decode a JWT token."""
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        return decode_access_token(token)
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -60,10 +126,38 @@ def verify_token(token: str) -> dict:
         )
 
 
+async def invalidate_user(username: str) -> None:
+    """Drop a user from the authenticated-user cache."""
+    await user_cache.delete(username)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _queue_user_invalidation(mapper, connection, target):
+    """Remember changed users so their cache entries are dropped once the change commits."""
+    usernames = {target.username}
+    usernames.update(inspect(target).attrs.username.history.deleted or ())
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("invalidated_users", set()).update(usernames)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    usernames = session.info.pop("invalidated_users", None)
+    if usernames:
+        user_cache.delete_nowait(*usernames)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_rolled_back_users(session, previous_transaction):
+    session.info.pop("invalidated_users", None)
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db)
-) -> User:
+    db: AsyncSession = Depends(get_read_db)
+) -> UserPrincipal:
     """Get the current authenticated user from the token."""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -72,19 +166,26 @@ async def get_current_user(
     )
     
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
-    # Get user from database
-    result = await db.execute(select(User).where(User.username == username))
-    user = result.scalar_one_or_none()
-    
-    if user is None:
-        raise credentials_exception
+    # Serve the user from cache, falling back to the database on a miss
+    cached = await user_cache.get(username)
+    if cached is not None:
+        user = UserPrincipal.from_json(cached)
+    else:
+        result = await db.execute(select(User).where(User.username == username))
+        db_user = result.scalar_one_or_none()
+        
+        if db_user is None:
+            raise credentials_exception
+        
+        user = UserPrincipal.from_user(db_user)
+        await user_cache.set(username, user.to_json(), USER_CACHE_TTL)
     
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
@@ -92,7 +193,7 @@ async def get_current_user(
     return user
 
 
-async def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_active_user(current_user: UserPrincipal = Depends(get_current_user)) -> UserPrincipal:
     """Get the current active user."""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
@@ -106,6 +207,6 @@ async def authenticate_user(db: AsyncSession, username: str, password: str) -> O
     
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return None
     return user
@@ -0,0 +1,300 @@
+"""Content-addressed, reference-counted upload storage.
+
+Uploads are hashed (SHA-256) as they are read. Posts whose content is already
+stored point at the existing blob instead of uploading it again, and every
+blob counts the posts referencing it so the stored file is only removed when
+the last of them is deleted. Removing that file is a background job, queued
+in the transaction that drops the last reference.
+"""
+
+import asyncio
+import hashlib
+import logging
+import uuid
+from dataclasses import dataclass
+
+from fastapi import UploadFile
+from sqlalchemy import case, delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import db as app_db, jobs
+from app.images import run_in_upload_pool
+from app.models import Blob, Job, PostVariant
+from app.storage import BACKENDS, CHUNK_SIZE, StorageBackend, StoredFile, get_storage
+
+logger = logging.getLogger(__name__)
+
+
+def _hash_blocking(file: UploadFile) -> tuple[str, int]:
+    """Stream the upload through SHA-256, then rewind it (runs in a worker thread)."""
+    hasher = hashlib.sha256()
+    size = 0
+    file.file.seek(0)
+    while chunk := file.file.read(CHUNK_SIZE):
+        hasher.update(chunk)
+        size += len(chunk)
+    file.file.seek(0)
+    return hasher.hexdigest(), size
+
+
+async def hash_upload(file: UploadFile) -> tuple[str, int]:
+    """Return the upload's SHA-256 hex digest and size without blocking the event loop."""
+    return await run_in_upload_pool(_hash_blocking, file)
+
+
+async def _claim(db: AsyncSession, content_hash: str) -> Blob | None:
+    """Take a reference on an existing blob, or return None if there is none."""
+    result = await db.execute(
+        update(Blob)
+        .where(Blob.content_hash == content_hash)
+        .values(ref_count=Blob.ref_count + 1)
+        .returning(Blob)
+        .execution_options(synchronize_session=False)
+    )
+    return result.scalar_one_or_none()
+
+
+async def acquire_blob(db: AsyncSession, file: UploadFile, storage: StorageBackend) -> tuple[Blob, bool]:
+    """
+    Return the blob holding the upload's content, storing it only if it is new.
+
+    The returned blob carries a reference for the caller's new post; the
+    caller commits it. The second value is True if the content was uploaded.
+    """
+    content_hash, size = await hash_upload(file)
+    blob = await _claim(db, content_hash)
+    if blob is not None:
+        return blob, False
+
+    stored = await storage.save(file)
+    blob = Blob(
+        content_hash=content_hash,
+        url=stored.url,
+        file_id=stored.file_id,
+        backend=storage.name,
+        size=size,
+        ref_count=1,
+    )
+    try:
+        # In a savepoint, so losing the race below keeps the rest of the caller's transaction
+        async with db.begin_nested():
+            db.add(blob)
+    except IntegrityError:
+        # A concurrent upload of the same content registered it first; use theirs
+        blob = await _claim(db, content_hash)
+        if blob is None:
+            raise
+        if stored.file_id != blob.file_id:
+            await _delete_files(storage.name, [stored.file_id])
+        return blob, False
+    return blob, True
+
+
+@dataclass
+class _PendingBlob:
+    """New content in a batch: the stored file and how many of the batch's posts use it."""
+    stored: StoredFile
+    size: int
+    refs: int = 0
+
+
+def _upsert(dialect_name: str):
+    """Return the dialect's INSERT construct, which supports ON CONFLICT."""
+    return (postgresql if dialect_name == "postgresql" else sqlite).insert(Blob)
+
+
+async def acquire_blobs(
+    db: AsyncSession,
+    files: list[UploadFile],
+    storage: StorageBackend,
+    concurrency: int,
+) -> list[Blob | Exception]:
+    """
+    Batch version of ``acquire_blob``: one result per file, in order.
+
+    Files are hashed and new content is stored concurrently, at most
+    ``concurrency`` at a time; the session is only used between those phases.
+    All references are then taken in a single INSERT ... ON CONFLICT statement.
+    A file whose hashing or storing failed gets its exception instead of a blob.
+    """
+    slots = asyncio.Semaphore(concurrency)
+
+    async def limited(coro):
+        async with slots:
+            return await coro
+
+    hashed = await asyncio.gather(*(limited(hash_upload(file)) for file in files), return_exceptions=True)
+
+    digests = {result[0] for result in hashed if not isinstance(result, BaseException)}
+    existing = set((await db.execute(
+        select(Blob.content_hash).where(Blob.content_hash.in_(digests))
+    )).scalars()) if digests else set()
+
+    # Store each new piece of content once, from the first file that has it
+    first_with = {}
+    for file, result in zip(files, hashed):
+        if not isinstance(result, BaseException) and result[0] not in existing:
+            first_with.setdefault(result[0], (file, result[1]))
+    stored = await asyncio.gather(
+        *(limited(storage.save(file)) for file, _ in first_with.values()), return_exceptions=True
+    )
+    outcomes: dict[str, _PendingBlob | Exception | None] = {digest: None for digest in existing}
+    for (digest, (_, size)), result in zip(first_with.items(), stored):
+        outcomes[digest] = result if isinstance(result, BaseException) else _PendingBlob(result, size)
+
+    refs: dict[str, int] = {}
+    for result in hashed:
+        if not isinstance(result, BaseException) and not isinstance(outcomes[result[0]], BaseException):
+            refs[result[0]] = refs.get(result[0], 0) + 1
+    if refs:
+        stmt = _upsert(db.bind.dialect.name)
+        rows = []
+        for digest, count in refs.items():
+            pending = outcomes[digest]
+            rows.append({
+                "content_hash": digest,
+                # Rows for content that already exists only carry the reference count
+                "url": pending.stored.url if pending else "",
+                "file_id": pending.stored.file_id if pending else "",
+                "backend": storage.name,
+                "size": pending.size if pending else 0,
+                "ref_count": count,
+            })
+        stmt = stmt.values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Blob.content_hash],
+            set_={"ref_count": Blob.ref_count + stmt.excluded.ref_count},
+        ).returning(Blob)
+        blobs = {blob.content_hash: blob for blob in (await db.execute(stmt)).scalars()}
+        vanished = [digest for digest, blob in blobs.items() if not blob.url]
+        if vanished:
+            # Content that was deleted between the lookup and the insert; undo the placeholder rows
+            await db.execute(delete(Blob).where(Blob.content_hash.in_(vanished)))
+            for digest in vanished:
+                del blobs[digest]
+                outcomes[digest] = RuntimeError("Stored content was deleted concurrently; retry the upload")
+    else:
+        blobs = {}
+
+    # Content a concurrent request registered between our lookup and insert was stored twice
+    for digest, pending in outcomes.items():
+        if isinstance(pending, _PendingBlob) and digest in blobs and blobs[digest].file_id != pending.stored.file_id:
+            await _delete_files(storage.name, [pending.stored.file_id])
+
+    results = []
+    for result in hashed:
+        if isinstance(result, BaseException):
+            results.append(result)
+        elif isinstance(outcomes[result[0]], BaseException):
+            results.append(outcomes[result[0]])
+        else:
+            results.append(blobs[result[0]])
+    return results
+
+
+async def release_blobs(db: AsyncSession, references: dict[str, int]) -> list[Blob]:
+    """
+    Drop references to blobs (content hash -> count), in the caller's transaction.
+
+    Returns the blobs that lost their last reference; their rows are deleted and
+    the caller should pass them to ``enqueue_file_deletions`` in the same transaction.
+    """
+    if not references:
+        return []
+    hashes = list(references)
+    await db.execute(
+        update(Blob)
+        .where(Blob.content_hash.in_(hashes))
+        .values(ref_count=Blob.ref_count - case(references, value=Blob.content_hash))
+        .execution_options(synchronize_session=False)
+    )
+    result = await db.execute(
+        delete(Blob)
+        .where(Blob.content_hash.in_(hashes), Blob.ref_count <= 0)
+        .returning(Blob)
+        .execution_options(synchronize_session=False)
+    )
+    return list(result.scalars())
+
+
+async def release_blob(db: AsyncSession, content_hash: str | None) -> Blob | None:
+    """Drop one post's reference to its blob; see ``release_blobs``."""
+    if content_hash is None:
+        # Posts from before deduplication do not reference a blob
+        return None
+    orphaned = await release_blobs(db, {content_hash: 1})
+    return orphaned[0] if orphaned else None
+
+
+def _storage_for(backend: str) -> StorageBackend:
+    storage = get_storage()
+    return storage if storage.name == backend else BACKENDS[backend]()
+
+
+async def _delete_files(backend: str, file_ids: list[str]) -> None:
+    storage = _storage_for(backend)
+    for file_id in file_ids:
+        try:
+            await storage.delete(file_id)
+        except Exception:
+            # An orphaned file only costs storage; never fail the request over it
+            logger.exception("Could not delete stored file %s from %s", file_id, backend)
+
+
+DELETE_FILES_JOB = "delete_files"
+
+
+async def enqueue_file_deletions(
+    db: AsyncSession, posts: list[tuple[uuid.UUID, str | None, list[str]]], orphaned: list[Blob]
+) -> None:
+    """
+    Queue removal of deleted posts' stored files, in the transaction that deletes them.
+
+    ``posts`` holds (post id, content hash, variant file ids) for each deleted
+    post and ``orphaned`` the blobs that lost their last reference. Every
+    variant file is queued, however many posts still share the blob, since
+    duplicates uploaded before the first post's variants existed get their own.
+    The job skips any file still referenced when it runs. Jobs are keyed by
+    post id, so each post's files are queued once.
+    """
+    orphaned_by_hash = {blob.content_hash: blob for blob in orphaned}
+    # Variants are stored on the same backend as the original they were made from
+    shared_hashes = {content_hash for _, content_hash, file_ids in posts if file_ids} - set(orphaned_by_hash) - {None}
+    backends = dict((await db.execute(
+        select(Blob.content_hash, Blob.backend).where(Blob.content_hash.in_(shared_hashes))
+    )).all()) if shared_hashes else {}
+
+    queued = []
+    for post_id, content_hash, variant_file_ids in posts:
+        blob = orphaned_by_hash.pop(content_hash, None)
+        file_ids = [blob.file_id, *variant_file_ids] if blob is not None else list(variant_file_ids)
+        if file_ids:
+            backend = blob.backend if blob is not None else backends.get(content_hash, get_storage().name)
+            queued.append(({"backend": backend, "file_ids": file_ids}, f"{DELETE_FILES_JOB}:{post_id}"))
+    await jobs.enqueue_many(db, DELETE_FILES_JOB, queued)
+
+
+@jobs.handler(DELETE_FILES_JOB)
+async def delete_files_job(job: Job) -> None:
+    """Remove a deleted post's files from storage, skipping any that are still or again in use."""
+    backend, file_ids = job.payload["backend"], job.payload["file_ids"]
+    # The same content may have been uploaded again since (local storage reuses
+    # content-addressed names), so files referenced again are kept
+    async with app_db.AsyncSessionLocal() as session:
+        in_use = set((await session.execute(
+            select(Blob.file_id).where(Blob.backend == backend, Blob.file_id.in_(file_ids))
+            .union(select(PostVariant.file_id).where(PostVariant.file_id.in_(file_ids)))
+        )).scalars())
+
+    storage = _storage_for(backend)
+    for file_id in file_ids:
+        if file_id not in in_use:
+            # Backends ignore files that are already gone, so a retry can start over
+            await storage.delete(file_id)
+
+
+def stored_file(blob: Blob) -> StoredFile:
+    """Where a blob's content lives, in storage backend terms."""
+    return StoredFile(url=blob.url, file_id=blob.file_id)
@@ -0,0 +1,71 @@
+"""Set-based operations on many posts at once.
+
+Each operation filters on ownership inside the statement itself
+(``WHERE id IN (...) AND user_id = :me``) and uses RETURNING to report which
+posts it touched, so a batch costs one statement per table instead of a
+SELECT, a check and a write per post.
+"""
+
+import os
+import uuid
+from collections import Counter
+from datetime import datetime
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.blobs import release_blobs
+from app.models import Blob, Post, PostVariant
+
+# Most ids accepted by one bulk request
+BULK_MAX_IDS = int(os.getenv("BULK_MAX_IDS", "1000"))
+
+
+async def update_captions(db: AsyncSession, ids: list[uuid.UUID], user_id, caption: str | None) -> list[uuid.UUID]:
+    """Set the caption of the given posts owned by ``user_id``; return the ids updated."""
+    result = await db.execute(
+        update(Post)
+        .where(Post.id.in_(ids), Post.user_id == user_id)
+        # Like every write to a post, bump its revision so its ETag changes
+        .values(caption=caption, revision=Post.revision + 1, updated_at=datetime.utcnow())
+        .returning(Post.id)
+        .execution_options(synchronize_session=False)
+    )
+    return list(result.scalars())
+
+
+async def delete_posts(
+    db: AsyncSession, ids: list[uuid.UUID], user_id
+) -> tuple[list[uuid.UUID], list[tuple[uuid.UUID, str | None, list[str]]], list[Blob]]:
+    """
+    Delete the given posts owned by ``user_id``, with their variants.
+
+    Returns the ids deleted, (id, content hash, variant file ids) for every
+    deleted post, and the blobs that lost their last reference. Pass the last
+    two to ``blobs.enqueue_file_deletions`` before committing.
+    """
+    owned = select(Post.id).where(Post.id.in_(ids), Post.user_id == user_id)
+    # Variants are deleted explicitly since SQLite does not enforce ON DELETE CASCADE by default
+    variant_rows = (await db.execute(
+        delete(PostVariant)
+        .where(PostVariant.post_id.in_(owned))
+        .returning(PostVariant.post_id, PostVariant.file_id)
+        .execution_options(synchronize_session=False)
+    )).all()
+    deleted = (await db.execute(
+        delete(Post)
+        .where(Post.id.in_(ids), Post.user_id == user_id)
+        .returning(Post.id, Post.content_hash)
+        .execution_options(synchronize_session=False)
+    )).all()
+
+    hash_of = {row.id: row.content_hash for row in deleted}
+    orphaned = await release_blobs(db, Counter(h for h in hash_of.values() if h is not None))
+    variant_files: dict[uuid.UUID, list[str]] = {}
+    for row in variant_rows:
+        variant_files.setdefault(row.post_id, []).append(row.file_id)
+    return (
+        [row.id for row in deleted],
+        [(row.id, row.content_hash, variant_files.get(row.id, [])) for row in deleted],
+        orphaned,
+    )
@@ -0,0 +1,163 @@
+"""Small key/value cache backends shared by the app's caching layers.
+
+``MemoryCache`` is a per-process LRU with per-entry TTLs; being in-process it can
+hold any Python object, not just bytes. ``RedisCache`` shares entries between
+worker processes and needs the optional ``redis`` package (``uv sync --extra redis``).
+Entries can carry tags so related keys can be invalidated together.
+"""
+
+import asyncio
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Iterable
+
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+
+class CacheBackend(ABC):
+    """Interface for byte-valued caches with per-entry expiry."""
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        """Return the cached value, or None if it is missing or expired."""
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str] = ()) -> None:
+        """Store a value for ``ttl`` seconds, optionally under some tags."""
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        """Remove keys if present."""
+
+    @abstractmethod
+    async def invalidate_tags(self, *tags: str) -> None:
+        """Remove every key stored under any of the given tags."""
+
+    @abstractmethod
+    def delete_nowait(self, *keys: str) -> None:
+        """Remove keys from synchronous code; backends that need I/O do it in the background."""
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU cache with per-entry TTLs."""
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[str, tuple[float, Any, tuple[str, ...]]] = OrderedDict()
+        self._tagged: dict[str, set[str]] = {}
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
+
+    def get_nowait(self, key: str) -> Any | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set_nowait(self, key: str, value: Any, ttl: float, tags: Iterable[str] = ()) -> None:
+        self._remove(key)
+        tags = tuple(tags)
+        self._entries[key] = (time.monotonic() + ttl, value, tags)
+        for tag in tags:
+            self._tagged.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.maxsize:
+            self._remove(next(iter(self._entries)))
+
+    def delete_nowait(self, *keys: str) -> None:
+        for key in keys:
+            self._remove(key)
+
+    def invalidate_tags_nowait(self, *tags: str) -> None:
+        for tag in tags:
+            for key in list(self._tagged.get(tag, ())):
+                self._remove(key)
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._entries.get(key)
+        return entry is not None and entry[0] > time.monotonic()
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tagged.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> bytes | None:
+        return self.get_nowait(key)
+
+    async def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str] = ()) -> None:
+        self.set_nowait(key, value, ttl, tags)
+
+    async def delete(self, *keys: str) -> None:
+        self.delete_nowait(*keys)
+
+    async def invalidate_tags(self, *tags: str) -> None:
+        self.invalidate_tags_nowait(*tags)
+
+
+class RedisCache(CacheBackend):
+    """Cache shared between workers through Redis."""
+
+    def __init__(self, url: str = CACHE_REDIS_URL, prefix: str = ""):
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise RuntimeError("The redis cache backend requires the 'redis' package (uv sync --extra redis)")
+        self._client = redis.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> bytes | None:
+        return await self._client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: float, tags: Iterable[str] = ()) -> None:
+        ttl_ms = max(int(ttl * 1000), 1)
+        async with self._client.pipeline(transaction=False) as pipe:
+            pipe.set(self.prefix + key, value, px=ttl_ms)
+            for tag in tags:
+                # Tag sets outlive their members slightly; stale members are harmless to delete
+                pipe.sadd(self._tag_key(tag), key)
+                pipe.pexpire(self._tag_key(tag), ttl_ms)
+            await pipe.execute()
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self._client.delete(*(self.prefix + key for key in keys))
+
+    def delete_nowait(self, *keys: str) -> None:
+        asyncio.get_running_loop().create_task(self.delete(*keys))
+
+    async def invalidate_tags(self, *tags: str) -> None:
+        for tag in tags:
+            members = await self._client.smembers(self._tag_key(tag))
+            keys = [member.decode() if isinstance(member, bytes) else member for member in members]
+            await self.delete(*keys)
+            await self._client.delete(self._tag_key(tag))
+
+
+def create_cache(backend: str, maxsize: int = 10000, prefix: str = "") -> CacheBackend:
+    """Build a cache backend by name ("memory" or "redis")."""
+    if backend == "memory":
+        return MemoryCache(maxsize=maxsize)
+    if backend == "redis":
+        return RedisCache(prefix=prefix)
+    raise ValueError(f"Unknown cache backend {backend!r}; expected 'memory' or 'redis'")
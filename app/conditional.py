@@ -0,0 +1,75 @@
+"""Conditional GET support: validators, precondition checks and 304 responses."""
+
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Iterable
+
+from fastapi import Request, Response
+
+# Clients may store responses but must revalidate them before reuse
+REVALIDATE = "no-cache"
+
+
+def item_etag(post_id, revision: int) -> str:
+    """Strong ETag for a single post: its id plus its revision counter."""
+    return f'"{post_id.hex}.{revision}"'
+
+
+def feed_etag(rows: Iterable[tuple], next_cursor: str | None) -> str:
+    """Strong ETag for a feed page from the (id, revision) pairs it contains."""
+    digest = hashlib.blake2b(digest_size=16)
+    for post_id, revision in rows:
+        digest.update(post_id.bytes)
+        digest.update(revision.to_bytes(8, "big"))
+    digest.update((next_cursor or "").encode())
+    return f'"feed.{digest.hexdigest()}"'
+
+
+def http_date(value: datetime) -> str:
+    """Format a naive UTC datetime as an HTTP date."""
+    return format_datetime(value.replace(tzinfo=timezone.utc, microsecond=0), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime | None = None) -> bool:
+    """
+    Return True if the client's cached copy is still current.
+
+    If-None-Match takes precedence over If-Modified-Since, as RFC 9110 requires.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # GET uses weak comparison, so W/ prefixes are ignored
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        return last_modified.replace(tzinfo=timezone.utc, microsecond=0) <= since
+    return False
+
+
+def validator_headers(etag: str, last_modified: datetime | None = None) -> dict:
+    """Headers that let clients revalidate a response."""
+    headers = {"ETag": etag, "Cache-Control": REVALIDATE}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified(etag: str, last_modified: datetime | None = None) -> Response:
+    """Empty 304 response carrying the current validators."""
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
+
+
+def has_preconditions(request: Request) -> bool:
+    """Return True if the request carries conditional GET headers."""
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
@@ -0,0 +1,115 @@
+"""Streaming bulk export of posts as NDJSON or CSV.
+
+Rows are read through ``AsyncSession.stream`` with ``yield_per``, which uses a
+server-side cursor on PostgreSQL and fetches in batches on SQLite, and each
+batch is encoded and sent before the next is read. Only one batch is held in
+memory at a time, however many rows the export covers.
+
+Plain columns are selected instead of ORM entities, so rows skip the identity
+map and relationship loading.
+"""
+
+import csv
+import io
+import logging
+import os
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.models import Post, User
+from app.serialization import dumps
+
+# Rows fetched from the database, and encoded into one chunk, at a time
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "posts.ndjson"),
+    "csv": ("text/csv; charset=utf-8", "posts.csv"),
+}
+
+# Output field -> column, in output order; names match the post payload
+EXPORT_COLUMNS = {
+    "id": Post.id,
+    "filename": Post.file_name,
+    "file_type": Post.file_type,
+    "url": Post.url,
+    "caption": Post.caption,
+    "created_at": Post.created_at,
+    "updated_at": Post.updated_at,
+    "user_id": Post.user_id,
+    "username": User.username,
+}
+
+logger = logging.getLogger(__name__)
+
+
+def _naive_utc(value: datetime | None) -> datetime | None:
+    """Timestamps are stored as naive UTC, so aware bounds are converted to match."""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def export_query(user_id=None, created_after: datetime | None = None, created_before: datetime | None = None) -> Select:
+    """
+    Select exported posts oldest first, optionally for one user and a created_at range.
+
+    ``created_after`` is inclusive and ``created_before`` exclusive, so
+    consecutive ranges never overlap.
+    """
+    query = select(*(column.label(name) for name, column in EXPORT_COLUMNS.items())).outerjoin(
+        User, User.id == Post.user_id
+    )
+    if user_id is not None:
+        query = query.where(Post.user_id == user_id)
+    if created_after is not None:
+        query = query.where(Post.created_at >= _naive_utc(created_after))
+    if created_before is not None:
+        query = query.where(Post.created_at < _naive_utc(created_before))
+    return query.order_by(Post.created_at, Post.id)
+
+
+def _ndjson_batch(rows) -> bytes:
+    return b"".join(dumps(row._asdict()) + b"\n" for row in rows)
+
+
+def _csv_writer():
+    buffer = io.StringIO()
+    return buffer, csv.writer(buffer, lineterminator="\n")
+
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return "" if value is None else value
+
+
+def _csv_batch(rows) -> bytes:
+    buffer, writer = _csv_writer()
+    writer.writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+async def stream_export(
+    query: Select, export_format: str, sessionmaker: async_sessionmaker[AsyncSession]
+) -> AsyncIterator[bytes]:
+    """Yield the encoded export one batch at a time, from its own session opened with ``sessionmaker``."""
+    encode = _csv_batch if export_format == "csv" else _ndjson_batch
+    if export_format == "csv":
+        buffer, writer = _csv_writer()
+        writer.writerow(EXPORT_COLUMNS)
+        yield buffer.getvalue().encode()
+
+    # The response outlives the request's dependencies, so the stream gets its own session
+    async with sessionmaker() as session:
+        try:
+            result = await session.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+            async for rows in result.partitions():
+                yield encode(rows)
+        except Exception:
+            # The status line has already been sent, so the client sees a truncated body
+            logger.exception("Post export failed part way through")
+            raise
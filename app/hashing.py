@@ -0,0 +1,145 @@
+"""Password hashing on a dedicated worker pool with admission control.
+
+bcrypt is deliberately slow (100-300 ms per call), so hashing and verifying
+run on their own executor instead of the event loop. The pool is bounded:
+once ``PASSWORD_HASH_WORKERS`` calls are running and ``PASSWORD_HASH_QUEUE_SIZE``
+more are waiting, further calls are rejected with 503 and a Retry-After header
+so a login storm cannot starve the rest of the app.
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+
+from fastapi import HTTPException, status
+
+from app.metrics import password_hash_seconds
+
+# Pool settings from environment variables. The bcrypt C extension releases the
+# GIL while hashing, so threads scale across cores; "process" is available for
+# hashing backends that do not.
+PASSWORD_HASH_POOL = os.getenv("PASSWORD_HASH_POOL", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "32"))
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv("PASSWORD_HASH_RETRY_AFTER", "2"))
+
+
+@lru_cache
+def get_pwd_context():
+    """Return the password hashing context, building it on first use (in whichever process hashes)."""
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def hash_password(password: str) -> str:
+    """Hash a password using bcrypt."""
+    return get_pwd_context().hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash."""
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+
+def _timed(func, *args):
+    """Run ``func`` and return its result with the time it took (runs in the pool)."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+class PasswordHashPool:
+    """Bounded executor for password hashing that keeps its own metrics."""
+
+    def __init__(self, workers: int, queue_size: int, kind: str = "thread"):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown PASSWORD_HASH_POOL {kind!r}; expected 'thread' or 'process'")
+        self.workers = workers
+        self.queue_size = queue_size
+        self.kind = kind
+        self._executor: Executor | None = None
+
+        # Counters are only touched from the event loop thread, so no locking is needed
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.hash_seconds_total = 0.0
+        self.hash_seconds_max = 0.0
+        self.wait_seconds_total = 0.0
+
+    @property
+    def executor(self) -> Executor:
+        """Create the executor on first use."""
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of calls waiting for a free worker."""
+        return max(self.pending - self.workers, 0)
+
+    async def run(self, func, *args):
+        """Run a hashing function on the pool, rejecting the call if the pool is saturated."""
+        if self.pending >= self.workers + self.queue_size:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication is busy, try again shortly",
+                headers={"Retry-After": str(PASSWORD_HASH_RETRY_AFTER)},
+            )
+
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, hash_seconds = await loop.run_in_executor(self.executor, _timed, func, *args)
+        finally:
+            self.pending -= 1
+
+        self.completed += 1
+        password_hash_seconds.observe(hash_seconds)
+        self.hash_seconds_total += hash_seconds
+        self.hash_seconds_max = max(self.hash_seconds_max, hash_seconds)
+        self.wait_seconds_total += time.perf_counter() - start - hash_seconds
+        return result
+
+    def metrics(self) -> dict:
+        """Return a snapshot of pool utilisation and hash latency."""
+        return {
+            "pool": self.kind,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_flight": self.pending - self.queue_depth,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "hash_seconds_avg": self.hash_seconds_total / self.completed if self.completed else 0.0,
+            "hash_seconds_max": self.hash_seconds_max,
+            "wait_seconds_avg": self.wait_seconds_total / self.completed if self.completed else 0.0,
+        }
+
+    def shutdown(self):
+        """Stop the worker pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hash_pool = PasswordHashPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE, PASSWORD_HASH_POOL)
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the password hashing pool."""
+    return await password_hash_pool.run(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the password hashing pool."""
+    return await password_hash_pool.run(verify_password, plain_password, hashed_password)
@@ -1,47 +1,141 @@
 # Image processing utilities
+import asyncio
 import os
 import shutil
 import tempfile
-from dotenv import load_dotenv
-from imagekitio import ImageKit
-from imagekitio.models.UploadFileRequestOptions import UploadFileRequestOptions
-from fastapi import UploadFile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException, UploadFile, status
 
-# Load environment variables
-load_dotenv()
+from app.metrics import upload_seconds
 
 # ImageKit configuration
 IMAGEKIT_PRIVATE_KEY = os.getenv("IMAGEKIT_PRIVATE_KEY")
 IMAGEKIT_PUBLIC_KEY = os.getenv("IMAGEKIT_PUBLIC_KEY")
 IMAGEKIT_URL_ENDPOINT = os.getenv("IMAGEKIT_URL_ENDPOINT")
 
-# Initialize ImageKit
-imagekit = ImageKit(
-    private_key=IMAGEKIT_PRIVATE_KEY,
-    public_key=IMAGEKIT_PUBLIC_KEY,
-    url_endpoint=IMAGEKIT_URL_ENDPOINT
-)
+# Upload concurrency limits: at most UPLOAD_CONCURRENCY uploads run at once on a
+# dedicated thread pool; further uploads wait up to UPLOAD_QUEUE_TIMEOUT seconds
+# for a slot before being rejected with 503.
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
+UPLOAD_QUEUE_TIMEOUT = float(os.getenv("UPLOAD_QUEUE_TIMEOUT", "30"))
 
+# Batch uploads: files accepted per request, and how many of them one request
+# stores at once (still within the UPLOAD_CONCURRENCY limit above)
+BATCH_UPLOAD_MAX_FILES = int(os.getenv("BATCH_UPLOAD_MAX_FILES", "50"))
+BATCH_UPLOAD_CONCURRENCY = int(os.getenv("BATCH_UPLOAD_CONCURRENCY", "4"))
 
-async def upload_to_imagekit(file: UploadFile):
-    """Upload a file to ImageKit using a temporary file with the same suffix."""
+# The ImageKit SDK is blocking, so uploads run here instead of on the event loop
+upload_executor = ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY, thread_name_prefix="upload")
+upload_slots = asyncio.Semaphore(UPLOAD_CONCURRENCY)
+
+
+def get_imagekit():
+    """
+    Return the ImageKit client, creating it on first use.
+
+    The SDK pulls in requests and its dependencies, which is a large share of
+    the app's import time, so processes that never touch ImageKit (the local
+    storage backend, tests, the launcher) never load it.
+    """
+    client = globals().get("imagekit")
+    if client is None:
+        from imagekitio import ImageKit
+
+        client = globals()["imagekit"] = ImageKit(
+            private_key=IMAGEKIT_PRIVATE_KEY,
+            public_key=IMAGEKIT_PUBLIC_KEY,
+            url_endpoint=IMAGEKIT_URL_ENDPOINT
+        )
+    return client
+
+
+def __getattr__(name):
+    # Keeps ``app.images.imagekit`` working (and patchable) while the client is created lazily
+    if name == "imagekit":
+        return get_imagekit()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _push_to_imagekit(path: str, file_name: str):
+    """Upload a file on disk to ImageKit (runs in a worker thread)."""
+    from imagekitio.models.UploadFileRequestOptions import UploadFileRequestOptions
+
+    # The SDK only streams a filename for real file handles, so it gets one
+    with open(path, "rb") as upload_handle:
+        return get_imagekit().upload_file(
+            file=upload_handle,
+            file_name=file_name,
+            options=UploadFileRequestOptions(
+                use_unique_file_name=True,
+                tags=["backend-upload"]
+            )
+        )
+
+
+def _upload_blocking(file: UploadFile):
+    """Spool the upload to a temporary file and push it to ImageKit (runs in a worker thread)."""
     # Create a temporary file with the same suffix as the uploaded file
     with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp_file:
         temp_file_path = temp_file.name
         shutil.copyfileobj(file.file, temp_file)
     
     try:
-        # Upload to ImageKit
-        upload_result = imagekit.upload_file(
-            file=open(temp_file_path, "rb"),
-            file_name=file.filename,
-            options=UploadFileRequestOptions(
-                use_unique_file_name=True,
-                tags=["backend-upload"]
-            )
-        )
-        return upload_result
+        return _push_to_imagekit(temp_file_path, file.filename)
     finally:
         # Clean up the temporary file
         if os.path.exists(temp_file_path):
             os.remove(temp_file_path)
+
+
+def _upload_bytes_blocking(data: bytes, file_name: str):
+    """Write generated content to a temporary file and push it to ImageKit (runs in a worker thread)."""
+    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file_name)[1]) as temp_file:
+        temp_file_path = temp_file.name
+        temp_file.write(data)
+    
+    try:
+        return _push_to_imagekit(temp_file_path, file_name)
+    finally:
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+
+
+def _delete_blocking(file_id: str):
+    """Delete a file from ImageKit (runs in a worker thread)."""
+    return get_imagekit().delete_file(file_id)
+
+
+async def run_in_upload_pool(func, *args):
+    """Run a blocking upload step on the upload pool, honouring the concurrency limit."""
+    try:
+        await asyncio.wait_for(upload_slots.acquire(), timeout=UPLOAD_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many uploads in progress, try again later",
+            headers={"Retry-After": "5"},
+        )
+    
+    start = time.perf_counter()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(upload_executor, func, *args)
+    finally:
+        upload_slots.release()
+        upload_seconds.observe(time.perf_counter() - start)
+
+
+async def upload_to_imagekit(file: UploadFile):
+    """Upload a file to ImageKit without blocking the event loop."""
+    return await run_in_upload_pool(_upload_blocking, file)
+
+
+async def upload_bytes_to_imagekit(data: bytes, file_name: str):
+    """Upload generated content (e.g. an image variant) to ImageKit without blocking the event loop."""
+    return await run_in_upload_pool(_upload_bytes_blocking, data, file_name)
+
+
+async def delete_from_imagekit(file_id: str):
+    """Delete a file from ImageKit without blocking the event loop."""
+    return await run_in_upload_pool(_delete_blocking, file_id)
@@ -0,0 +1,82 @@
+"""Image decoding and resizing for responsive variants.
+
+This module only depends on Pillow so that process-pool workers can import it
+without pulling in the web app. Pillow is optional (``uv sync --extra images``);
+without it ``IMAGING_AVAILABLE`` is False and no variants are generated.
+"""
+
+import importlib.util
+import io
+from dataclasses import dataclass
+
+# Pillow is imported by the first variant job rather than by every process importing the app
+IMAGING_AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+# Encoder settings per output format: (Pillow format name, content type, file extension, save options)
+FORMATS = {
+    "webp": ("WEBP", "image/webp", ".webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "image/jpeg", ".jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+# EXIF tag holding how the stored pixels must be turned for display
+ORIENTATION_TAG = 0x0112
+
+
+@dataclass(frozen=True)
+class RenderedVariant:
+    """One encoded rendition of an image."""
+    width: int
+    height: int
+    format: str
+    content_type: str
+    extension: str
+    data: bytes
+
+
+def _flatten(image):
+    """Drop alpha onto a white background for formats without transparency."""
+    from PIL import Image
+
+    if image.mode == "RGB":
+        return image
+    background = Image.new("RGB", image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel("A"))
+    return background
+
+
+def generate_variants(source_path: str, widths: list[int], formats: list[str]) -> list[RenderedVariant]:
+    """
+    Decode an image once and encode it at each target width in each format.
+
+    Widths at or above the original are skipped; if none are smaller the image
+    is re-encoded at its own width. EXIF and other metadata are not copied,
+    after the orientation tag has been applied to the pixels.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(source_path) as source:
+        # Orientations 5-8 turn the image a quarter, so its displayed width is the stored height
+        turned = source.getexif().get(ORIENTATION_TAG, 1) in (5, 6, 7, 8)
+        width, height = (source.height, source.width) if turned else source.size
+        targets = sorted({target for target in widths if target < width}, reverse=True) or [width]
+        # Let the JPEG decoder scale down by a power of two while decoding, never below
+        # the widest target; the requested size is in stored, not displayed, orientation
+        draft_size = (targets[0], max(targets[0] * height // width, 1))
+        source.draft("RGB", draft_size[::-1] if turned else draft_size)
+        image = ImageOps.exif_transpose(source)
+        image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+
+    variants = []
+    current = image
+    for width in targets:
+        height = max(round(image.height * width / image.width), 1)
+        if current.size != (width, height):
+            # Each step shrinks the previous, smaller rendition rather than the full image
+            current = current.resize((width, height), Image.Resampling.LANCZOS)
+        for name in formats:
+            pil_format, content_type, extension, options = FORMATS[name]
+            output = io.BytesIO()
+            frame = current if pil_format == "WEBP" else _flatten(current)
+            frame.save(output, pil_format, **options)
+            variants.append(RenderedVariant(width, height, name, content_type, extension, output.getvalue()))
+    return variants
@@ -0,0 +1,284 @@
+"""Durable background jobs stored in the application database.
+
+Work that should not hold up a response, such as generating image variants or
+removing files from storage once nothing references them, is written to the
+``jobs`` table by ``enqueue`` in the same transaction as the change that needs
+it. It is neither lost when a worker restarts nor run for a change that was
+rolled back.
+
+Every app worker runs a ``JobWorker`` from the lifespan hook. It claims due
+jobs with a single UPDATE ... RETURNING, so any number of workers and
+processes can share the table, and runs at most ``JOB_CONCURRENCY`` at once.
+A failed job is retried with exponential backoff until it has had
+``JOB_MAX_ATTEMPTS`` attempts. A job whose worker died is claimed again once
+its ``JOB_LEASE_SECONDS`` lease runs out, so handlers must be safe to run more
+than once. A job enqueued with an idempotency key that is already taken is
+not stored again.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Awaitable, Callable, Iterable
+from contextlib import suppress
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import db
+from app.metrics import job_seconds
+from app.models import Job
+
+logger = logging.getLogger(__name__)
+
+# Jobs one app worker runs at once (0 disables the worker, e.g. for a web-only process)
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "4"))
+# How often idle workers look for due jobs; new jobs in the same worker start immediately
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "1"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+# Retry n waits JOB_RETRY_BASE_SECONDS * 2**(n-1), capped at JOB_RETRY_MAX_SECONDS
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", "600"))
+# A running job not finished within this long is assumed lost and run again
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+# Completed jobs (and so their idempotency keys) are kept this long; failed jobs are kept
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", "86400"))
+JOB_PRUNE_INTERVAL = 600
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+Handler = Callable[[Job], Awaitable[None]]
+HANDLERS: dict[str, Handler] = {}
+
+
+def handler(kind: str) -> Callable[[Handler], Handler]:
+    """Register a coroutine function as the handler for jobs of ``kind``; raising makes the job retry."""
+    def register(func: Handler) -> Handler:
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds to wait before retrying a job that has failed ``attempts`` times."""
+    return min(JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), JOB_RETRY_MAX_SECONDS)
+
+
+async def enqueue_many(
+    session: AsyncSession,
+    kind: str,
+    jobs: Iterable[tuple[dict, str | None]],
+    delay: float = 0,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+) -> None:
+    """
+    Add jobs, given as (payload, idempotency key) pairs, in one INSERT in the caller's transaction.
+
+    Workers see them once the caller commits; call ``job_worker.wake()`` then
+    to start them without waiting for the next poll.
+    """
+    now = datetime.utcnow()
+    rows = [
+        {
+            "kind": kind,
+            "payload": payload,
+            "idempotency_key": key,
+            "status": PENDING,
+            "attempts": 0,
+            "max_attempts": max_attempts,
+            "run_at": now + timedelta(seconds=delay),
+            "created_at": now,
+            "updated_at": now,
+        }
+        for payload, key in jobs
+    ]
+    if not rows:
+        return
+    insert = (postgresql if session.bind.dialect.name == "postgresql" else sqlite).insert(Job)
+    await session.execute(insert.values(rows).on_conflict_do_nothing(index_elements=[Job.idempotency_key]))
+
+
+async def enqueue(session: AsyncSession, kind: str, payload: dict, idempotency_key: str | None = None, **options) -> None:
+    """Add one job in the caller's transaction; see ``enqueue_many``."""
+    await enqueue_many(session, kind, [(payload, idempotency_key)], **options)
+
+
+async def claim_jobs(limit: int) -> list[Job]:
+    """
+    Mark up to ``limit`` due jobs as running under a fresh lease and return them.
+
+    Due means pending with ``run_at`` passed, or running with an expired lease.
+    The conditions are checked again by the UPDATE itself, and PostgreSQL skips
+    rows another worker has locked, so no job is claimed twice.
+    """
+    now = datetime.utcnow()
+    is_due = (Job.status.in_((PENDING, RUNNING)), Job.run_at <= now)
+    due = select(Job.id).where(*is_due).order_by(Job.run_at, Job.id).limit(limit).with_for_update(skip_locked=True)
+    async with db.AsyncSessionLocal() as session:
+        result = await session.execute(
+            update(Job)
+            .where(Job.id.in_(due), *is_due)
+            .values(
+                status=RUNNING,
+                attempts=Job.attempts + 1,
+                run_at=now + timedelta(seconds=JOB_LEASE_SECONDS),
+                updated_at=now,
+            )
+            .returning(Job)
+            .execution_options(synchronize_session=False)
+        )
+        jobs = list(result.scalars())
+        await session.commit()
+    return jobs
+
+
+async def _finish(job: Job, **values) -> None:
+    """Record a claimed job's outcome, unless its lease expired and another worker has claimed it since."""
+    async with db.AsyncSessionLocal() as session:
+        await session.execute(
+            update(Job)
+            .where(Job.id == job.id, Job.status == RUNNING, Job.attempts == job.attempts)
+            .values(updated_at=datetime.utcnow(), **values)
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+
+async def run_job(job: Job) -> bool:
+    """Run one claimed job and record the outcome; return True if it succeeded."""
+    func = HANDLERS.get(job.kind)
+    start = time.perf_counter()
+    try:
+        if func is None:
+            raise LookupError(f"No handler is registered for {job.kind!r} jobs")
+        await func(job)
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+        if job.is_last_attempt or func is None:
+            logger.exception("Job %s (%s) failed for good after %d attempt(s)", job.id, job.kind, job.attempts)
+            job_seconds.observe(time.perf_counter() - start, job.kind, FAILED)
+            await _finish(job, status=FAILED, last_error=error)
+        else:
+            delay = retry_delay(job.attempts)
+            logger.warning(
+                "Job %s (%s) failed on attempt %d of %d, retrying in %.0fs",
+                job.id, job.kind, job.attempts, job.max_attempts, delay, exc_info=True,
+            )
+            job_seconds.observe(time.perf_counter() - start, job.kind, "retry")
+            await _finish(
+                job, status=PENDING, last_error=error, run_at=datetime.utcnow() + timedelta(seconds=delay)
+            )
+        return False
+    job_seconds.observe(time.perf_counter() - start, job.kind, DONE)
+    await _finish(job, status=DONE, last_error=None)
+    return True
+
+
+async def run_due_jobs() -> int:
+    """Run every due job, and any that become due meanwhile, to completion; return how many ran."""
+    count = 0
+    while jobs := await claim_jobs(max(JOB_CONCURRENCY, 1)):
+        await asyncio.gather(*(run_job(job) for job in jobs))
+        count += len(jobs)
+    return count
+
+
+async def _release(jobs: list[Job]) -> None:
+    """Hand interrupted jobs back to the queue without counting the attempt."""
+    async with db.AsyncSessionLocal() as session:
+        await session.execute(
+            update(Job)
+            .where(Job.id.in_([job.id for job in jobs]), Job.status == RUNNING)
+            .values(status=PENDING, attempts=Job.attempts - 1, run_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+
+
+async def prune_jobs() -> int:
+    """Delete completed jobs older than ``JOB_RETENTION_SECONDS``; return how many were removed."""
+    cutoff = datetime.utcnow() - timedelta(seconds=JOB_RETENTION_SECONDS)
+    async with db.AsyncSessionLocal() as session:
+        result = await session.execute(delete(Job).where(Job.status == DONE, Job.updated_at < cutoff))
+        await session.commit()
+    return result.rowcount
+
+
+class JobWorker:
+    """Polls for due jobs and runs them on the event loop, at most ``concurrency`` at a time."""
+
+    def __init__(self, concurrency: int = JOB_CONCURRENCY, poll_seconds: float = JOB_POLL_SECONDS):
+        self.concurrency = concurrency
+        self.poll_seconds = poll_seconds
+        self.running: dict[asyncio.Task, Job] = {}
+        self._task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._stopping = False
+        self._pruned_at = 0.0
+
+    def start(self) -> None:
+        """Start polling on the running event loop."""
+        if self._task is None and self.concurrency > 0:
+            self._wakeup = asyncio.Event()
+            self._stopping = False
+            self._task = asyncio.create_task(self._poll(), name="job-worker")
+
+    def wake(self) -> None:
+        """Look for due jobs now rather than at the next poll; call after committing new jobs."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _poll(self) -> None:
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                free = self.concurrency - len(self.running)
+                if free > 0:
+                    for job in await claim_jobs(free):
+                        task = asyncio.create_task(run_job(job))
+                        self.running[task] = job
+                        task.add_done_callback(self._job_done)
+                if time.monotonic() - self._pruned_at > JOB_PRUNE_INTERVAL:
+                    self._pruned_at = time.monotonic()
+                    await prune_jobs()
+            except Exception:
+                logger.exception("Could not check for background jobs")
+            if self._stopping:
+                break
+            with suppress(TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+
+    def _job_done(self, task: asyncio.Task) -> None:
+        self.running.pop(task, None)
+        # The free slot may take a job that was left waiting
+        self.wake()
+
+    async def stop(self, timeout: float = 10) -> None:
+        """Stop polling, give running jobs ``timeout`` seconds, then interrupt and requeue the rest."""
+        if self._task is None:
+            return
+        # The poll loop is left to finish its current pass rather than cancelled, so a
+        # claim already committed is always recorded in ``running`` and handed back below
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = self._wakeup = None
+
+        running = dict(self.running)
+        if running:
+            _, unfinished = await asyncio.wait(running, timeout=timeout)
+            for task in unfinished:
+                task.cancel()
+            await asyncio.gather(*unfinished, return_exceptions=True)
+            if unfinished:
+                await _release([running[task] for task in unfinished])
+
+    def metrics(self) -> dict:
+        """Return the worker's current load."""
+        return {"concurrency": self.concurrency, "running": len(self.running)}
+
+
+job_worker = JobWorker()
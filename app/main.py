@@ -1,42 +1,101 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File, Depends, Form, status
+from fastapi import FastAPI, HTTPException, UploadFile, File, Depends, Form, Query, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from pydantic import BaseModel
 from contextlib import asynccontextmanager
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+import logging
 import os
+import stat
+import time
 import uuid
-from pathlib import Path
-from datetime import timedelta
-
-from app.db import init_db, get_db
-from app.models import Post, User
-from app.images import upload_to_imagekit
+from datetime import datetime, timedelta
+from typing import Literal
+
+from app.db import DB_INIT_ON_STARTUP, engine, init_db, get_db, get_read_db, mark_recent_write, sessionmaker_for
+from app.models import Blob, Post, User
+from app.storage import MEDIA_TYPES, LocalStorage, get_storage, is_content_addressed, media_suffix
+from app.blobs import acquire_blob, acquire_blobs, enqueue_file_deletions, release_blob, stored_file
+from app.images import BATCH_UPLOAD_CONCURRENCY, BATCH_UPLOAD_MAX_FILES
+from app.conditional import feed_etag, has_preconditions, is_not_modified, item_etag, not_modified, validator_headers
+from app.response_cache import FEED_HEAD_TAG, CachedBody, post_tag, response_cache
+from app.serialization import DefaultJSONResponse, dumps, post_payload
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, feed_order, paginate_feed, split_page
+from app.hashing import hash_password_async, password_hash_pool
+from app.metrics import METRICS_ENABLED, PROMETHEUS_CONTENT_TYPE, MetricsMiddleware
+from app.profiling import (
+    PROFILING_AVAILABLE,
+    PROFILING_ENABLED,
+    ProfilingMiddleware,
+    list_profiles,
+    profile_response,
+    require_profiling_admin,
+)
+from app import bulk, db as app_db, jobs, metrics, variants
+from app.static import serve as serve_static, static_site
+from app.export import EXPORT_FORMATS, export_query, stream_export
+from app.search import (
+    SEARCH_DEFAULT_PAGE_SIZE,
+    SEARCH_MAX_PAGE_SIZE,
+    highlight,
+    search_query,
+    search_terms,
+    split_hits,
+)
 from app.auth import (
-    hash_password,
     authenticate_user,
     create_access_token,
     get_current_user,
+    UserPrincipal,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
-from app.schemas import UserCreate, UserResponse, Token
+from app.schemas import (
+    BatchUploadResponse,
+    BulkCaptionUpdate,
+    BulkPostIds,
+    BulkResult,
+    FeedPage,
+    PostResponse,
+    SearchPage,
+    UserCreate,
+    UserFeedPage,
+    UserResponse,
+    Token,
+)
+
+
+# Startup is measured from the launcher's start when run through main.py, else from here
+LAUNCHED_AT = float(os.getenv("APP_LAUNCHED_AT") or time.time())
+# A worker taking longer than this to become ready logs a warning
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "10"))
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Initialize database on startup."""
-    await init_db()
+    """Initialize the database and frontend, and start the job worker, on startup; stop them on shutdown."""
+    if DB_INIT_ON_STARTUP:
+        await init_db()
+    static_site.ensure_loaded()
+    jobs.job_worker.start()
+    startup_seconds = time.time() - LAUNCHED_AT
+    if startup_seconds > STARTUP_BUDGET_SECONDS:
+        logger.warning("Worker %d ready in %.2fs, over the %.0fs startup budget", os.getpid(), startup_seconds, STARTUP_BUDGET_SECONDS)
+    else:
+        logger.info("Worker %d ready in %.2fs", os.getpid(), startup_seconds)
     yield
+    await jobs.job_worker.stop()
+    password_hash_pool.shutdown()
+    variants.shutdown()
 
 
 app = FastAPI(
     title="FastAPI Project",
     description="A simple FastAPI application",
     version="0.1.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=DefaultJSONResponse,
 )
 
 # Configure CORS
@@ -48,72 +107,80 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Frontend directory relative to this file (app/main.py)
-FRONTEND_DIR = Path(__file__).resolve().parent.parent / "frontend"
+# Added first so it sits inside the metrics middleware and profiles only the request itself
+if PROFILING_ENABLED:
+    if PROFILING_AVAILABLE:
+        app.add_middleware(ProfilingMiddleware)
+    else:
+        logging.getLogger(__name__).warning("PROFILING_ENABLED is set but pyinstrument is not installed")
 
-# Mount static assets
-if FRONTEND_DIR.exists():
-    app.mount(
-        "/frontend",
-        StaticFiles(directory=str(FRONTEND_DIR)),
-        name="frontend",
-    )
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
+logger = logging.getLogger(__name__)
 
+# Locally stored uploads are served from here whichever backend is active,
+# so files written before switching backends keep working
+local_uploads = LocalStorage()
 
 
-@app.get("/", include_in_schema=False)
-async def root():
-    """Serve the frontend HTML page."""
-    index_file = FRONTEND_DIR / "index.html"
-    if index_file.exists():
-        return FileResponse(str(index_file))
-    return {"message": "Frontend not found. Build and place files in the frontend directory."}
 
 
-@app.get("/index.html", include_in_schema=False)
-async def index_page():
-    """Serve the index page."""
-    index_file = FRONTEND_DIR / "index.html"
-    if index_file.exists():
-        return FileResponse(str(index_file))
-    raise HTTPException(status_code=404, detail="Page not found")
-
+@app.api_route("/", methods=["GET", "HEAD"], include_in_schema=False)
+async def root(request: Request):
+    """Serve the frontend HTML page."""
+    page = static_site.page("index.html")
+    if page is not None:
+        return serve_static(request, page)
+    return {"message": "Frontend not found. Build and place files in the frontend directory."}
 
-@app.get("/post.html", include_in_schema=False)
-async def post_page():
-    """Serve the post detail page."""
-    post_file = FRONTEND_DIR / "post.html"
-    if post_file.exists():
-        return FileResponse(str(post_file))
-    raise HTTPException(status_code=404, detail="Page not found")
 
+@app.api_route("/{page_name}.html", methods=["GET", "HEAD"], include_in_schema=False)
+async def frontend_page(page_name: str, request: Request):
+    """Serve a frontend page from the in-memory page index."""
+    page = static_site.page(f"{page_name}.html")
+    if page is None:
+        raise HTTPException(status_code=404, detail="Page not found")
+    return serve_static(request, page)
 
-@app.get("/upload.html", include_in_schema=False)
-async def upload_page():
-    """Serve the upload page."""
-    upload_file = FRONTEND_DIR / "upload.html"
-    if upload_file.exists():
-        return FileResponse(str(upload_file))
-    raise HTTPException(status_code=404, detail="Page not found")
 
+@app.api_route("/frontend/{path:path}", methods=["GET", "HEAD"], include_in_schema=False)
+async def frontend_asset(path: str, request: Request):
+    """Serve a precompressed frontend asset; fingerprinted URLs are cached forever."""
+    found = static_site.asset(path)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    asset, immutable = found
+    return serve_static(request, asset, immutable=immutable)
 
-@app.get("/login.html", include_in_schema=False)
-async def login_page():
-    """Serve the login page."""
-    login_file = FRONTEND_DIR / "login.html"
-    if login_file.exists():
-        return FileResponse(str(login_file))
-    raise HTTPException(status_code=404, detail="Page not found")
 
+@app.get("/uploads/{file_name}", include_in_schema=False)
+async def serve_upload(file_name: str):
+    """
+    Serve a locally stored upload.
 
-@app.get("/register.html", include_in_schema=False)
-async def register_page():
-    """Serve the register page."""
-    register_file = FRONTEND_DIR / "register.html"
-    if register_file.exists():
-        return FileResponse(str(register_file))
-    raise HTTPException(status_code=404, detail="Page not found")
+    FileResponse honours Range requests and hands the path to the server for
+    zero-copy sending when it supports the ASGI pathsend extension. Only image
+    and video types are served inline; anything else is a download.
+    """
+    path = local_uploads.resolve(file_name)
+    try:
+        stat_result = os.stat(path) if path else None
+    except OSError:
+        stat_result = None
+    if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    # Browsers must not second-guess the type: uploads share the app's origin
+    headers = {"X-Content-Type-Options": "nosniff"}
+    media_type = MEDIA_TYPES.get(media_suffix(file_name))
+    if media_type is None:
+        media_type = "application/octet-stream"
+        headers["Content-Disposition"] = "attachment"
+    if is_content_addressed(file_name):
+        # Content-addressed files never change under the same name
+        headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return FileResponse(path, stat_result=stat_result, headers=headers, media_type=media_type)
 
 
 @app.get("/health")
@@ -122,9 +189,50 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    """Request, database and worker-pool metrics for this worker in Prometheus format."""
+    body = metrics.render({
+        "db_pool": metrics.pool_status(engine.sync_engine.pool),
+        "jobs": jobs.job_worker.metrics(),
+        "password_hash": password_hash_pool.metrics(),
+        "response_cache": response_cache.metrics(),
+    })
+    return Response(content=body, media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@app.get("/metrics/response-cache")
+async def response_cache_metrics():
+    """Response cache hit/miss counters for this worker."""
+    return response_cache.metrics()
+
+
+@app.get("/metrics/password-hashing")
+async def password_hashing_metrics():
+    """Password hashing pool queue depth, rejections and latency."""
+    return password_hash_pool.metrics()
+
+
+@app.get("/admin/profiles", include_in_schema=False)
+async def read_profiles(admin: UserPrincipal = Depends(require_profiling_admin)):
+    """Stored request profiles, newest first (profiling admins only)."""
+    return {"profiles": await list_profiles()}
+
+
+@app.get("/admin/profiles/{profile_id}", include_in_schema=False)
+async def read_profile(profile_id: str, admin: UserPrincipal = Depends(require_profiling_admin)):
+    """Download one profile in speedscope format (profiling admins only)."""
+    return profile_response(profile_id)
+
+
 # ============ Authentication Endpoints ============
 
-@app.post("/auth/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
+@app.post(
+    "/auth/register",
+    response_model=UserResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(mark_recent_write)],
+)
 async def register(
     user_data: UserCreate,
     db: AsyncSession = Depends(get_db)
@@ -150,7 +258,7 @@ async def register(
     new_user = User(
         username=user_data.username,
         email=user_data.email,
-        hashed_password=hash_password(user_data.password)
+        hashed_password=await hash_password_async(user_data.password)
     )
     
     db.add(new_user)
@@ -185,101 +293,337 @@ async def login(
 
 @app.get("/auth/me", response_model=UserResponse)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
     """Get current authenticated user information."""
     return current_user
 
 
-@app.get("/items/{item_id}")
-async def read_item(item_id: str, db: AsyncSession = Depends(get_db)):
-    """Get a specific post by ID."""
+@asynccontextmanager
+async def cache_fill_session(read_db: AsyncSession):
+    """
+    Yield the session a cached body is built from.
+
+    Cached bodies are shared by every client until they expire, so they are
+    read from the primary: a replica lagging behind the write that just
+    invalidated the entry would otherwise put the old body back.
+    """
+    if not response_cache.enabled or sessionmaker_for(read_db) is app_db.AsyncSessionLocal:
+        yield read_db
+        return
+    async with app_db.AsyncSessionLocal() as session:
+        yield session
+
+
+@app.get("/items/{item_id}", response_model=PostResponse)
+async def read_item(item_id: str, request: Request, db: AsyncSession = Depends(get_read_db)):
+    """
+    Get a specific post by ID.
+
+    Responses carry an ETag built from the post's revision and a Last-Modified
+    date; matching If-None-Match / If-Modified-Since requests get a 304.
+    """
     try:
         post_uuid = uuid.UUID(item_id)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid UUID format")
     
-    result = await db.execute(select(Post).where(Post.id == post_uuid))
-    post = result.scalar_one_or_none()
+    key = f"item:{post_uuid}"
+    if has_preconditions(request) and not response_cache.is_cached(key):
+        # Check the validators alone before building a body the client may already have
+        result = await db.execute(
+            select(Post.revision, Post.updated_at, Post.created_at).where(Post.id == post_uuid)
+        )
+        row = result.one_or_none()
+        if row is not None:
+            etag, last_modified = item_etag(post_uuid, row.revision), row.updated_at or row.created_at
+            if is_not_modified(request, etag, last_modified):
+                return not_modified(etag, last_modified)
     
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
+    async def build():
+        async with cache_fill_session(db) as session:
+            result = await session.execute(select(Post).where(Post.id == post_uuid))
+            post = result.scalar_one_or_none()
+        
+        if not post:
+            raise HTTPException(status_code=404, detail="Post not found")
+        
+        body = dumps(post_payload(post))
+        entry = CachedBody(body, item_etag(post.id, post.revision), post.updated_at or post.created_at)
+        return entry, [post_tag(post.id)]
     
-    return {
-        "id": str(post.id),
-        "filename": post.file_name,
-        "file_type": post.file_type,
-        "url": post.url,
-        "caption": post.caption,
-        "created_at": post.created_at.isoformat(),
-        "user_id": str(post.user_id) if post.user_id else None
-    }
-
-
-@app.get("/items/")
-async def read_items(db: AsyncSession = Depends(get_db)):
-    """Get all posts from database ordered by creation date (newest first)."""
-    result = await db.execute(select(Post).order_by(Post.created_at.desc()))
-    posts = result.scalars().all()
-    
-    items = [
-        {
-            "id": str(post.id),
-            "filename": post.file_name,
-            "file_type": post.file_type,
-            "url": post.url,
-            "caption": post.caption,
-            "created_at": post.created_at.isoformat()
-        }
-        for post in posts
-    ]
+    entry = await response_cache.get_or_build(key, build)
+    if is_not_modified(request, entry.etag, entry.last_modified):
+        return not_modified(entry.etag, entry.last_modified)
+    return Response(
+        content=entry.body,
+        media_type="application/json",
+        headers=validator_headers(entry.etag, entry.last_modified),
+    )
+
+
+@app.get("/items/", response_model=FeedPage)
+async def read_items(
+    request: Request,
+    cursor: str | None = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    all_items: bool = Query(False, alias="all", description="Return the full, unpaginated listing"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get posts ordered by creation date (newest first), one page at a time.
+
+    Pass the returned ``next_cursor`` back as ``cursor`` to fetch the next page;
+    it is null on the last page. ``all=true`` restores the legacy full listing.
+    Pages carry an ETag derived from the ids and revisions they contain, and
+    matching If-None-Match requests get a 304.
+    """
+    def page_query(query):
+        if all_items:
+            return feed_order(query)
+        return paginate_feed(query, cursor, limit)
+
+    def split(rows):
+        if all_items:
+            return rows, None
+        return split_page(rows, limit)
+
+    key = "feed:all" if all_items else f"feed:{cursor or 'head'}:{limit}"
+    if has_preconditions(request) and not response_cache.is_cached(key):
+        # The page's ids and revisions decide its ETag; no need to load full rows
+        result = await db.execute(page_query(select(Post.id, Post.revision, Post.created_at)))
+        rows, next_cursor = split(result.all())
+        etag = feed_etag(((row.id, row.revision) for row in rows), next_cursor)
+        if is_not_modified(request, etag):
+            return not_modified(etag)
+
+    async def build():
+        async with cache_fill_session(db) as session:
+            result = await session.execute(page_query(select(Post)))
+            posts, next_cursor = split(result.scalars().all())
+
+        items = [post_payload(post) for post in posts]
+        
+        tags = [post_tag(post.id) for post in posts]
+        if all_items or not cursor:
+            tags.append(FEED_HEAD_TAG)
+        body = dumps({"items": items, "total": len(items), "next_cursor": next_cursor})
+        etag = feed_etag(((post.id, post.revision) for post in posts), next_cursor)
+        return CachedBody(body, etag), tags
+    
+    entry = await response_cache.get_or_build(key, build)
+    if is_not_modified(request, entry.etag):
+        return not_modified(entry.etag)
+    return Response(content=entry.body, media_type="application/json", headers=validator_headers(entry.etag))
+
+
+
+
+@app.get("/users/{username}/posts", response_model=UserFeedPage)
+async def read_user_posts(
+    username: str,
+    cursor: str | None = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Get one user's posts, newest first, one page at a time.
+
+    Pages are read through the ix_posts_user_id_created_at index, and authors
+    and variants are loaded with the posts, so every page costs the same
+    small number of queries.
+    """
+    result = await db.execute(select(User.id).where(User.username == username))
+    user_id = result.scalar_one_or_none()
+    if user_id is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    result = await db.execute(paginate_feed(select(Post).where(Post.user_id == user_id), cursor, limit))
+    posts, next_cursor = split_page(result.scalars().all(), limit)
     
-    return {"items": items, "total": len(items)}
+    body = dumps({"items": [post_payload(post) for post in posts], "next_cursor": next_cursor})
+    return Response(content=body, media_type="application/json")
+
+
+@app.get("/export/posts")
+async def export_posts(
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    username: str | None = Query(None, alias="user", description="Only this user's posts"),
+    created_after: datetime | None = Query(None, description="Posts created at or after this time"),
+    created_before: datetime | None = Query(None, description="Posts created before this time"),
+    current_user: UserPrincipal = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Stream posts, oldest first, as NDJSON (one object per line) or CSV.
+
+    Rows are read with a server-side cursor and sent in batches, so memory use
+    does not grow with the number of posts exported. They come from the same
+    read replica, or the primary, as the rest of the request.
+    """
+    user_id = None
+    if username is not None:
+        result = await db.execute(select(User.id).where(User.username == username))
+        user_id = result.scalar_one_or_none()
+        if user_id is None:
+            raise HTTPException(status_code=404, detail="User not found")
+
+    media_type, filename = EXPORT_FORMATS[export_format]
+    return StreamingResponse(
+        stream_export(export_query(user_id, created_after, created_before), export_format, sessionmaker_for(db)),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 
+@app.get("/search", response_model=SearchPage)
+async def search_posts(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to find in captions and file names"),
+    cursor: str | None = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    limit: int = Query(SEARCH_DEFAULT_PAGE_SIZE, ge=1, le=SEARCH_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    Search posts by caption and file name, best match first.
+
+    Every word must match; the last one also matches as a prefix. Each hit has
+    highlighted snippets showing where it matched.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return Response(content=dumps({"items": [], "next_cursor": None}), media_type="application/json")
+    
+    result = await db.execute(search_query(db.bind.dialect.name, terms, cursor, limit))
+    hits, next_cursor = split_hits(result.all(), limit)
+    
+    items = []
+    for hit in hits:
+        item = post_payload(hit.Post)
+        item["highlights"] = {
+            "caption": highlight(hit.caption_snippet),
+            "filename": highlight(hit.file_name_snippet),
+        }
+        items.append(item)
+    return Response(content=dumps({"items": items, "next_cursor": next_cursor}), media_type="application/json")
 
 
-@app.post("/upload")
+@app.post("/upload", response_model=PostResponse, dependencies=[Depends(mark_recent_write)])
 async def upload_file(
     file: UploadFile = File(...),
     caption: str | None = Form(None),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
-    """Upload a file to ImageKit and create a post record. Requires authentication."""
-    # Upload to ImageKit
-    upload_result = await upload_to_imagekit(file)
+    """
+    Upload a file to the configured storage backend and create a post record. Requires authentication.
+
+    Content that is already stored is not uploaded again: the new post shares
+    the existing file (and its variants). The response is sent once the
+    original is stored; responsive variants of new images are generated by a
+    background job afterwards and appear in the post's ``srcset``.
+    """
+    storage = get_storage()
+    blob, is_new = await acquire_blob(db, file, storage)
     
-    # Create database record with ImageKit URL and user association
+    # Create database record with the stored URL and user association
     new_post = Post(
-        url=upload_result.url,
+        url=blob.url,
         file_type=file.content_type or "unknown",
         file_name=file.filename,
         caption=caption,
-        user_id=current_user.id
+        user_id=current_user.id,
+        content_hash=blob.content_hash,
     )
+    if not is_new:
+        new_post.variants = await variants.copy_variants(db, blob.content_hash)
     
     db.add(new_post)
+    if not new_post.variants and variants.wants_variants(file.content_type):
+        await db.flush()
+        await variants.enqueue_post_images(db, new_post.id, file, stored_file(blob), storage)
     await db.commit()
+    jobs.job_worker.wake()
     await db.refresh(new_post)
+    await response_cache.invalidate(FEED_HEAD_TAG)
     
-    return {
-        "id": str(new_post.id),
-        "filename": new_post.file_name,
-        "file_type": new_post.file_type,
-        "url": new_post.url,
-        "caption": new_post.caption,
-        "created_at": new_post.created_at.isoformat(),
-        "user_id": str(new_post.user_id)
-    }
+    return post_payload(new_post)
+
 
+@app.post("/upload/batch", response_model=BatchUploadResponse, dependencies=[Depends(mark_recent_write)])
+async def upload_batch(
+    files: list[UploadFile] = File(...),
+    caption: str | None = Form(None),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
+):
+    """
+    Upload several files at once, creating one post per file. Requires authentication.
+
+    Files are stored concurrently (at most BATCH_UPLOAD_CONCURRENCY at a time)
+    and all posts are inserted in one transaction. A file that cannot be stored
+    does not fail the others: each file gets its own status in ``results``.
+    The optional caption applies to every post.
+    """
+    if len(files) > BATCH_UPLOAD_MAX_FILES:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {BATCH_UPLOAD_MAX_FILES} files can be uploaded at once",
+        )
+    
+    storage = get_storage()
+    blobs = await acquire_blobs(db, files, storage, BATCH_UPLOAD_CONCURRENCY)
+    existing_variants = await variants.shared_variants(
+        db, {blob.content_hash for blob in blobs if isinstance(blob, Blob)}
+    )
+    
+    # Loaded once so every post's payload can include its author
+    author = await db.get(User, current_user.id)
+    new_posts = {}
+    for index, (file, blob) in enumerate(zip(files, blobs)):
+        if isinstance(blob, Blob):
+            new_posts[index] = Post(
+                url=blob.url,
+                file_type=file.content_type or "unknown",
+                file_name=file.filename,
+                caption=caption,
+                user=author,
+                content_hash=blob.content_hash,
+                variants=variants.clone_variants(existing_variants.get(blob.content_hash, [])),
+            )
+    
+    # One flush inserts every post with a single multi-row INSERT ... RETURNING
+    db.add_all(new_posts.values())
+    await db.flush()
+    for index, post in new_posts.items():
+        if not post.variants and variants.wants_variants(files[index].content_type):
+            await variants.enqueue_post_images(db, post.id, files[index], stored_file(blobs[index]), storage)
+    await db.commit()
+    jobs.job_worker.wake()
+    if new_posts:
+        await response_cache.invalidate(FEED_HEAD_TAG)
+    
+    results = []
+    for index, (file, blob) in enumerate(zip(files, blobs)):
+        result = {"index": index, "filename": file.filename}
+        post = new_posts.get(index)
+        if post is not None:
+            result.update(status=status.HTTP_201_CREATED, item=post_payload(post))
+        elif isinstance(blob, HTTPException):
+            result.update(status=blob.status_code, error=blob.detail)
+        else:
+            logger.error("Batch upload of %r failed", file.filename, exc_info=blob)
+            result.update(status=status.HTTP_502_BAD_GATEWAY, error="Storing the file failed")
+        results.append(result)
+    
+    return {"results": results, "succeeded": len(new_posts), "failed": len(files) - len(new_posts)}
 
-@app.patch("/items/{item_id}")
+
+@app.patch("/items/{item_id}", response_model=PostResponse, dependencies=[Depends(mark_recent_write)])
 async def update_item(
     item_id: str,
     caption: str = Form(...),
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
     """Update a post's caption. Requires authentication and ownership."""
     try:
@@ -301,27 +645,27 @@ async def update_item(
         )
     
     post.caption = caption
+    # Incremented in SQL, so concurrent edits each count instead of conflicting
+    post.revision = Post.revision + 1
     await db.commit()
     await db.refresh(post)
+    await response_cache.invalidate(post_tag(post.id))
     
-    return {
-        "id": str(post.id),
-        "filename": post.file_name,
-        "file_type": post.file_type,
-        "url": post.url,
-        "caption": post.caption,
-        "created_at": post.created_at.isoformat(),
-        "user_id": str(post.user_id)
-    }
+    return post_payload(post)
 
 
-@app.delete("/items/{item_id}")
+@app.delete("/items/{item_id}", dependencies=[Depends(mark_recent_write)])
 async def delete_item(
     item_id: str,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
-    """Delete a specific post by ID. Requires authentication and ownership."""
+    """
+    Delete a specific post by ID. Requires authentication and ownership.
+
+    The stored file is removed by a background job, only when no other post
+    shares it; the post's variant files likewise.
+    """
     try:
         post_uuid = uuid.UUID(item_id)
     except ValueError:
@@ -340,7 +684,69 @@ async def delete_item(
             detail="You don't have permission to delete this post"
         )
     
+    variant_file_ids = [variant.file_id for variant in post.variants]
     await db.delete(post)
+    orphaned_blob = await release_blob(db, post.content_hash)
+    await enqueue_file_deletions(
+        db, [(post.id, post.content_hash, variant_file_ids)], [orphaned_blob] if orphaned_blob is not None else []
+    )
     await db.commit()
+    jobs.job_worker.wake()
+    await response_cache.invalidate(post_tag(post_uuid))
     
     return {"message": "Post deleted successfully", "id": str(post_uuid)}
+
+
+def _check_bulk_size(ids: list) -> list:
+    """Reject oversized bulk requests and drop repeated ids, keeping their order."""
+    if len(ids) > bulk.BULK_MAX_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {bulk.BULK_MAX_IDS} ids can be processed at once",
+        )
+    return list(dict.fromkeys(ids))
+
+
+@app.post("/items/bulk/caption", response_model=BulkResult, dependencies=[Depends(mark_recent_write)])
+async def bulk_update_captions(
+    payload: BulkCaptionUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
+):
+    """
+    Set the same caption on many posts. Requires authentication.
+
+    Only the caller's own posts are changed; the rest are listed in ``skipped``.
+    """
+    ids = _check_bulk_size(payload.ids)
+    updated = await bulk.update_captions(db, ids, current_user.id, payload.caption)
+    await db.commit()
+    if updated:
+        await response_cache.invalidate(*(post_tag(post_id) for post_id in updated))
+    
+    affected = set(updated)
+    return {"affected": [i for i in ids if i in affected], "skipped": [i for i in ids if i not in affected]}
+
+
+@app.post("/items/bulk/delete", response_model=BulkResult, dependencies=[Depends(mark_recent_write)])
+async def bulk_delete_items(
+    payload: BulkPostIds,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
+):
+    """
+    Delete many posts. Requires authentication.
+
+    Only the caller's own posts are deleted; the rest are listed in ``skipped``.
+    Stored files no other post shares are removed by a background job.
+    """
+    ids = _check_bulk_size(payload.ids)
+    deleted, deleted_files, orphaned = await bulk.delete_posts(db, ids, current_user.id)
+    await enqueue_file_deletions(db, deleted_files, orphaned)
+    await db.commit()
+    jobs.job_worker.wake()
+    if deleted:
+        await response_cache.invalidate(*(post_tag(post_id) for post_id in deleted))
+    
+    affected = set(deleted)
+    return {"affected": [i for i in ids if i in affected], "skipped": [i for i in ids if i not in affected]}
@@ -0,0 +1,245 @@
+"""Request, database and worker-pool instrumentation exposed in Prometheus format.
+
+Every request's latency is recorded per route. A sampled fraction of requests
+(``METRICS_SAMPLE_RATE``) is also followed into the database: engine event
+hooks count and time each statement against the request that issued it, and
+requests slower than ``SLOW_REQUEST_SECONDS`` are logged with their slowest
+SQL. Password hashing, upload and connection-pool checkout durations are
+recorded as they happen.
+
+Metrics are kept per worker process, like the other ``/metrics/*`` endpoints,
+and are only touched from the event loop thread, so no locking is needed.
+``METRICS_ENABLED=false`` turns all of it off.
+"""
+
+import bisect
+import heapq
+import logging
+import os
+import random
+import time
+from collections.abc import Iterable
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Fraction of requests whose database statements are counted, timed and kept for the slow log
+METRICS_SAMPLE_RATE = float(os.getenv("METRICS_SAMPLE_RATE", "1.0"))
+# Requests slower than this are logged (0 disables the slow-request log)
+SLOW_REQUEST_SECONDS = float(os.getenv("SLOW_REQUEST_SECONDS", "1.0"))
+# How many of a request's slowest statements the slow-request log shows
+SLOW_REQUEST_MAX_STATEMENTS = int(os.getenv("SLOW_REQUEST_MAX_STATEMENTS", "5"))
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+logger = logging.getLogger(__name__)
+
+
+class Histogram:
+    """A Prometheus histogram family: cumulative buckets, sum and count per label set."""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self.series: dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        if not METRICS_ENABLED:
+            return
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for label_values, (counts, total, count) in sorted(self.series.items()):
+            labels = [f'{key}="{_escape(value)}"' for key, value in zip(self.labels, label_values)]
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                bucket_labels = ",".join([*labels, f'le="{bound}"'])
+                yield f"{self.name}_bucket{{{bucket_labels}}} {cumulative}"
+            suffix = f"{{{','.join(labels)}}}" if labels else ""
+            yield f"{self.name}_sum{suffix} {total}"
+            yield f"{self.name}_count{suffix} {count}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+request_seconds = Histogram(
+    "app_request_duration_seconds", "HTTP request latency by route.", ("method", "route", "status")
+)
+request_db_statements = Histogram(
+    "app_request_db_statements", "Database statements per sampled request.", ("route",), COUNT_BUCKETS
+)
+request_db_seconds = Histogram(
+    "app_request_db_seconds", "Time spent in database statements per sampled request.", ("route",)
+)
+db_statement_seconds = Histogram(
+    "app_db_statement_seconds", "Latency of individual database statements in sampled requests."
+)
+pool_checkout_seconds = Histogram(
+    "app_db_pool_checkout_seconds", "Time spent waiting for a pooled database connection."
+)
+password_hash_seconds = Histogram(
+    "app_password_hash_seconds", "bcrypt hash and verify durations, excluding time queued."
+)
+upload_seconds = Histogram(
+    "app_upload_seconds", "Blocking upload work (storage pushes, file writes) on the upload pool, excluding time queued."
+)
+job_seconds = Histogram(
+    "app_job_duration_seconds", "Background job run time by kind and outcome.", ("kind", "outcome")
+)
+HISTOGRAMS = (
+    request_seconds, request_db_statements, request_db_seconds, db_statement_seconds,
+    pool_checkout_seconds, password_hash_seconds, upload_seconds, job_seconds,
+)
+
+
+@dataclass
+class RequestStats:
+    """Database work done by one sampled request."""
+    statements: int = 0
+    db_seconds: float = 0.0
+    # Min-heap of (seconds, sequence, sql) holding the slowest statements
+    slowest: list = field(default_factory=list)
+
+    def record(self, seconds: float, statement: str) -> None:
+        self.statements += 1
+        self.db_seconds += seconds
+        db_statement_seconds.observe(seconds)
+        if SLOW_REQUEST_SECONDS > 0 and SLOW_REQUEST_MAX_STATEMENTS > 0:
+            entry = (seconds, self.statements, statement)
+            if len(self.slowest) < SLOW_REQUEST_MAX_STATEMENTS:
+                heapq.heappush(self.slowest, entry)
+            elif seconds > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+
+
+_current_request: ContextVar[RequestStats | None] = ContextVar("current_request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_request.get() is not None:
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_request.get()
+    if stats is not None and conn.info.get("metrics_query_start"):
+        stats.record(time.perf_counter() - conn.info["metrics_query_start"].pop(), statement)
+
+
+def instrument_engine(engine) -> None:
+    """Attach statement timing hooks to an (async) engine."""
+    if METRICS_ENABLED:
+        sync_engine = getattr(engine, "sync_engine", engine)
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """The default async connection pool, recording how long each checkout waits."""
+
+    # Log as SQLAlchemy's own pool does, so its INFO chatter stays behind echo_pool
+    _sqla_logger_namespace = "sqlalchemy.pool.impl.AsyncAdaptedQueuePool"
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_checkout_seconds.observe(time.perf_counter() - start)
+
+
+def pool_status(pool) -> dict:
+    """Occupancy of a queue pool (empty for pools that do not track it)."""
+    if not hasattr(pool, "checkedout"):
+        return {}
+    return {"size": pool.size(), "checked_out": pool.checkedout(), "overflow": pool.overflow()}
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every request and following sampled ones into the database."""
+
+    def __init__(self, app, sample_rate: float = METRICS_SAMPLE_RATE, slow_seconds: float = SLOW_REQUEST_SECONDS):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestStats() if self.sample_rate >= 1 or random.random() < self.sample_rate else None
+        token = _current_request.set(stats)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_request.reset(token)
+            # Label by route template, not raw path, to keep the number of series bounded
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            request_seconds.observe(elapsed, scope["method"], route, status_code)
+            if stats is not None:
+                request_db_statements.observe(stats.statements, route)
+                request_db_seconds.observe(stats.db_seconds, route)
+            if self.slow_seconds > 0 and elapsed >= self.slow_seconds:
+                _log_slow_request(scope, status_code, elapsed, stats)
+
+
+def _log_slow_request(scope, status_code: int, elapsed: float, stats: RequestStats | None) -> None:
+    if stats is None:
+        logger.warning("Slow request: %s %s -> %s in %.3fs (not sampled)", scope["method"], scope["path"], status_code, elapsed)
+        return
+    statements = "".join(
+        f"\n  {seconds * 1000:.1f} ms: {' '.join(sql.split())}"
+        for seconds, _, sql in sorted(stats.slowest, reverse=True)
+    )
+    logger.warning(
+        "Slow request: %s %s -> %s in %.3fs, %d statements, %.3fs in the database%s",
+        scope["method"], scope["path"], status_code, elapsed, stats.statements, stats.db_seconds, statements,
+    )
+
+
+def render(gauges: dict[str, dict] | None = None) -> str:
+    """
+    Render every histogram in the Prometheus text format.
+
+    ``gauges`` adds snapshot values such as ``{"password_hash": pool.metrics()}``,
+    exported as ``app_password_hash_<key>``; non-numeric values are skipped.
+    """
+    lines = [line for histogram in HISTOGRAMS for line in histogram.render()]
+    for prefix, values in (gauges or {}).items():
+        for key, value in values.items():
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, (int, float)):
+                lines.append(f"# TYPE app_{prefix}_{key} gauge")
+                lines.append(f"app_{prefix}_{key} {value}")
+    return "\n".join(lines) + "\n"
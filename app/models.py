@@ -1,7 +1,6 @@
 """Database models."""
 
-from sqlalchemy import Column, String, DateTime, Boolean, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import JSON, Column, String, DateTime, Boolean, ForeignKey, Index, Integer, Uuid
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -14,7 +13,7 @@ class User(Base):
     
     __tablename__ = "users"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
     username = Column(String, unique=True, nullable=False, index=True)
     email = Column(String, unique=True, nullable=False, index=True)
     hashed_password = Column(String, nullable=False)
@@ -22,8 +21,9 @@ class User(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
-    # Relationship
-    posts = relationship("Post", back_populates="user")
+    # Relationship; a user's posts are only read a page at a time
+    # (see GET /users/{username}/posts), never loaded as a whole collection
+    posts = relationship("Post", back_populates="user", lazy="raise")
     
     def __repr__(self):
         return f"<User(id={self.id}, username={self.username})>"
@@ -34,16 +34,106 @@ class Post(Base):
     
     __tablename__ = "posts"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid.uuid4)
     url = Column(String, nullable=False)
     file_type = Column(String, nullable=False)
     file_name = Column(String, nullable=False)
     caption = Column(String, nullable=True)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=True)  # Nullable for existing posts
+    user_id = Column(Uuid(as_uuid=True), ForeignKey("users.id"), nullable=True)  # Nullable for existing posts
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=True)  # Null for posts created before tracking
+    # SHA-256 of the uploaded content; posts with the same content share one Blob
+    content_hash = Column(String(64), nullable=True, index=True)  # Null for posts created before deduplication
+    # Bumped (revision = revision + 1, in SQL) by every write that changes the payload; feeds the post's ETag
+    revision = Column(Integer, nullable=False, default=1, server_default="1")
     
-    # Relationship
-    user = relationship("User", back_populates="posts")
+    # Relationships
+    # Every payload includes the author, so it is joined into each posts query
+    user = relationship("User", back_populates="posts", lazy="joined", innerjoin=False)
+    # Loaded alongside posts in one extra query per result set, since every payload includes them
+    variants = relationship(
+        "PostVariant",
+        back_populates="post",
+        cascade="all, delete-orphan",
+        lazy="selectin",
+        order_by="PostVariant.width",
+    )
+    
+    # Composite index backing keyset pagination of the feed (newest first)
+    __table_args__ = (
+        Index("ix_posts_created_at_id", created_at.desc(), id),
+        # Backs per-user feeds (newest first) and user_id lookups
+        Index("ix_posts_user_id_created_at", user_id, created_at.desc(), id),
+    )
     
     def __repr__(self):
         return f"<Post(id={self.id}, file_name={self.file_name})>"
+
+
+class Blob(Base):
+    """A stored upload, shared by every post with the same content."""
+    
+    __tablename__ = "blobs"
+    
+    content_hash = Column(String(64), primary_key=True)
+    url = Column(String, nullable=False)
+    file_id = Column(String, nullable=False)
+    backend = Column(String, nullable=False)  # Storage backend name, e.g. "imagekit" or "local"
+    size = Column(Integer, nullable=False)
+    # Posts pointing at this blob; the stored file is deleted when it drops to zero
+    ref_count = Column(Integer, nullable=False, default=1)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    def __repr__(self):
+        return f"<Blob(content_hash={self.content_hash}, ref_count={self.ref_count})>"
+
+
+class PostVariant(Base):
+    """A resized rendition of a post's image, generated after upload."""
+    
+    __tablename__ = "post_variants"
+    
+    id = Column(Integer, primary_key=True)
+    post_id = Column(Uuid(as_uuid=True), ForeignKey("posts.id", ondelete="CASCADE"), nullable=False, index=True)
+    width = Column(Integer, nullable=False)
+    height = Column(Integer, nullable=False)
+    format = Column(String, nullable=False)  # "webp" or "jpeg"
+    url = Column(String, nullable=False)
+    file_id = Column(String, nullable=False)
+    
+    # Relationship
+    post = relationship("Post", back_populates="variants")
+    
+    def __repr__(self):
+        return f"<PostVariant(post_id={self.post_id}, width={self.width}, format={self.format})>"
+
+
+class Job(Base):
+    """A unit of background work, stored so it survives restarts; see app.jobs."""
+    
+    __tablename__ = "jobs"
+    
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)  # Name of the registered handler, e.g. "post_variants"
+    payload = Column(JSON, nullable=False)
+    # Enqueueing a job whose key is already taken does nothing
+    idempotency_key = Column(String, nullable=True, unique=True)
+    status = Column(String, nullable=False, default="pending")  # pending, running, done or failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    # When a pending job is due, or when a running job's lease runs out
+    run_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+    
+    # Backs claiming due jobs, oldest first
+    __table_args__ = (Index("ix_jobs_status_run_at", status, run_at),)
+    
+    @property
+    def is_last_attempt(self) -> bool:
+        """True while running the attempt after which a failure is final."""
+        return self.attempts >= self.max_attempts
+    
+    def __repr__(self):
+        return f"<Job(id={self.id}, kind={self.kind}, status={self.status})>"
@@ -0,0 +1,81 @@
+"""Keyset (cursor) pagination helpers for the posts feed."""
+
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, and_, or_
+
+from app.models import Post
+
+# Page size limits for GET /items/
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def encode_token(data: dict) -> str:
+    """Encode a small JSON-serializable position as an opaque cursor token."""
+    raw = json.dumps(data, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_token(cursor: str, parse):
+    """
+    Decode a cursor token and convert it with ``parse(data)``.
+
+    Malformed tokens, and tokens ``parse`` rejects with a ValueError, KeyError
+    or TypeError, become a 400 response.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return parse(json.loads(base64.urlsafe_b64decode(padded.encode())))
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def encode_cursor(created_at: datetime, post_id: uuid.UUID) -> str:
+    """Encode the (created_at, id) position of a post as an opaque cursor token."""
+    return encode_token({"c": created_at.isoformat(), "i": post_id.hex})
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Decode a cursor token back into its (created_at, id) position."""
+    return decode_token(cursor, lambda data: (datetime.fromisoformat(data["c"]), uuid.UUID(hex=data["i"])))
+
+
+def feed_order(query: Select) -> Select:
+    """Order a posts query newest first, matching the ix_posts_created_at_id index."""
+    return query.order_by(Post.created_at.desc(), Post.id.asc())
+
+
+def paginate_feed(query: Select, cursor: str | None, limit: int) -> Select:
+    """
+    Restrict a posts query to the page that follows ``cursor``.
+
+    One extra row is fetched so the caller can tell whether a next page exists
+    without running a COUNT over the whole table.
+    """
+    if cursor:
+        created_at, post_id = decode_cursor(cursor)
+        query = query.where(
+            or_(
+                Post.created_at < created_at,
+                and_(Post.created_at == created_at, Post.id > post_id),
+            )
+        )
+    return feed_order(query).limit(limit + 1)
+
+
+def split_page(posts: list[Post], limit: int) -> tuple[list[Post], str | None]:
+    """Trim the look-ahead row and return the page plus the next cursor, if any."""
+    if len(posts) <= limit:
+        return posts, None
+    page = posts[:limit]
+    last = page[-1]
+    return page, encode_cursor(last.created_at, last.id)
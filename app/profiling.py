@@ -0,0 +1,181 @@
+"""Opt-in sampling profiler for live requests.
+
+With ``PROFILING_ENABLED=true`` a middleware profiles a random
+``PROFILING_SAMPLE_RATE`` fraction of requests, plus any request sent with an
+``X-Profile: 1`` header by a user listed in ``PROFILING_ADMINS``. Profiling
+uses pyinstrument (``uv sync --extra profiling``) in async mode, so time spent
+awaiting the database, the hashing pool or an upload is attributed to the
+handler that awaited it rather than to the event loop.
+
+Each profile is written to ``PROFILING_DIR`` in speedscope's JSON format
+(open it at https://www.speedscope.app) with the route, status and timing
+under a ``metadata`` key. Only the newest ``PROFILING_MAX_FILES`` are kept.
+When profiling is disabled the middleware is not installed at all.
+"""
+
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from fastapi import Depends, HTTPException, status
+from fastapi.responses import FileResponse
+
+from app.auth import get_current_user, verify_token
+
+# pyinstrument itself is only imported once a request is profiled
+PROFILING_AVAILABLE = importlib.util.find_spec("pyinstrument") is not None
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+# Fraction of all requests profiled without being asked
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+# Usernames allowed to request profiles with the header and to download them
+PROFILING_ADMINS = frozenset(name.strip() for name in os.getenv("PROFILING_ADMINS", "").split(",") if name.strip())
+PROFILING_HEADER = "x-profile"
+PROFILING_DIR = Path(os.getenv("PROFILING_DIR", "./profiles"))
+PROFILING_MAX_FILES = int(os.getenv("PROFILING_MAX_FILES", "100"))
+# Sampling interval in seconds
+PROFILING_INTERVAL = float(os.getenv("PROFILING_INTERVAL", "0.001"))
+# Requests profiled at once per worker; further candidates run unprofiled
+PROFILING_MAX_CONCURRENT = int(os.getenv("PROFILING_MAX_CONCURRENT", "2"))
+
+PROFILE_SUFFIX = ".speedscope.json"
+
+logger = logging.getLogger(__name__)
+
+
+def _is_admin_request(scope) -> bool:
+    """True if the request asks to be profiled and carries an admin's bearer token."""
+    headers = dict(scope["headers"])
+    if headers.get(PROFILING_HEADER.encode()) != b"1":
+        return False
+    scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return False
+    try:
+        return verify_token(token).get("sub") in PROFILING_ADMINS
+    except HTTPException:
+        return False
+
+
+def _write_profile(session, metadata: dict, directory: Path, max_files: int) -> Path:
+    """Render a session as speedscope JSON and prune old profiles (runs in a worker thread)."""
+    from pyinstrument.renderers import SpeedscopeRenderer
+
+    document = json.loads(SpeedscopeRenderer().render(session))
+    document["name"] = f"{metadata['method']} {metadata['route']} ({metadata['duration_ms']:.0f} ms)"
+    document["metadata"] = metadata
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{metadata['id']}{PROFILE_SUFFIX}"
+    temp_path = path.with_suffix(".tmp")
+    temp_path.write_text(json.dumps(document))
+    temp_path.replace(path)
+
+    # Ids start with a timestamp, so name order is age order
+    profiles = sorted(directory.glob(f"*{PROFILE_SUFFIX}"))
+    for old in profiles[:max(len(profiles) - max_files, 0)]:
+        old.unlink(missing_ok=True)
+    return path
+
+
+class ProfilingMiddleware:
+    """ASGI middleware running sampled or admin-requested requests under pyinstrument."""
+
+    def __init__(
+        self,
+        app,
+        sample_rate: float = PROFILING_SAMPLE_RATE,
+        directory: Path = PROFILING_DIR,
+        max_files: int = PROFILING_MAX_FILES,
+        max_concurrent: int = PROFILING_MAX_CONCURRENT,
+    ):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.directory = Path(directory)
+        self.max_files = max_files
+        self.max_concurrent = max_concurrent
+        self.active = 0
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or self.active >= self.max_concurrent
+            or not (random.random() < self.sample_rate or _is_admin_request(scope))
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        from pyinstrument import Profiler
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        profiler = Profiler(interval=PROFILING_INTERVAL, async_mode="enabled")
+        self.active += 1
+        started_at = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            session = profiler.stop()
+            duration = time.perf_counter() - start
+            self.active -= 1
+            metadata = {
+                "id": f"{started_at:%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:8]}",
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(scope.get("route"), "path", None) or scope["path"],
+                "status": status_code,
+                "duration_ms": duration * 1000,
+                "started_at": started_at.isoformat(),
+            }
+            try:
+                await asyncio.to_thread(_write_profile, session, metadata, self.directory, self.max_files)
+            except Exception:
+                logger.exception("Could not save the profile of %s %s", scope["method"], scope["path"])
+
+
+async def require_profiling_admin(current_user=Depends(get_current_user)):
+    """Dependency for the profile endpoints: profiling must be on and the user an admin."""
+    if not (PROFILING_ENABLED and PROFILING_AVAILABLE):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profiling is not enabled")
+    if current_user.username not in PROFILING_ADMINS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed to read profiles")
+    return current_user
+
+
+def _read_metadata(directory: Path) -> list[dict]:
+    """Metadata of the stored profiles, newest first (runs in a worker thread)."""
+    entries = []
+    for path in sorted(directory.glob(f"*{PROFILE_SUFFIX}"), reverse=True):
+        try:
+            entries.append(json.loads(path.read_text())["metadata"])
+        except (OSError, ValueError, KeyError):
+            continue
+    return entries
+
+
+async def list_profiles() -> list[dict]:
+    """Metadata of the stored profiles, newest first."""
+    return await asyncio.to_thread(_read_metadata, PROFILING_DIR)
+
+
+def profile_response(profile_id: str) -> FileResponse:
+    """Serve one stored profile as a download."""
+    path = PROFILING_DIR / f"{profile_id}{PROFILE_SUFFIX}"
+    # Ids are generated by the middleware, so anything that is not a plain file name is rejected
+    if path.parent != PROFILING_DIR or not path.is_file():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    return FileResponse(path, media_type="application/json", filename=path.name)
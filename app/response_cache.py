@@ -0,0 +1,212 @@
+"""Cache of pre-serialized JSON bodies for the post read endpoints.
+
+Bodies are kept in a per-worker LRU and, when ``RESPONSE_CACHE_BACKEND=redis``,
+in a shared backend as well. Every entry is tagged with the posts it contains
+(``post:<id>``) and feed pages that start at the top of the feed are also
+tagged ``feed:head``, so writes only invalidate the keys they affect:
+
+- a new post invalidates ``feed:head`` (cursor pages never include it);
+- editing or deleting a post invalidates ``post:<id>``.
+
+Invalidation only reaches this worker's LRU and the shared tier. With several
+workers and no shared tier, each worker's entries live for
+``RESPONSE_CACHE_LOCAL_TTL`` rather than ``RESPONSE_CACHE_TTL``, which bounds
+how long another worker's write can go unseen.
+
+Concurrent misses for the same key are coalesced so only one request per
+worker rebuilds a cold entry. Entries keep their ETag/Last-Modified validators
+next to the body so conditional requests are answered without re-serializing.
+"""
+
+import asyncio
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, Iterable
+
+from app.cache import CacheBackend, MemoryCache, create_cache
+from app.serialization import dumps
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "2048"))
+# With a shared backend, or with several workers each holding its own memory
+# cache, other workers' writes only reach this worker's local copy through
+# expiry, so local entries are kept briefly
+RESPONSE_CACHE_LOCAL_TTL = float(os.getenv("RESPONSE_CACHE_LOCAL_TTL", "2"))
+# Worker processes serving the app; main.py sets it for the workers it starts
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+FEED_HEAD_TAG = "feed:head"
+
+
+def post_tag(post_id) -> str:
+    """Tag for every cached body that includes the given post."""
+    return f"post:{post_id}"
+
+
+@dataclass(frozen=True)
+class CachedBody:
+    """A serialized response body and its validators."""
+    body: bytes
+    etag: str | None = None
+    last_modified: datetime | None = None
+
+    def encode(self, tags: list[str]) -> bytes:
+        """Encode for the shared tier: a JSON header line, then the body."""
+        header = {
+            "tags": tags,
+            "etag": self.etag,
+            "last_modified": self.last_modified.isoformat() if self.last_modified else None,
+        }
+        return dumps(header) + b"\n" + self.body
+
+    @classmethod
+    def decode(cls, raw: bytes) -> tuple["CachedBody", list[str]]:
+        header_raw, _, body = raw.partition(b"\n")
+        header = json.loads(header_raw)
+        last_modified = header["last_modified"]
+        return cls(
+            body=body,
+            etag=header["etag"],
+            last_modified=datetime.fromisoformat(last_modified) if last_modified else None,
+        ), header["tags"]
+
+
+class ResponseCache:
+    """Two-tier cache of response bodies with tag invalidation and single-flight fills."""
+
+    def __init__(
+        self,
+        local: MemoryCache,
+        shared: CacheBackend | None = None,
+        ttl: float = RESPONSE_CACHE_TTL,
+        local_ttl: float | None = None,
+        enabled: bool = True,
+    ):
+        self.local = local
+        self.shared = shared
+        self.ttl = ttl
+        self.local_ttl = ttl if local_ttl is None else local_ttl
+        self.enabled = enabled
+        self._inflight: dict[str, asyncio.Future] = {}
+
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+
+    async def get_or_build(
+        self,
+        key: str,
+        build: Callable[[], Awaitable[tuple[CachedBody, Iterable[str]]]],
+    ) -> CachedBody:
+        """
+        Return the cached entry for ``key``, building it on a miss.
+
+        ``build`` returns the entry and the tags to store it under.
+        Exceptions from ``build`` (e.g. a 404) are not cached and are re-raised
+        in every request that was waiting on the same key.
+        """
+        if not self.enabled:
+            entry, _ = await build()
+            return entry
+
+        entry = self.local.get_nowait(key)
+        if entry is not None:
+            self.hits += 1
+            return entry
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            entry = await self._fill(key, build)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as exc:
+            future.set_exception(exc)
+            # Mark the exception retrieved when nobody else was waiting
+            future.exception()
+            raise
+        else:
+            future.set_result(entry)
+            return entry
+        finally:
+            del self._inflight[key]
+
+    async def _fill(self, key, build) -> CachedBody:
+        if self.shared is not None:
+            raw = await self.shared.get(key)
+            if raw is not None:
+                self.shared_hits += 1
+                entry, tags = CachedBody.decode(raw)
+                self.local.set_nowait(key, entry, self.local_ttl, tags)
+                return entry
+
+        self.misses += 1
+        generation = self.invalidations
+        entry, tags = await build()
+        if generation != self.invalidations:
+            # A write landed while this body was being built; it may already be stale
+            return entry
+        tags = list(tags)
+        self.local.set_nowait(key, entry, self.local_ttl, tags)
+        if self.shared is not None:
+            # The tags travel with the body so other workers can tag their local copy
+            await self.shared.set(key, entry.encode(tags), self.ttl, tags)
+        return entry
+
+    def is_cached(self, key: str) -> bool:
+        """Return True if this worker holds a live entry for ``key``."""
+        return self.enabled and key in self.local
+
+    async def invalidate(self, *tags: str) -> None:
+        """Drop every cached body stored under any of the given tags."""
+        self.invalidations += 1
+        self.local.invalidate_tags_nowait(*tags)
+        if self.shared is not None:
+            await self.shared.invalidate_tags(*tags)
+
+    def clear(self) -> None:
+        """Drop this worker's cached bodies."""
+        self.local.clear()
+
+    def metrics(self) -> dict:
+        """Return hit/miss counters."""
+        lookups = self.hits + self.shared_hits + self.misses + self.coalesced
+        return {
+            "enabled": self.enabled,
+            "backend": "memory" if self.shared is None else RESPONSE_CACHE_BACKEND,
+            "entries": len(self.local),
+            "hits": self.hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "invalidations": self.invalidations,
+            "hit_ratio": (lookups - self.misses) / lookups if lookups else 0.0,
+        }
+
+
+def _create_response_cache() -> ResponseCache:
+    shared = None
+    if RESPONSE_CACHE_BACKEND != "memory":
+        shared = create_cache(RESPONSE_CACHE_BACKEND, prefix="resp:")
+    return ResponseCache(
+        local=MemoryCache(maxsize=RESPONSE_CACHE_SIZE),
+        shared=shared,
+        ttl=RESPONSE_CACHE_TTL,
+        local_ttl=RESPONSE_CACHE_LOCAL_TTL if shared is not None or WEB_CONCURRENCY > 1 else None,
+        enabled=RESPONSE_CACHE_ENABLED,
+    )
+
+
+response_cache = _create_response_cache()
@@ -1,6 +1,6 @@
 """Pydantic schemas for request/response models."""
 
-from pydantic import BaseModel, EmailStr, Field, field_serializer
+from pydantic import AliasChoices, BaseModel, ConfigDict, EmailStr, Field, field_serializer
 from datetime import datetime
 from typing import Optional
 from uuid import UUID
@@ -39,3 +39,96 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     """Schema for token payload data."""
     username: Optional[str] = None
+
+
+class PostVariantResponse(BaseModel):
+    """Schema for one resized rendition of a post's image."""
+    model_config = ConfigDict(from_attributes=True)
+    
+    width: int
+    height: int
+    format: str
+    url: str
+
+
+class PostAuthor(BaseModel):
+    """Schema for the public details of a post's author."""
+    id: UUID
+    username: str
+
+
+class PostResponse(BaseModel):
+    """Schema for a post."""
+    model_config = ConfigDict(from_attributes=True, populate_by_name=True)
+    
+    id: UUID
+    filename: str = Field(validation_alias=AliasChoices("filename", "file_name"))
+    file_type: str
+    url: str
+    caption: Optional[str] = None
+    created_at: datetime
+    user_id: Optional[UUID] = None
+    author: Optional[PostAuthor] = None
+    variants: list[PostVariantResponse] = Field(default_factory=list, description="Resized renditions, smallest first")
+    srcset: dict[str, str] = Field(
+        default_factory=dict,
+        description='HTML srcset values keyed by format, e.g. {"webp": "/uploads/a.webp 320w, ..."}',
+    )
+
+
+class SearchHit(PostResponse):
+    """Schema for a post matching a search."""
+    highlights: dict[str, Optional[str]] = Field(
+        description="HTML-escaped 'caption' and 'filename' snippets with matches in <mark>, or null"
+    )
+
+
+class SearchPage(BaseModel):
+    """Schema for one page of search results, best match first."""
+    items: list[SearchHit]
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page; null on the last page")
+
+
+class UserFeedPage(BaseModel):
+    """Schema for one page of a user's posts."""
+    items: list[PostResponse]
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page; null on the last page")
+
+
+class FeedPage(BaseModel):
+    """Schema for one page of the posts feed."""
+    items: list[PostResponse]
+    total: int = Field(description="Number of items in this page")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page; null on the last page")
+
+
+class BatchUploadResult(BaseModel):
+    """Outcome of one file in a batch upload."""
+    index: int = Field(description="Position of the file in the request")
+    filename: Optional[str] = None
+    status: int = Field(description="HTTP status this file would have had on its own")
+    item: Optional[PostResponse] = None
+    error: Optional[str] = None
+
+
+class BatchUploadResponse(BaseModel):
+    """Schema for a batch upload: one result per file, in request order."""
+    results: list[BatchUploadResult]
+    succeeded: int
+    failed: int
+
+
+class BulkPostIds(BaseModel):
+    """Schema for a bulk operation on posts."""
+    ids: list[UUID] = Field(..., min_length=1)
+
+
+class BulkCaptionUpdate(BulkPostIds):
+    """Schema for setting the same caption on many posts."""
+    caption: Optional[str] = None
+
+
+class BulkResult(BaseModel):
+    """Which posts a bulk operation affected."""
+    affected: list[UUID] = Field(description="Posts that were changed")
+    skipped: list[UUID] = Field(description="Posts that do not exist or belong to another user")
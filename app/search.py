@@ -0,0 +1,217 @@
+"""Full-text search over post captions and file names.
+
+The index lives in the database so lookups stay fast as the posts table grows:
+
+- SQLite: an external-content FTS5 table, ``posts_fts``, kept in sync with
+  ``posts`` by triggers and ranked with bm25. It is keyed by the SQLite-only
+  ``posts.search_rowid`` column, which survives VACUUM.
+- PostgreSQL: a generated ``posts.search_vector`` tsvector column with a GIN
+  index, ranked with ts_rank_cd.
+
+Both are created, and backfilled from existing posts, whenever
+``Base.metadata.create_all`` runs (``init_db`` does this at startup).
+"""
+
+import html
+import re
+import uuid
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, and_, column, event, func, literal_column, or_, select, table, text
+
+from app.db import Base
+from app.models import Post
+from app.pagination import decode_token, encode_token
+
+# Page size limits for GET /search
+SEARCH_DEFAULT_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 50
+# Longer queries are truncated to this many terms
+SEARCH_MAX_TERMS = 16
+
+# Control characters mark matches in snippets; they are swapped for <mark>
+# after the rest of the snippet has been HTML-escaped
+MATCH_START, MATCH_END = "\x02", "\x03"
+
+# Words are letters, digits and underscores; everything else separates them
+TERM = re.compile(r"\w+")
+
+# Captions count more than file names when ranking
+CAPTION_WEIGHT, FILE_NAME_WEIGHT = 10.0, 1.0
+
+posts_fts = table("posts_fts", column("rowid"))
+
+# posts is keyed by a UUID, so its rowid is implicit and VACUUM may renumber it.
+# The index is keyed by posts.search_rowid instead: an explicit integer given to
+# each post once, by the insert trigger, and never changed.
+SQLITE_DDL = [
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_posts_search_rowid ON posts (search_rowid)",
+    "UPDATE posts SET search_rowid = rowid WHERE search_rowid IS NULL",
+    """
+    CREATE VIRTUAL TABLE posts_fts USING fts5(
+        caption, file_name,
+        content='posts', content_rowid='search_rowid',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER posts_fts_insert AFTER INSERT ON posts BEGIN
+        UPDATE posts SET search_rowid = (SELECT coalesce(max(search_rowid), 0) + 1 FROM posts)
+        WHERE rowid = new.rowid;
+        INSERT INTO posts_fts(rowid, caption, file_name)
+        SELECT search_rowid, caption, file_name FROM posts WHERE rowid = new.rowid;
+    END
+    """,
+    """
+    CREATE TRIGGER posts_fts_delete AFTER DELETE ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, caption, file_name)
+        VALUES ('delete', old.search_rowid, old.caption, old.file_name);
+    END
+    """,
+    """
+    CREATE TRIGGER posts_fts_update AFTER UPDATE OF caption, file_name ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, caption, file_name)
+        VALUES ('delete', old.search_rowid, old.caption, old.file_name);
+        INSERT INTO posts_fts(rowid, caption, file_name) VALUES (new.search_rowid, new.caption, new.file_name);
+    END
+    """,
+    # Index posts that existed before search was installed
+    "INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')",
+]
+
+# Indexes installed before search_rowid were keyed on the implicit rowid
+SQLITE_DROP_ROWID_INDEX = [
+    "DROP TRIGGER IF EXISTS posts_fts_insert",
+    "DROP TRIGGER IF EXISTS posts_fts_delete",
+    "DROP TRIGGER IF EXISTS posts_fts_update",
+    "DROP TABLE IF EXISTS posts_fts",
+]
+
+POSTGRESQL_DDL = [
+    """
+    ALTER TABLE posts ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(caption, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(file_name, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_posts_search_vector ON posts USING GIN (search_vector)",
+]
+
+
+@event.listens_for(Base.metadata, "after_create")
+def install_search(target, connection, **kw):
+    """Create the search index for the connection's dialect if it is missing."""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        installed = connection.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'posts_fts'")
+        ).scalar()
+        if installed is None or "search_rowid" not in installed:
+            columns = {row.name for row in connection.execute(text("PRAGMA table_info(posts)"))}
+            if "search_rowid" not in columns:
+                connection.execute(text("ALTER TABLE posts ADD COLUMN search_rowid INTEGER"))
+            for statement in SQLITE_DROP_ROWID_INDEX + SQLITE_DDL:
+                connection.execute(text(statement))
+    elif dialect == "postgresql":
+        for statement in POSTGRESQL_DDL:
+            connection.execute(text(statement))
+
+
+def search_terms(query: str) -> list[str]:
+    """Split a user query into plain search terms, dropping any query syntax."""
+    return [term.lower() for term in TERM.findall(query)][:SEARCH_MAX_TERMS]
+
+
+def encode_search_cursor(score: float, post_id: uuid.UUID) -> str:
+    """Encode the (score, id) position of a search hit as an opaque cursor token."""
+    return encode_token({"s": score, "i": post_id.hex})
+
+
+def decode_search_cursor(cursor: str) -> tuple[float, uuid.UUID]:
+    """Decode a search cursor back into its (score, id) position."""
+    return decode_token(cursor, lambda data: (float(data["s"]), uuid.UUID(hex=data["i"])))
+
+
+def _after(score, cursor: str | None):
+    """Keyset condition for hits ranked after the cursor (higher scores come first)."""
+    if not cursor:
+        return None
+    last_score, last_id = decode_search_cursor(cursor)
+    return or_(score < last_score, and_(score == last_score, Post.id > last_id))
+
+
+def _sqlite_query(terms: list[str], cursor: str | None, limit: int) -> Select:
+    # Every term must match; the last one also matches as a prefix, for search-as-you-type
+    match = " ".join(f'"{term}"' for term in terms) + "*"
+    fts = literal_column("posts_fts")
+    score = -func.bm25(fts, CAPTION_WEIGHT, FILE_NAME_WEIGHT)
+    query = (
+        select(
+            Post,
+            score.label("score"),
+            func.snippet(fts, 0, MATCH_START, MATCH_END, "…", 16).label("caption_snippet"),
+            func.snippet(fts, 1, MATCH_START, MATCH_END, "…", 16).label("file_name_snippet"),
+        )
+        .join_from(Post, posts_fts, literal_column("posts.search_rowid") == posts_fts.c.rowid)
+        .where(fts.op("MATCH")(match))
+    )
+    after = _after(score, cursor)
+    if after is not None:
+        query = query.where(after)
+    return query.order_by(score.desc(), Post.id).limit(limit + 1)
+
+
+def _postgresql_query(terms: list[str], cursor: str | None, limit: int) -> Select:
+    tsquery = func.to_tsquery("simple", " & ".join(terms[:-1] + [f"{terms[-1]}:*"]))
+    vector = literal_column("posts.search_vector")
+    score = func.ts_rank_cd(vector, tsquery)
+    ranked = select(Post.id, score.label("score")).where(vector.op("@@")(tsquery))
+    after = _after(score, cursor)
+    if after is not None:
+        ranked = ranked.where(after)
+    ranked = ranked.order_by(score.desc(), Post.id).limit(limit + 1).subquery()
+
+    # Headlines are costly, so they are only built for the rows on this page
+    options = f"StartSel={MATCH_START}, StopSel={MATCH_END}, MaxWords=20, MinWords=5"
+    return (
+        select(
+            Post,
+            ranked.c.score,
+            func.ts_headline("simple", func.coalesce(Post.caption, ""), tsquery, options).label("caption_snippet"),
+            func.ts_headline("simple", Post.file_name, tsquery, options).label("file_name_snippet"),
+        )
+        .join(ranked, Post.id == ranked.c.id)
+        .order_by(ranked.c.score.desc(), Post.id)
+    )
+
+
+def search_query(dialect: str, terms: list[str], cursor: str | None, limit: int) -> Select:
+    """
+    Build the ranked search query for one page of hits.
+
+    Rows are (post, score, caption_snippet, file_name_snippet), best match
+    first; one extra row is fetched to detect a next page.
+    """
+    if dialect == "sqlite":
+        return _sqlite_query(terms, cursor, limit)
+    if dialect == "postgresql":
+        return _postgresql_query(terms, cursor, limit)
+    raise HTTPException(
+        status_code=status.HTTP_501_NOT_IMPLEMENTED,
+        detail="Search is not supported on this database",
+    )
+
+
+def highlight(snippet: str | None) -> str | None:
+    """Return an HTML-safe snippet with matches in <mark>, or None if nothing matched."""
+    if not snippet or MATCH_START not in snippet:
+        return None
+    return html.escape(snippet).replace(MATCH_START, "<mark>").replace(MATCH_END, "</mark>")
+
+
+def split_hits(rows: list, limit: int) -> tuple[list, str | None]:
+    """Trim the look-ahead row and return the page of hits plus the next cursor, if any."""
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_search_cursor(page[-1].score, page[-1].Post.id)
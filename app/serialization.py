@@ -0,0 +1,67 @@
+"""Fast JSON serialization for post payloads.
+
+orjson is used when it is installed (``uv sync --extra speedups``): it encodes
+UUIDs and datetimes natively, so payloads can hold them as-is instead of
+converting every field to a string first. Without it the stdlib encoder is
+used with an equivalent fallback.
+"""
+
+import json
+import uuid
+from datetime import datetime
+
+from fastapi.responses import JSONResponse
+
+from app.models import Post
+
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as DefaultJSONResponse
+except ImportError:  # pragma: no cover - exercised when the extra is not installed
+    orjson = None
+    DefaultJSONResponse = JSONResponse
+
+ORJSON_AVAILABLE = orjson is not None
+
+
+def _json_default(value):
+    """Encode the types orjson handles natively for the stdlib encoder."""
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload) -> bytes:
+    """Serialize a response payload to compact JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":"), default=_json_default).encode()
+
+
+def srcset(variants, image_format: str) -> str:
+    """Build an HTML ``srcset`` value from a post's variants in one format."""
+    return ", ".join(f"{variant.url} {variant.width}w" for variant in variants if variant.format == image_format)
+
+
+def post_payload(post: Post) -> dict:
+    """Return the public JSON shape of a post (see schemas.PostResponse)."""
+    variants = post.variants
+    formats = dict.fromkeys(variant.format for variant in variants)
+    author = post.user
+    return {
+        "id": post.id,
+        "filename": post.file_name,
+        "file_type": post.file_type,
+        "url": post.url,
+        "caption": post.caption,
+        "created_at": post.created_at,
+        "user_id": post.user_id,
+        "author": {"id": author.id, "username": author.username} if author is not None else None,
+        "variants": [
+            {"width": variant.width, "height": variant.height, "format": variant.format, "url": variant.url}
+            for variant in variants
+        ],
+        "srcset": {image_format: srcset(variants, image_format) for image_format in formats},
+    }
@@ -0,0 +1,227 @@
+"""In-memory, precompressed frontend assets.
+
+The frontend is small, so at startup every page and every file under
+``frontend/css`` and ``frontend/js`` is read once, fingerprinted and
+compressed with gzip and, when the optional ``brotli`` package is installed
+(``uv sync --extra speedups``), brotli. Requests are then answered from memory
+without touching the filesystem.
+
+References between assets are rewritten to fingerprinted URLs such as
+``/frontend/js/api.3f2a9c1b7d4e.js``: pages point at fingerprinted scripts
+and stylesheets, and scripts import fingerprinted modules. Fingerprinted URLs
+change whenever their content (or anything they import) changes, so they are
+served as immutable. Pages and plain asset URLs are revalidated with an ETag.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from fastapi import Request, Response
+
+from app.conditional import is_not_modified
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the optional extra
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+FRONTEND_DIR = Path(__file__).resolve().parent.parent / "frontend"
+FRONTEND_URL_PREFIX = "/frontend"
+# Directories under FRONTEND_DIR whose files are served as assets
+ASSET_DIRS = ("css", "js")
+# Re-read the frontend when its files change (for development); costs a stat per file per request
+STATIC_RELOAD = os.getenv("STATIC_RELOAD", "false").lower() in ("1", "true", "yes")
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "application/json", "image/svg+xml")
+# Preferred encodings, best first
+ENCODINGS = ("br", "gzip")
+
+# Relative module specifiers in import/export statements, e.g. from './api.js'
+JS_IMPORT = re.compile(r"""(\bfrom\s*|\bimport\s*\(?\s*)(['"])(\.{1,2}/[^'"]+)\2""")
+# Absolute frontend URLs in pages, with any cache-busting query string
+PAGE_ASSET_URL = re.compile(re.escape(FRONTEND_URL_PREFIX) + r"""/([^'"\s?#>]+)(\?[^'"\s#>]*)?""")
+
+
+@dataclass
+class Asset:
+    """One file held in memory with its precompressed encodings."""
+    content: bytes
+    media_type: str
+    etag: str
+    fingerprint: str
+    encoded: dict[str, bytes] = field(default_factory=dict)
+
+    def representation(self, accept_encoding: str) -> tuple[bytes, str | None]:
+        """Pick the best encoding the client accepts."""
+        accepted = _accepted_encodings(accept_encoding)
+        for encoding in ENCODINGS:
+            if encoding in self.encoded and encoding in accepted:
+                return self.encoded[encoding], encoding
+        return self.content, None
+
+
+def _accepted_encodings(header: str) -> set[str]:
+    """Parse Accept-Encoding into the set of codings with a non-zero q-value."""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.strip().lower())
+    if "*" in accepted:
+        accepted.update(ENCODINGS)
+    return accepted
+
+
+def _media_type(path: str) -> str:
+    if path.endswith(".js"):
+        return "application/javascript"
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+
+def _make_asset(content: bytes, path: str) -> Asset:
+    media_type = _media_type(path)
+    fingerprint = hashlib.sha256(content).hexdigest()[:12]
+    asset = Asset(content, media_type, f'"{fingerprint}"', fingerprint)
+    if media_type.startswith(COMPRESSIBLE_TYPES):
+        candidates = {"gzip": gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            candidates["br"] = brotli.compress(content, quality=11)
+        # Tiny files can grow when compressed; those are only sent as-is
+        asset.encoded = {name: data for name, data in candidates.items() if len(data) < len(content)}
+    return asset
+
+
+def fingerprinted_name(path: str, fingerprint: str) -> str:
+    """Insert a fingerprint before the extension: js/api.js -> js/api.<fingerprint>.js."""
+    stem, ext = posixpath.splitext(path)
+    return f"{stem}.{fingerprint}{ext}"
+
+
+class StaticSite:
+    """The frontend's pages and assets, loaded into memory."""
+
+    def __init__(self, root: Path = FRONTEND_DIR, reload: bool = STATIC_RELOAD):
+        self.root = Path(root)
+        self.reload = reload
+        self.pages: dict[str, Asset] = {}
+        # Keyed by path relative to the frontend root, both plain and fingerprinted
+        self.assets: dict[str, tuple[Asset, bool]] = {}
+        self._loaded_mtimes: dict[Path, float] | None = None
+
+    def _source_files(self) -> list[Path]:
+        files = sorted(self.root.glob("*.html"))
+        for directory in ASSET_DIRS:
+            files.extend(sorted(p for p in (self.root / directory).rglob("*") if p.is_file()))
+        return files
+
+    def load(self) -> None:
+        """Read, rewrite, fingerprint and compress every page and asset."""
+        files = self._source_files() if self.root.exists() else []
+        sources = {p.relative_to(self.root).as_posix(): p.read_bytes() for p in files}
+        final_paths: dict[str, str] = {}
+        built: dict[str, Asset] = {}
+
+        def build(path: str, visiting: frozenset = frozenset()) -> Asset:
+            # Modules are built after their imports so fingerprints cover the whole graph
+            if path in built:
+                return built[path]
+            content = sources[path]
+            if path.endswith(".js") and path not in visiting:
+                def rewrite(match):
+                    target = posixpath.normpath(posixpath.join(posixpath.dirname(path), match.group(3)))
+                    if target not in sources or target in visiting:
+                        return match.group(0)
+                    dependency = build(target, visiting | {path})
+                    relative = posixpath.relpath(fingerprinted_name(target, dependency.fingerprint), posixpath.dirname(path))
+                    if not relative.startswith("."):
+                        relative = "./" + relative
+                    return f"{match.group(1)}{match.group(2)}{relative}{match.group(2)}"
+                content = JS_IMPORT.sub(rewrite, content.decode()).encode()
+            asset = _make_asset(content, path)
+            built[path] = asset
+            final_paths[path] = fingerprinted_name(path, asset.fingerprint)
+            return asset
+
+        assets = {}
+        for path in sources:
+            if path.endswith(".html") and "/" not in path:
+                continue
+            asset = build(path)
+            assets[path] = (asset, False)
+            assets[final_paths[path]] = (asset, True)
+
+        def rewrite_page_url(match):
+            path = match.group(1)
+            if path in final_paths:
+                return f"{FRONTEND_URL_PREFIX}/{final_paths[path]}"
+            return match.group(0)
+
+        pages = {}
+        for path, content in sources.items():
+            if path.endswith(".html") and "/" not in path:
+                pages[path] = _make_asset(PAGE_ASSET_URL.sub(rewrite_page_url, content.decode()).encode(), path)
+
+        self.pages, self.assets = pages, assets
+        self._loaded_mtimes = self._mtimes()
+
+    def _mtimes(self) -> dict[Path, float]:
+        if not self.reload or not self.root.exists():
+            return {}
+        return {p: p.stat().st_mtime for p in self._source_files()}
+
+    def ensure_loaded(self) -> None:
+        """Load on first use, and again after edits when reloading is enabled."""
+        if self._loaded_mtimes is None or (self.reload and self._mtimes() != self._loaded_mtimes):
+            self.load()
+
+    def page(self, name: str) -> Asset | None:
+        self.ensure_loaded()
+        return self.pages.get(name)
+
+    def asset(self, path: str) -> tuple[Asset, bool] | None:
+        """Return an asset and whether ``path`` was its fingerprinted URL."""
+        self.ensure_loaded()
+        return self.assets.get(path)
+
+    def url_for(self, path: str) -> str:
+        """Fingerprinted URL of an asset, e.g. url_for("js/api.js")."""
+        asset, _ = self.asset(path)
+        return f"{FRONTEND_URL_PREFIX}/{fingerprinted_name(path, asset.fingerprint)}"
+
+
+def serve(request: Request, asset: Asset, immutable: bool = False) -> Response:
+    """Respond with the best encoding of an asset, or 304 if the client's copy is current."""
+    body, encoding = asset.representation(request.headers.get("accept-encoding", ""))
+    # Encoded bodies differ byte-for-byte, so they carry the weak form of the validator
+    etag = asset.etag if encoding is None else f"W/{asset.etag}"
+    headers = {
+        "ETag": etag,
+        "Cache-Control": IMMUTABLE if immutable else REVALIDATE,
+        "Vary": "Accept-Encoding",
+    }
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    if is_not_modified(request, asset.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=asset.media_type, headers=headers)
+
+
+static_site = StaticSite()
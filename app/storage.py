@@ -0,0 +1,193 @@
+"""Pluggable storage backends for uploaded files.
+
+The backend is chosen with the ``STORAGE_BACKEND`` environment variable:
+
+- ``imagekit`` (default): files are pushed to ImageKit and served from its CDN.
+- ``local``: files are written content-addressed into ``UPLOAD_DIR`` and served
+  by the app itself under ``/uploads/``.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+
+from fastapi import UploadFile
+
+from app.images import delete_from_imagekit, run_in_upload_pool, upload_bytes_to_imagekit, upload_to_imagekit
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "imagekit")
+UPLOAD_DIR = Path(os.getenv("UPLOAD_DIR", Path(__file__).resolve().parent.parent / "uploads"))
+UPLOAD_URL_PREFIX = "/uploads"
+
+# Chunk size used when streaming uploads to disk
+CHUNK_SIZE = 1024 * 1024
+
+# Local uploads are served from the app's own origin, so only these extensions are
+# kept on stored names and served inline. Anything else (HTML, SVG, ...) could run
+# script there: it is stored without an extension and only served as a download.
+MEDIA_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".avif": "image/avif",
+    ".mp4": "video/mp4",
+    ".m4v": "video/mp4",
+    ".mov": "video/quicktime",
+    ".webm": "video/webm",
+}
+
+# Content-addressed names are a SHA-256 hex digest plus the original extension, if allowed
+CONTENT_ADDRESSED_NAME = re.compile(r"^[0-9a-f]{64}(\.[A-Za-z0-9]+)?$")
+
+
+@dataclass
+class StoredFile:
+    """Where a stored upload ended up."""
+    url: str
+    file_id: str
+
+
+class StorageBackend(ABC):
+    """Interface every storage backend implements."""
+
+    name: str
+
+    @abstractmethod
+    async def save(self, file: UploadFile) -> StoredFile:
+        """Persist an uploaded file and return its public location."""
+
+    @abstractmethod
+    async def save_bytes(self, data: bytes, file_name: str) -> StoredFile:
+        """Persist content generated by the app (such as image variants)."""
+
+    @abstractmethod
+    async def delete(self, file_id: str) -> None:
+        """Remove a stored file; files that are already gone are ignored."""
+
+    def local_path(self, stored: StoredFile) -> Path | None:
+        """Return the on-disk path of a stored file if this backend keeps one."""
+        return None
+
+
+class ImageKitStorage(StorageBackend):
+    """Store uploads on ImageKit."""
+
+    name = "imagekit"
+
+    async def save(self, file: UploadFile) -> StoredFile:
+        result = await upload_to_imagekit(file)
+        return StoredFile(url=result.url, file_id=result.file_id)
+
+    async def save_bytes(self, data: bytes, file_name: str) -> StoredFile:
+        result = await upload_bytes_to_imagekit(data, file_name)
+        return StoredFile(url=result.url, file_id=result.file_id)
+
+    async def delete(self, file_id: str) -> None:
+        await delete_from_imagekit(file_id)
+
+
+class LocalStorage(StorageBackend):
+    """Store uploads on the local filesystem, named by the SHA-256 of their content."""
+
+    name = "local"
+
+    def __init__(self, root: Path = UPLOAD_DIR, url_prefix: str = UPLOAD_URL_PREFIX):
+        self.root = Path(root)
+        self.url_prefix = url_prefix
+
+    def _write_blocking(self, file: UploadFile) -> str:
+        """Stream the upload to disk while hashing it (runs in a worker thread)."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        suffix = media_suffix(file.filename)
+        hasher = hashlib.sha256()
+
+        with tempfile.NamedTemporaryFile(dir=self.root, prefix=".upload-", delete=False) as temp_file:
+            temp_path = temp_file.name
+            while chunk := file.file.read(CHUNK_SIZE):
+                hasher.update(chunk)
+                temp_file.write(chunk)
+
+        name = f"{hasher.hexdigest()}{suffix}"
+        final_path = self.root / name
+        if final_path.exists():
+            # Identical content is already stored; keep the existing file
+            os.remove(temp_path)
+        else:
+            os.replace(temp_path, final_path)
+        return name
+
+    def _write_bytes_blocking(self, data: bytes, file_name: str) -> str:
+        """Write generated content under its content-addressed name (runs in a worker thread)."""
+        self.root.mkdir(parents=True, exist_ok=True)
+        name = f"{hashlib.sha256(data).hexdigest()}{media_suffix(file_name)}"
+        final_path = self.root / name
+        if not final_path.exists():
+            with tempfile.NamedTemporaryFile(dir=self.root, prefix=".upload-", delete=False) as temp_file:
+                temp_file.write(data)
+            os.replace(temp_file.name, final_path)
+        return name
+
+    async def save(self, file: UploadFile) -> StoredFile:
+        name = await run_in_upload_pool(self._write_blocking, file)
+        return StoredFile(url=f"{self.url_prefix}/{name}", file_id=name)
+
+    async def save_bytes(self, data: bytes, file_name: str) -> StoredFile:
+        name = await run_in_upload_pool(self._write_bytes_blocking, data, file_name)
+        return StoredFile(url=f"{self.url_prefix}/{name}", file_id=name)
+
+    async def delete(self, file_id: str) -> None:
+        path = self.resolve(file_id)
+        if path is not None:
+            await run_in_upload_pool(self._remove_blocking, path)
+
+    @staticmethod
+    def _remove_blocking(path: Path) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def local_path(self, stored: StoredFile) -> Path | None:
+        return self.resolve(stored.file_id)
+
+    def resolve(self, name: str) -> Path | None:
+        """Return the on-disk path for a served file name, or None if it is not servable."""
+        path = (self.root / name).resolve()
+        if path.parent != self.root.resolve() or path.name.startswith("."):
+            return None
+        return path
+
+
+BACKENDS = {
+    ImageKitStorage.name: ImageKitStorage,
+    LocalStorage.name: LocalStorage,
+}
+
+
+@lru_cache
+def get_storage() -> StorageBackend:
+    """Return the configured storage backend."""
+    try:
+        return BACKENDS[STORAGE_BACKEND]()
+    except KeyError:
+        raise ValueError(
+            f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}; expected one of {sorted(BACKENDS)}"
+        )
+
+
+def media_suffix(file_name: str | None) -> str:
+    """Return the lower-cased extension of a file name if it is an allowed image or video type, else ''."""
+    suffix = os.path.splitext(file_name or "")[1].lower()
+    return suffix if suffix in MEDIA_TYPES else ""
+
+
+def is_content_addressed(name: str) -> bool:
+    """Return True if a stored file name is derived from its content (and so never changes)."""
+    return bool(CONTENT_ADDRESSED_NAME.match(name))
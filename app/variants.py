@@ -0,0 +1,238 @@
+"""Background generation of responsive image variants.
+
+Uploads return as soon as the original is stored and its post committed,
+together with a ``post_variants`` job (see app.jobs). The job decodes the
+image once on a process pool and re-encodes it at each width in
+``IMAGE_VARIANT_WIDTHS`` and each format in ``IMAGE_VARIANT_FORMATS`` (metadata
+stripped). The renditions go to the active storage backend and are recorded as
+``PostVariant`` rows; the post's revision is bumped so cached bodies and ETags
+pick them up.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from fastapi import UploadFile
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import db, jobs
+from app.blobs import DELETE_FILES_JOB
+from app.images import run_in_upload_pool
+from app.imaging import FORMATS, IMAGING_AVAILABLE, generate_variants
+from app.models import Job, Post, PostVariant
+from app.response_cache import post_tag, response_cache
+from app.storage import StorageBackend, StoredFile, get_storage
+
+IMAGE_VARIANT_WIDTHS = [int(width) for width in os.getenv("IMAGE_VARIANT_WIDTHS", "320,640,1280").split(",") if width.strip()]
+IMAGE_VARIANT_FORMATS = [name.strip() for name in os.getenv("IMAGE_VARIANT_FORMATS", "webp,jpeg").split(",") if name.strip()]
+# Resizing holds the GIL for long stretches, so it runs in processes by default
+IMAGE_PROCESS_POOL = os.getenv("IMAGE_PROCESS_POOL", "process")
+IMAGE_PROCESS_WORKERS = int(os.getenv("IMAGE_PROCESS_WORKERS", str(min(2, os.cpu_count() or 1))))
+
+logger = logging.getLogger(__name__)
+
+for _name in IMAGE_VARIANT_FORMATS:
+    if _name not in FORMATS:
+        raise ValueError(f"Unknown IMAGE_VARIANT_FORMATS entry {_name!r}; expected some of {sorted(FORMATS)}")
+
+_executor: Executor | None = None
+
+
+def image_executor() -> Executor:
+    """Create the image processing pool on first use."""
+    global _executor
+    if _executor is None:
+        if IMAGE_PROCESS_POOL == "process":
+            # Workers are spawned rather than forked from a process running an event loop
+            _executor = ProcessPoolExecutor(
+                max_workers=IMAGE_PROCESS_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        elif IMAGE_PROCESS_POOL == "thread":
+            _executor = ThreadPoolExecutor(max_workers=IMAGE_PROCESS_WORKERS, thread_name_prefix="image")
+        else:
+            raise ValueError(f"Unknown IMAGE_PROCESS_POOL {IMAGE_PROCESS_POOL!r}; expected 'process' or 'thread'")
+    return _executor
+
+
+def shutdown() -> None:
+    """Stop the image processing pool."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def wants_variants(content_type: str | None) -> bool:
+    """Return True if uploads of this type get responsive variants."""
+    return IMAGING_AVAILABLE and bool(content_type) and content_type.startswith("image/")
+
+
+def _spool_blocking(file: UploadFile) -> str:
+    """Copy an upload to a temporary file for processing after the request ends (runs in a worker thread)."""
+    file.file.seek(0)
+    with tempfile.NamedTemporaryFile(delete=False, prefix="variant-source-") as temp_file:
+        shutil.copyfileobj(file.file, temp_file)
+    return temp_file.name
+
+
+async def source_for_processing(file: UploadFile, stored: StoredFile, storage: StorageBackend) -> tuple[str, bool]:
+    """
+    Return a local path the image can be decoded from, and whether it is a temporary copy.
+
+    The request's upload file is closed once the response is sent, so backends
+    that keep no local copy get one spooled to a temporary file.
+    """
+    path = storage.local_path(stored)
+    if path is not None:
+        return str(path), False
+    return await run_in_upload_pool(_spool_blocking, file), True
+
+
+def clone_variants(variants: list[PostVariant]) -> list[PostVariant]:
+    """Copy variant rows for another post that shares the same stored content."""
+    return [
+        PostVariant(width=v.width, height=v.height, format=v.format, url=v.url, file_id=v.file_id)
+        for v in variants
+    ]
+
+
+async def shared_variants(db: AsyncSession, content_hashes) -> dict[str, list[PostVariant]]:
+    """
+    Return existing variants for each content hash, taken from one post per hash.
+
+    Identical uploads share their stored files, so their renditions can be
+    shared too instead of being generated again.
+    """
+    content_hashes = list(content_hashes)
+    if not content_hashes:
+        return {}
+    result = await db.execute(
+        select(PostVariant, Post.content_hash)
+        .join(Post)
+        .where(Post.content_hash.in_(content_hashes))
+        .order_by(PostVariant.post_id, PostVariant.width)
+    )
+    by_hash: dict[str, list[PostVariant]] = {}
+    source_post = {}
+    for variant, content_hash in result:
+        if source_post.setdefault(content_hash, variant.post_id) == variant.post_id:
+            by_hash.setdefault(content_hash, []).append(variant)
+    return by_hash
+
+
+async def copy_variants(db: AsyncSession, content_hash: str) -> list[PostVariant]:
+    """Return copies of the variants of another post with the same content."""
+    return clone_variants((await shared_variants(db, [content_hash])).get(content_hash, []))
+
+
+async def process_post_images(post_id, source_path: str, file_name: str) -> None:
+    """
+    Generate, store and record a post's variants.
+
+    Stored renditions that end up unrecorded, because the post was deleted
+    meanwhile or a later step failed, are queued for deletion, as are those
+    of an earlier run that this one replaces.
+    """
+    loop = asyncio.get_running_loop()
+    rendered = await loop.run_in_executor(
+        image_executor(), generate_variants, source_path, IMAGE_VARIANT_WIDTHS, IMAGE_VARIANT_FORMATS
+    )
+
+    storage = get_storage()
+    stem = Path(file_name or "image").stem
+    rows = []
+    try:
+        for variant in rendered:
+            stored = await storage.save_bytes(variant.data, f"{stem}-{variant.width}w{variant.extension}")
+            rows.append(PostVariant(
+                width=variant.width,
+                height=variant.height,
+                format=variant.format,
+                url=stored.url,
+                file_id=stored.file_id,
+            ))
+
+        async with db.AsyncSessionLocal() as session:
+            post = await session.get(Post, post_id)
+            if post is None:
+                # Deleted while its variants were being generated
+                await _enqueue_discard(session, storage, [row.file_id for row in rows])
+                await session.commit()
+                return
+            replaced = [variant.file_id for variant in post.variants]
+            post.variants = rows
+            # Bumping the revision changes the post's ETag along with its payload
+            post.revision = Post.revision + 1
+            post.updated_at = datetime.utcnow()
+            await _enqueue_discard(session, storage, replaced)
+            await session.commit()
+    except BaseException:
+        # Interrupted (and so requeued) jobs are covered too, since a rerun stores new files
+        await _discard_after_failure(storage, [row.file_id for row in rows])
+        raise
+    await response_cache.invalidate(post_tag(post_id))
+
+
+async def _enqueue_discard(session: AsyncSession, storage: StorageBackend, file_ids: list[str]) -> None:
+    """Queue removal of variant files; the job keeps any another post's variants still use."""
+    if file_ids:
+        await jobs.enqueue(session, DELETE_FILES_JOB, {"backend": storage.name, "file_ids": file_ids})
+
+
+async def _discard_after_failure(storage: StorageBackend, file_ids: list[str]) -> None:
+    if not file_ids:
+        return
+    try:
+        async with db.AsyncSessionLocal() as session:
+            await _enqueue_discard(session, storage, file_ids)
+            await session.commit()
+    except Exception:
+        # An orphaned file only costs storage; the job's own error matters more
+        logger.exception("Could not queue removal of %d unrecorded variant file(s)", len(file_ids))
+
+
+VARIANTS_JOB = "post_variants"
+
+
+async def enqueue_post_images(
+    session: AsyncSession, post_id, file: UploadFile, stored: StoredFile, storage: StorageBackend
+) -> None:
+    """Queue variant generation for a new post, in the transaction that creates it."""
+    source_path, is_temporary = await source_for_processing(file, stored, storage)
+    await jobs.enqueue(
+        session,
+        VARIANTS_JOB,
+        {"post_id": str(post_id), "source_path": source_path, "file_name": file.filename, "remove_source": is_temporary},
+        idempotency_key=f"{VARIANTS_JOB}:{post_id}",
+    )
+
+
+@jobs.handler(VARIANTS_JOB)
+async def post_variants_job(job: Job) -> None:
+    """Run ``process_post_images`` for a queued upload; a spooled source is kept until the last attempt."""
+    payload = job.payload
+    try:
+        await process_post_images(uuid.UUID(payload["post_id"]), payload["source_path"], payload["file_name"])
+    except Exception:
+        if job.is_last_attempt:
+            _remove_source(payload)
+        raise
+    _remove_source(payload)
+
+
+def _remove_source(payload: dict) -> None:
+    if payload["remove_source"]:
+        try:
+            os.remove(payload["source_path"])
+        except OSError:
+            pass
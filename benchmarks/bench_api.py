@@ -0,0 +1,424 @@
+"""Load benchmark: throughput and tail latency of the API hot paths.
+
+Seeds a scratch SQLite database with --posts posts spread over --users users,
+starts the app under uvicorn in a child process with ImageKit replaced by a
+local stub (nothing touches the network), then drives GET /items/,
+GET /items/{id}, POST /auth/login, GET /auth/me and POST /upload with
+--concurrency concurrent clients. Each endpoint runs on its own for
+--duration seconds after a --warmup, or all of them together with --mixed.
+
+req/s and p50/p95/p99 latency are printed per endpoint and written as JSON
+(--output, by default under benchmarks/results/) together with the commit and
+settings, so runs on different commits can be compared with --compare.
+
+Usage:
+    uv run python benchmarks/bench_api.py [--posts 10000] [--users 100] [--concurrency 32] [--duration 10]
+    uv run python benchmarks/bench_api.py --db /tmp/bench.db --posts 1000000   # seeds once, reused afterwards
+    uv run python benchmarks/bench_api.py --mixed --endpoints feed,item,me
+    uv run python benchmarks/bench_api.py --compare benchmarks/results/<earlier run>.json --max-regression 10
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.environ.setdefault("IMAGEKIT_PRIVATE_KEY", "bench")
+os.environ.setdefault("IMAGEKIT_PUBLIC_KEY", "bench")
+os.environ.setdefault("IMAGEKIT_URL_ENDPOINT", "https://ik.imagekit.io/bench")
+
+RESULTS_DIR = ROOT / "benchmarks" / "results"
+PASSWORD = "bench-password"
+SEED_CHUNK = 10_000
+
+
+class StubImageKit:
+    """Stands in for the ImageKit client: consumes the upload, waits --stub-latency, returns a fake URL."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+
+    def upload_file(self, file, file_name, options=None):
+        if hasattr(file, "read"):
+            file.read()
+        if self.latency:
+            time.sleep(self.latency)
+        file_id = uuid.uuid4().hex
+        return SimpleNamespace(url=f"https://ik.imagekit.io/bench/{file_id}/{file_name}", file_id=file_id)
+
+    def delete_file(self, file_id):
+        return None
+
+
+# ============ Server ============
+
+def serve(port: int, stub_latency: float):
+    """Run the app with the ImageKit stub (the child process started by start_server)."""
+    import uvicorn
+
+    from app import images
+    images.imagekit = StubImageKit(stub_latency)
+
+    from app.main import app
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, stub_latency: float) -> subprocess.Popen:
+    command = [sys.executable, __file__, "--serve", "--port", str(port), "--stub-latency", str(stub_latency)]
+    return subprocess.Popen(command, cwd=ROOT, env=os.environ.copy())
+
+
+async def wait_until_ready(client, server: subprocess.Popen, timeout: float = 60):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f"server exited with status {server.returncode}")
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise SystemExit("server did not become ready")
+
+
+# ============ Seeding ============
+
+async def seed(posts: int, users: int):
+    """Create the schema and bulk-insert users and posts unless the database already has posts."""
+    from sqlalchemy import func, insert, select
+
+    from app.db import engine, init_db
+    from app.hashing import hash_password
+    from app.models import Post, User
+
+    await init_db()
+    async with engine.begin() as conn:
+        existing = (await conn.execute(select(func.count()).select_from(Post))).scalar_one()
+        if existing:
+            print(f"reusing database with {existing} posts")
+            await engine.dispose()
+            return
+
+        started = time.perf_counter()
+        # Every user shares one password so logins can pick any of them
+        hashed = hash_password(PASSWORD)
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        user_ids = [uuid.uuid4() for _ in range(users)]
+        await conn.execute(insert(User), [
+            {
+                "id": user_id, "username": f"bench{i}", "email": f"bench{i}@example.com",
+                "hashed_password": hashed, "is_active": True, "created_at": now, "updated_at": now,
+            }
+            for i, user_id in enumerate(user_ids)
+        ])
+
+        start = now - timedelta(seconds=posts)
+        for offset in range(0, posts, SEED_CHUNK):
+            await conn.execute(insert(Post), [
+                {
+                    "id": uuid.uuid4(),
+                    "url": f"https://ik.imagekit.io/bench/image-{i}.jpg",
+                    "file_type": "image/jpeg",
+                    "file_name": f"image-{i}.jpg",
+                    "caption": f"Benchmark post number {i}",
+                    "user_id": user_ids[i % users],
+                    "created_at": start + timedelta(seconds=i),
+                    "updated_at": start + timedelta(seconds=i),
+                }
+                for i in range(offset, min(offset + SEED_CHUNK, posts))
+            ])
+        print(f"seeded {users} users and {posts} posts in {time.perf_counter() - started:.1f}s")
+    await engine.dispose()
+
+
+async def sample_fixtures(sample: int) -> SimpleNamespace:
+    """Pick the post ids and usernames the scenarios request."""
+    from sqlalchemy import func, select
+
+    from app.db import engine
+    from app.models import Post, User
+
+    async with engine.connect() as conn:
+        post_ids = (await conn.execute(select(Post.id).order_by(func.random()).limit(sample))).scalars().all()
+        usernames = (await conn.execute(
+            select(User.username).where(User.username.like("bench%")).limit(sample)
+        )).scalars().all()
+    await engine.dispose()
+    if not post_ids or not usernames:
+        raise SystemExit("the database has no benchmark users or posts; use a fresh --db")
+    return SimpleNamespace(post_ids=[str(i) for i in post_ids], usernames=list(usernames), tokens=[])
+
+
+async def log_in(client, fixtures, count: int):
+    """Get tokens for a few users up front for the authenticated scenarios."""
+    async def one(username):
+        response = await client.post("/auth/login", data={"username": username, "password": PASSWORD})
+        response.raise_for_status()
+        return response.json()["access_token"]
+
+    fixtures.tokens = await asyncio.gather(*(one(name) for name in fixtures.usernames[:count]))
+
+
+# ============ Scenarios ============
+
+def feed(client, fixtures, rng):
+    return client.get("/items/", params={"limit": 20})
+
+
+def item(client, fixtures, rng):
+    return client.get(f"/items/{rng.choice(fixtures.post_ids)}")
+
+
+def login(client, fixtures, rng):
+    return client.post("/auth/login", data={"username": rng.choice(fixtures.usernames), "password": PASSWORD})
+
+
+def me(client, fixtures, rng):
+    return client.get("/auth/me", headers={"Authorization": f"Bearer {rng.choice(fixtures.tokens)}"})
+
+
+def upload(client, fixtures, rng):
+    # Random content, so every upload is new rather than a deduplicated reference
+    files = {"file": ("bench.txt", rng.randbytes(1024), "text/plain")}
+    headers = {"Authorization": f"Bearer {rng.choice(fixtures.tokens)}"}
+    return client.post("/upload", files=files, data={"caption": "benchmark upload"}, headers=headers)
+
+
+# key: (label, request builder, weight in --mixed runs)
+SCENARIOS = {
+    "feed": ("GET /items/", feed, 40),
+    "item": ("GET /items/{id}", item, 30),
+    "me": ("GET /auth/me", me, 15),
+    "upload": ("POST /upload", upload, 10),
+    "login": ("POST /auth/login", login, 5),
+}
+
+
+# ============ Load driver ============
+
+@dataclass
+class Result:
+    requests: int
+    errors: int
+    rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    mean_ms: float
+    max_ms: float
+
+
+@dataclass
+class Samples:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+
+    def result(self, duration: float) -> Result:
+        ordered = sorted(self.latencies)
+
+        def percentile(p):
+            # Nearest-rank percentile
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))] * 1000
+
+        return Result(
+            requests=len(ordered),
+            errors=self.errors,
+            rps=len(ordered) / duration,
+            p50_ms=percentile(50),
+            p95_ms=percentile(95),
+            p99_ms=percentile(99),
+            mean_ms=sum(ordered) / len(ordered) * 1000 if ordered else 0.0,
+            max_ms=ordered[-1] * 1000 if ordered else 0.0,
+        )
+
+
+async def drive(client, fixtures, keys: list[str], concurrency: int, duration: float, warmup: float) -> dict[str, Result]:
+    """Run ``concurrency`` clients issuing the given scenarios; only requests started after the warmup count."""
+    import httpx
+
+    samples = {key: Samples() for key in keys}
+    weights = [SCENARIOS[key][2] for key in keys]
+    record_from = time.perf_counter() + warmup
+    stop = record_from + duration
+
+    async def worker(seed):
+        rng = random.Random(seed)
+        while (started := time.perf_counter()) < stop:
+            key = rng.choices(keys, weights)[0]
+            try:
+                response = await SCENARIOS[key][1](client, fixtures, rng)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if started < record_from:
+                continue
+            if ok:
+                samples[key].latencies.append(time.perf_counter() - started)
+            else:
+                samples[key].errors += 1
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return {SCENARIOS[key][0]: samples[key].result(duration) for key in keys}
+
+
+# ============ Reporting ============
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results: dict[str, dict]):
+    print(f"{'endpoint':<18} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for name, r in results.items():
+        print(f"{name:<18} {r['rps']:9.1f} {r['p50_ms']:8.2f} {r['p95_ms']:8.2f} {r['p99_ms']:8.2f} {r['errors']:7d}")
+
+
+def compare(report: dict, baseline_path: str, max_regression: float | None) -> bool:
+    """Print changes against an earlier run; return False if any exceeds ``max_regression`` percent."""
+    baseline = json.loads(Path(baseline_path).read_text())
+    results = report["results"]
+    print(f"\nagainst {baseline_path} (commit {(baseline['meta'].get('commit') or '?')[:12]})")
+    if baseline["meta"].get("settings") != report["meta"]["settings"]:
+        print("note: the baseline was run with different settings, so the numbers may not be comparable")
+    print(f"{'endpoint':<18} {'req/s':>9} {'p99':>9}")
+    ok = True
+    for name, r in results.items():
+        before = baseline["results"].get(name)
+        if not before or not before["rps"] or not before["p99_ms"]:
+            continue
+        rps_change = (r["rps"] / before["rps"] - 1) * 100
+        p99_change = (r["p99_ms"] / before["p99_ms"] - 1) * 100
+        regressed = max_regression is not None and (rps_change < -max_regression or p99_change > max_regression)
+        ok = ok and not regressed
+        print(f"{name:<18} {rps_change:+8.1f}% {p99_change:+8.1f}%{'  REGRESSION' if regressed else ''}")
+    return ok
+
+
+# ============ Main ============
+
+async def run(args) -> dict[str, dict]:
+    import httpx
+
+    await seed(args.posts, args.users)
+    fixtures = await sample_fixtures(args.sample)
+
+    port = free_port()
+    server = start_server(port, args.stub_latency)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            await wait_until_ready(client, server)
+            await log_in(client, fixtures, min(args.concurrency, len(fixtures.usernames)))
+            if args.mixed:
+                return {name: asdict(r) for name, r in (await drive(
+                    client, fixtures, args.endpoints, args.concurrency, args.duration, args.warmup
+                )).items()}
+            results = {}
+            for key in args.endpoints:
+                for name, r in (await drive(client, fixtures, [key], args.concurrency, args.duration, args.warmup)).items():
+                    results[name] = asdict(r)
+            return results
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--posts", type=int, default=10_000, help="posts to seed into a new database")
+    parser.add_argument("--users", type=int, default=100, help="users to seed into a new database")
+    parser.add_argument("--db", help="SQLite file to seed or reuse (default: a temporary file)")
+    parser.add_argument("--endpoints", default=",".join(SCENARIOS), help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--mixed", action="store_true", help="drive all endpoints at once, weighted like real traffic")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10, help="measured seconds per run")
+    parser.add_argument("--warmup", type=float, default=2, help="unmeasured seconds before each run")
+    parser.add_argument("--sample", type=int, default=1000, help="post ids and users the scenarios pick from")
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="seconds the ImageKit stub takes per upload")
+    parser.add_argument("--output", help="where to write the JSON results")
+    parser.add_argument("--compare", help="earlier JSON results to compare against")
+    parser.add_argument("--max-regression", type=float, help="exit non-zero if req/s drops or p99 grows by more than this percent")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.stub_latency)
+        return
+
+    args.endpoints = [key.strip() for key in args.endpoints.split(",") if key.strip()]
+    unknown = set(args.endpoints) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory(prefix="bench-api-") as scratch:
+        db_path = Path(args.db).resolve() if args.db else Path(scratch) / "bench.db"
+        # The server process inherits these, so both sides use the same scratch state
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_path}"
+        os.environ["STORAGE_BACKEND"] = "imagekit"
+        os.environ.setdefault("SECRET_KEY", "bench-secret")
+        os.environ.setdefault("UPLOAD_DIR", str(Path(scratch) / "uploads"))
+        results = asyncio.run(run(args))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "settings": {
+                key: getattr(args, key)
+                for key in ("posts", "users", "endpoints", "mixed", "concurrency", "duration", "warmup", "stub_latency")
+            },
+        },
+        "results": results,
+    }
+    print()
+    print_table(results)
+
+    if args.output:
+        output = Path(args.output)
+    else:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = RESULTS_DIR / f"bench_api-{stamp}-{(report['meta']['commit'] or 'unknown')[:12]}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"\nresults written to {output}")
+
+    if args.compare and not compare(report, args.compare, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
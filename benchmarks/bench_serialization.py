@@ -0,0 +1,104 @@
+"""Microbenchmark: per-item cost of serializing a 10k-item feed page.
+
+Compares the original path (hand-built dict of strings, FastAPI's
+jsonable_encoder, stdlib json) with the current one (post_payload + dumps,
+which uses orjson when installed) and with Pydantic model serialization.
+
+Usage:
+    uv run python benchmarks/bench_serialization.py [--items 10000] [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("IMAGEKIT_PRIVATE_KEY", "bench")
+os.environ.setdefault("IMAGEKIT_PUBLIC_KEY", "bench")
+os.environ.setdefault("IMAGEKIT_URL_ENDPOINT", "https://ik.imagekit.io/bench")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+
+from app.models import Post  # noqa: E402
+from app.schemas import FeedPage, PostResponse  # noqa: E402
+from app.serialization import ORJSON_AVAILABLE, dumps, post_payload  # noqa: E402
+
+
+def make_posts(count: int) -> list[Post]:
+    """Build transient Post objects shaped like real feed rows."""
+    start = datetime(2024, 1, 1)
+    user_id = uuid.uuid4()
+    return [
+        Post(
+            id=uuid.uuid4(),
+            url=f"https://ik.imagekit.io/demo/image-{i}.jpg",
+            file_type="image/jpeg",
+            file_name=f"image-{i}.jpg",
+            caption=f"Caption number {i}",
+            user_id=user_id,
+            created_at=start + timedelta(seconds=i),
+        )
+        for i in range(count)
+    ]
+
+
+def legacy(posts: list[Post]) -> bytes:
+    """The original handler: string-converted dicts, then FastAPI's JSONResponse encoding."""
+    items = [
+        {
+            "id": str(post.id),
+            "filename": post.file_name,
+            "file_type": post.file_type,
+            "url": post.url,
+            "caption": post.caption,
+            "created_at": post.created_at.isoformat(),
+        }
+        for post in posts
+    ]
+    content = jsonable_encoder({"items": items, "total": len(items)})
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def fast_path(posts: list[Post]) -> bytes:
+    """The current handler: native-typed dicts through app.serialization.dumps."""
+    items = [post_payload(post) for post in posts]
+    return dumps({"items": items, "total": len(items), "next_cursor": None})
+
+
+def pydantic_models(posts: list[Post]) -> bytes:
+    """Validate into the response models and let pydantic-core serialize them."""
+    page = FeedPage(items=[PostResponse.model_validate(post) for post in posts], total=len(posts))
+    return page.model_dump_json().encode()
+
+
+def measure(func, posts, repeat: int) -> float:
+    """Return the best per-item time in microseconds over ``repeat`` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(posts)
+        best = min(best, time.perf_counter() - start)
+    return best / len(posts) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    posts = make_posts(args.items)
+    print(f"{args.items} items, best of {args.repeat} (orjson {'on' if ORJSON_AVAILABLE else 'off'})")
+    baseline = measure(legacy, posts, args.repeat)
+    for name, func in (("legacy", legacy), ("fast path", fast_path), ("pydantic", pydantic_models)):
+        per_item = baseline if func is legacy else measure(func, posts, args.repeat)
+        print(f"  {name:<10} {per_item:7.2f} us/item  ({baseline / per_item:4.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
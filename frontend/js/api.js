@@ -39,8 +39,19 @@ async function handleJson(res) {
   return res.json();
 }
 
-export async function listItems() {
-  const res = await fetch(`${API_BASE}/items/`, { method: 'GET' });
+/**
+ * Fetch one page of the feed
+ * @param {object} [options]
+ * @param {string} [options.cursor] - next_cursor from the previous page
+ * @param {number} [options.limit] - Page size
+ * @returns {Promise<object>} { items, total, next_cursor }
+ */
+export async function listItems({ cursor, limit } = {}) {
+  const params = new URLSearchParams();
+  if (cursor) params.set('cursor', cursor);
+  if (limit) params.set('limit', String(limit));
+  const qs = params.toString();
+  const res = await fetch(`${API_BASE}/items/${qs ? `?${qs}` : ''}`, { method: 'GET' });
   return handleJson(res);
 }
 
@@ -63,6 +74,26 @@ export async function uploadItem(file, caption) {
   return handleJson(res);
 }
 
+/**
+ * Upload several files in one request
+ * @param {File[]} files - Files to upload
+ * @param {string} [caption] - Caption applied to every post
+ * @returns {Promise<object>} { results: [{ index, filename, status, item, error }], succeeded, failed }
+ */
+export async function uploadItems(files, caption) {
+  const fd = new FormData();
+  for (const file of files) fd.append('files', file);
+  if (caption) fd.append('caption', caption);
+
+  const headers = getAuthHeaders();
+  const res = await fetch(`${API_BASE}/upload/batch`, {
+    method: 'POST',
+    body: fd,
+    headers
+  });
+  return handleJson(res);
+}
+
 export async function updateItem(itemId, caption) {
   const fd = new FormData();
   fd.append('caption', caption);
@@ -105,3 +136,32 @@ export function getItemImageUrl(item) {
   }
   return '';
 }
+
+// Build a <picture> that lets the browser pick a variant for the rendered size.
+// Falls back to the original image until the post's variants have been generated.
+export function renderResponsiveImage(item, className, sizes) {
+  const picture = document.createElement('picture');
+  const srcset = item.srcset || {};
+  if (srcset.webp) {
+    const source = document.createElement('source');
+    source.type = 'image/webp';
+    source.srcset = srcset.webp;
+    source.sizes = sizes;
+    picture.appendChild(source);
+  }
+
+  const img = document.createElement('img');
+  img.className = className;
+  img.alt = item.caption || item.filename || 'image';
+  img.decoding = 'async';
+  if (srcset.jpeg) {
+    const largest = (item.variants || []).filter((v) => v.format === 'jpeg').pop();
+    img.src = largest.url;
+    img.srcset = srcset.jpeg;
+    img.sizes = sizes;
+  } else {
+    img.src = getItemImageUrl(item);
+  }
+  picture.appendChild(img);
+  return picture;
+}
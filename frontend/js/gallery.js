@@ -1,5 +1,5 @@
 // frontend/js/gallery.js
-import { listItems, getItemImageUrl } from './api.js';
+import { listItems, renderResponsiveImage } from './api.js';
 
 function el(tag, className) {
   const e = document.createElement(tag);
@@ -12,9 +12,13 @@ function renderCard(item) {
   const link = el('a', 'block');
   link.href = `post.html?id=${encodeURIComponent(item.id)}`;
 
-  const img = el('img', 'w-full object-cover h-48 bg-gray-100');
-  img.src = getItemImageUrl(item);
-  img.alt = item.caption || item.filename || 'image';
+  // Cards are one grid column wide: 1 column on phones up to 4 on wide screens
+  const picture = renderResponsiveImage(
+    item,
+    'w-full object-cover h-48 bg-gray-100',
+    '(min-width: 1024px) 25vw, (min-width: 768px) 33vw, (min-width: 640px) 50vw, 100vw',
+  );
+  picture.querySelector('img').loading = 'lazy';
 
   const body = el('div', 'p-3 space-y-1');
   const cap = el('div', 'text-sm text-gray-900 line-clamp-2');
@@ -23,7 +27,7 @@ function renderCard(item) {
   const created = item.created_at ? new Date(item.created_at).toLocaleString() : '';
   meta.textContent = [item.file_type, created].filter(Boolean).join(' • ');
 
-  link.appendChild(img);
+  link.appendChild(picture);
   body.appendChild(cap);
   body.appendChild(meta);
   card.appendChild(link);
@@ -31,33 +35,59 @@ function renderCard(item) {
   return card;
 }
 
+const PAGE_SIZE = 24;
+
 async function init() {
   const root = document.getElementById('gallery-root');
   const grid = document.getElementById('gallery-grid');
   const loading = document.getElementById('gallery-loading');
   const empty = document.getElementById('gallery-empty');
+  const sentinel = document.getElementById('gallery-sentinel');
+
+  let cursor = null;
+  let done = false;
+  let busy = false;
+  let observer = null;
 
-  loading.style.display = 'block';
   empty.style.display = 'none';
   grid.innerHTML = '';
 
-  try {
-    const data = await listItems();
-    const items = data.items || [];
-    if (!items || items.length === 0) {
-      empty.style.display = 'block';
-      return;
-    }
-    items.sort((a, b) => new Date(b.created_at || 0) - new Date(a.created_at || 0));
-    for (const item of items) {
-      grid.appendChild(renderCard(item));
+  async function loadNextPage() {
+    if (busy || done) return;
+    busy = true;
+    loading.style.display = 'block';
+
+    try {
+      const data = await listItems({ cursor, limit: PAGE_SIZE });
+      const items = data.items || [];
+      for (const item of items) {
+        grid.appendChild(renderCard(item));
+      }
+      cursor = data.next_cursor || null;
+      done = !cursor;
+      if (done && grid.children.length === 0) {
+        empty.style.display = 'block';
+      }
+    } catch (err) {
+      done = true;
+      const alert = el('div', 'p-3 rounded bg-red-50 text-red-700 border border-red-200');
+      alert.textContent = `Failed to load posts: ${err.message}`;
+      root.prepend(alert);
+    } finally {
+      busy = false;
+      loading.style.display = 'none';
+      if (done && observer) observer.disconnect();
     }
-  } catch (err) {
-    const alert = el('div', 'p-3 rounded bg-red-50 text-red-700 border border-red-200');
-    alert.textContent = `Failed to load posts: ${err.message}`;
-    root.prepend(alert);
-  } finally {
-    loading.style.display = 'none';
+  }
+
+  await loadNextPage();
+
+  // Infinite scroll: fetch the next page whenever the sentinel below the grid comes into view
+  if (!done && sentinel && 'IntersectionObserver' in window) {
+    observer = new IntersectionObserver((entries) => {
+      if (entries.some((entry) => entry.isIntersecting)) loadNextPage();
+    }, { rootMargin: '600px' });
+    observer.observe(sentinel);
   }
 }
 
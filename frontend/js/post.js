@@ -1,5 +1,5 @@
 // frontend/js/post.js
-import { getItem, deleteItem, updateItem, getItemImageUrl } from './api.js';
+import { getItem, deleteItem, updateItem, renderResponsiveImage } from './api.js';
 import { isAuthenticated, getUserData } from './auth.js';
 
 function $(id) {
@@ -13,11 +13,12 @@ function qsParam(name) {
 function renderItem(item) {
   const imageWrap = $('post-image');
   imageWrap.innerHTML = '';
-  const img = document.createElement('img');
-  img.className = 'w-full max-h-[75vh] object-contain bg-gray-50 rounded border';
-  img.src = getItemImageUrl(item);
-  img.alt = item.caption || item.filename || 'image';
-  imageWrap.appendChild(img);
+  imageWrap.appendChild(renderResponsiveImage(
+    item,
+    'w-full max-h-[75vh] object-contain bg-gray-50 rounded border',
+    // The post page's main column is capped at max-w-3xl (48rem)
+    '(min-width: 48rem) 48rem, 100vw',
+  ));
 
   const meta = $('post-meta');
   meta.innerHTML = '';
@@ -1,5 +1,8 @@
 // frontend/js/upload.js
-import { uploadItem } from './api.js';
+import { uploadItem, uploadItems } from './api.js';
+
+// Keep in step with BATCH_UPLOAD_MAX_FILES on the server
+const MAX_FILES = 50;
 
 function $(id) {
   return document.getElementById(id);
@@ -15,15 +18,18 @@ function setStatus(msg, kind = 'info') {
     : 'text-sm text-gray-600';
 }
 
-function previewFile(file) {
+function previewFiles(files) {
   const preview = $('preview');
   preview.innerHTML = '';
-  if (!file) return;
-  const img = document.createElement('img');
-  img.className = 'max-h-64 object-contain rounded border';
-  img.src = URL.createObjectURL(file);
-  img.onload = () => URL.revokeObjectURL(img.src);
-  preview.appendChild(img);
+  for (const file of files) {
+    const img = document.createElement('img');
+    img.className = files.length === 1
+      ? 'max-h-64 object-contain rounded border'
+      : 'h-24 w-24 object-cover rounded border';
+    img.src = URL.createObjectURL(file);
+    img.onload = () => URL.revokeObjectURL(img.src);
+    preview.appendChild(img);
+  }
 }
 
 function validate(file) {
@@ -33,27 +39,50 @@ function validate(file) {
   return null;
 }
 
+function validateAll(files) {
+  if (files.length === 0) return validate(null);
+  if (files.length > MAX_FILES) return `Choose at most ${MAX_FILES} files at once.`;
+  for (const file of files) {
+    const err = validate(file);
+    if (err) return files.length === 1 ? err : `${file.name}: ${err}`;
+  }
+  return null;
+}
+
 async function init() {
   const form = $('upload-form');
   const fileInput = $('file');
   const captionInput = $('caption');
   const submitBtn = $('submit-btn');
 
-  fileInput.addEventListener('change', () => previewFile(fileInput.files[0]));
+  fileInput.addEventListener('change', () => previewFiles(Array.from(fileInput.files)));
 
   form.addEventListener('submit', async (e) => {
     e.preventDefault();
-    const file = fileInput.files[0];
-    const err = validate(file);
+    const files = Array.from(fileInput.files);
+    const err = validateAll(files);
     if (err) {
       setStatus(err, 'error');
       return;
     }
-    setStatus('Uploading...');
+    setStatus(files.length === 1 ? 'Uploading...' : `Uploading ${files.length} files...`);
     submitBtn.disabled = true;
 
     try {
-      await uploadItem(file, captionInput.value || '');
+      if (files.length === 1) {
+        await uploadItem(files[0], captionInput.value || '');
+      } else {
+        // One request for the whole selection; files that fail are reported individually
+        const data = await uploadItems(files, captionInput.value || '');
+        if (data.failed > 0) {
+          const failures = data.results
+            .filter((r) => r.error)
+            .map((r) => `${r.filename}: ${r.error}`)
+            .join('; ');
+          setStatus(`Uploaded ${data.succeeded} of ${files.length} files. Failed: ${failures}`, 'error');
+          return;
+        }
+      }
       setStatus('Upload complete. Redirecting…', 'success');
       setTimeout(() => {
         window.location.href = 'index.html';
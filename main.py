@@ -1,5 +1,117 @@
-def main():
-    print("Hello from fastapi-project!")
+"""Production entry point: prepare the database once, then run uvicorn workers.
+
+    uv run python main.py [--workers N] [--port 8000]
+
+The schema is created and upgraded by this process before any worker starts,
+so workers do not race each other through ``create_all`` on boot. Workers
+use uvloop and httptools when installed, and on SIGTERM stop accepting
+connections and let in-flight requests finish for up to
+``GRACEFUL_SHUTDOWN_TIMEOUT`` seconds.
+
+For development, ``uv run uvicorn app.main:app --reload`` still works: each
+worker then initializes the database itself.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import logging
+import copy
+import os
+import time
+
+# Launch time, for the readiness log line in app.main
+LAUNCHED_AT = time.time()
+
+logger = logging.getLogger("launcher")
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the API with multiple uvicorn workers.")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=_env_int("PORT", 8000))
+    parser.add_argument(
+        "--workers", type=int, default=_env_int("WEB_CONCURRENCY", os.cpu_count() or 1),
+        help="worker processes (default: WEB_CONCURRENCY or one per core)",
+    )
+    parser.add_argument(
+        "--keep-alive", type=int, default=_env_int("KEEP_ALIVE_TIMEOUT", 75),
+        help="seconds an idle keep-alive connection stays open; keep above any load balancer's idle timeout",
+    )
+    parser.add_argument("--backlog", type=int, default=_env_int("BACKLOG", 2048), help="pending connections the socket queues")
+    parser.add_argument(
+        "--graceful-timeout", type=int, default=_env_int("GRACEFUL_SHUTDOWN_TIMEOUT", 30),
+        help="seconds in-flight requests get to finish after SIGTERM",
+    )
+    parser.add_argument(
+        "--access-log", action=argparse.BooleanOptionalAction,
+        default=os.getenv("ACCESS_LOG", "false").lower() in ("1", "true", "yes"),
+    )
+    parser.add_argument("--skip-db-init", action="store_true", help="assume the schema is already up to date")
+    return parser.parse_args(argv)
+
+
+async def prepare_database() -> None:
+    """Create and upgrade the schema, then close the connections so workers start clean."""
+    # Importing these registers every table and the search index DDL on the metadata
+    from app import models, search  # noqa: F401
+    from app.db import engine, init_db
+
+    try:
+        await init_db()
+    finally:
+        await engine.dispose()
+
+
+def _available(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def log_config() -> dict:
+    """Uvicorn's logging setup, plus the app's own INFO messages (such as worker readiness)."""
+    from uvicorn.config import LOGGING_CONFIG
+
+    config = copy.deepcopy(LOGGING_CONFIG)
+    config["loggers"]["app"] = {"handlers": ["default"], "level": "INFO", "propagate": False}
+    return config
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    args = parse_args(argv)
+
+    # Workers inherit the environment; the schema is handled here instead
+    os.environ["DB_INIT_ON_STARTUP"] = "false"
+    os.environ["APP_LAUNCHED_AT"] = str(LAUNCHED_AT)
+    # Per-worker caches shorten their lifetimes when other workers can write
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+
+    if not args.skip_db_init:
+        started = time.perf_counter()
+        asyncio.run(prepare_database())
+        logger.info("Database schema ready in %.2fs", time.perf_counter() - started)
+
+    import uvicorn
+
+    logger.info("Starting %d worker(s) on %s:%d", args.workers, args.host, args.port)
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop" if _available("uvloop") else "asyncio",
+        http="httptools" if _available("httptools") else "h11",
+        backlog=args.backlog,
+        timeout_keep_alive=args.keep_alive,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        access_log=args.access_log,
+        log_config=log_config(),
+        lifespan="on",
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,131 @@
+"""Shared test configuration.
+
+Points the application at a throwaway SQLite database so tests never touch
+the checked-in ``sql_app.db``, and provides helpers for authenticated calls.
+"""
+
+import asyncio
+import os
+import tempfile
+import uuid
+
+# ImageKit refuses to initialise without credentials; tests always mock it.
+os.environ.setdefault("IMAGEKIT_PRIVATE_KEY", "test-private-key")
+os.environ.setdefault("IMAGEKIT_PUBLIC_KEY", "test-public-key")
+os.environ.setdefault("IMAGEKIT_URL_ENDPOINT", "https://ik.imagekit.io/test")
+
+# Variant generation runs in-process so tests need not spawn worker processes
+os.environ.setdefault("IMAGE_PROCESS_POOL", "thread")
+
+TEST_DB_PATH = os.path.join(tempfile.mkdtemp(prefix="fastapi-project-tests-"), "test.db")
+TEST_DATABASE_URL = f"sqlite+aiosqlite:///{TEST_DB_PATH}"
+os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+from sqlalchemy.pool import NullPool
+
+from app import db as app_db, jobs
+from app.db import Base, create_engine_from_url, get_db, get_read_db
+from app.main import app
+from app.models import Job, PostVariant
+from app.response_cache import response_cache
+
+# Each TestClient runs its own event loop, so connections must not be pooled across tests
+test_engine = create_engine_from_url(TEST_DATABASE_URL, poolclass=NullPool)
+TestSessionLocal = async_sessionmaker(test_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def _create_tables():
+    async with test_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+asyncio.run(_create_tables())
+
+
+def count_statements(func):
+    """Run ``func`` and return how many SQL statements it issued against the test database."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        func()
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", record)
+    return len(statements)
+
+
+async def override_get_db():
+    """Yield a session bound to the test database."""
+    async with TestSessionLocal() as session:
+        yield session
+
+
+app.dependency_overrides[get_db] = override_get_db
+app.dependency_overrides[get_read_db] = override_get_db
+# Background jobs open their own sessions outside dependency injection
+app_db.AsyncSessionLocal = TestSessionLocal
+
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    """Start every test with an empty response cache (tests also write to the DB directly)."""
+    response_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_jobs():
+    """Start every test with an empty job queue, so ``run_jobs`` only runs the test's own jobs."""
+    async def _clear():
+        async with TestSessionLocal() as session:
+            await session.execute(delete(Job))
+            await session.commit()
+    asyncio.run(_clear())
+
+
+def run_jobs() -> int:
+    """Run the queued background jobs, as the lifespan's job worker would; return how many ran."""
+    return asyncio.run(jobs.run_due_jobs())
+
+
+def add_variant(post_id, file_id):
+    """Attach a variant row for ``file_id`` to a post, as the variants job would."""
+    async def _add():
+        async with TestSessionLocal() as session:
+            session.add(PostVariant(
+                post_id=uuid.UUID(post_id), width=320, height=240, format="webp",
+                url=f"/uploads/{file_id}", file_id=file_id,
+            ))
+            await session.commit()
+    asyncio.run(_add())
+
+
+@pytest.fixture
+def client():
+    """Return a TestClient for the app."""
+    return TestClient(app)
+
+
+def register_and_login(client):
+    """Register a fresh user, log in and return bearer auth headers."""
+    username = f"user-{uuid.uuid4().hex[:12]}"
+    response = client.post(
+        "/auth/register",
+        json={"username": username, "email": f"{username}@example.com", "password": "secret123"},
+    )
+    assert response.status_code == 201
+    response = client.post("/auth/login", data={"username": username, "password": "secret123"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture
+def auth_headers(client):
+    """Bearer auth headers for a freshly registered user."""
+    return register_and_login(client)
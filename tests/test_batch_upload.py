@@ -0,0 +1,112 @@
+import asyncio
+import hashlib
+import io
+import uuid
+from unittest.mock import MagicMock, patch
+
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from app.models import Blob
+from app.storage import LocalStorage
+from tests.conftest import TestSessionLocal, test_engine
+
+
+def fetch_blob(content_hash):
+    async def _fetch():
+        async with TestSessionLocal() as session:
+            return await session.get(Blob, content_hash)
+    return asyncio.run(_fetch())
+
+
+def unique(label):
+    return f"{label} {uuid.uuid4()}".encode()
+
+
+def test_batch_upload_inserts_posts_in_one_statement(client, auth_headers, tmp_path):
+    """Test that a batch creates every post with a single INSERT and one commit."""
+    storage = LocalStorage(root=tmp_path)
+    contents = [unique(f"batch {i}") for i in range(3)]
+    files = [("files", (f"f{i}.txt", io.BytesIO(content), "text/plain")) for i, content in enumerate(contents)]
+    post_inserts = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO posts"):
+            post_inserts.append(statement)
+
+    event.listen(test_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        with patch("app.main.get_storage", return_value=storage):
+            response = client.post("/upload/batch", files=files, data={"caption": "album"}, headers=auth_headers)
+    finally:
+        event.remove(test_engine.sync_engine, "before_cursor_execute", record)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["succeeded"], body["failed"]) == (3, 0)
+    assert [r["filename"] for r in body["results"]] == ["f0.txt", "f1.txt", "f2.txt"]
+    assert all(r["status"] == 201 and r["item"]["caption"] == "album" for r in body["results"])
+    assert len(post_inserts) == 1
+
+    feed_ids = {item["id"] for item in client.get("/items/", params={"all": "true"}).json()["items"]}
+    assert {r["item"]["id"] for r in body["results"]} <= feed_ids
+
+
+@patch("app.images.imagekit")
+def test_batch_upload_reports_partial_failures(mock_imagekit, client, auth_headers):
+    """Test that files that fail to store are reported without failing the rest."""
+    def upload_file(file, file_name, options):
+        if file_name == "bad.txt":
+            raise RuntimeError("storage down")
+        return MagicMock(url=f"https://ik.imagekit.io/demo/{file_name}", file_id=file_name)
+
+    mock_imagekit.upload_file.side_effect = upload_file
+    files = [
+        ("files", ("good.txt", io.BytesIO(unique("good")), "text/plain")),
+        ("files", ("bad.txt", io.BytesIO(unique("bad")), "text/plain")),
+    ]
+
+    response = client.post("/upload/batch", files=files, headers=auth_headers)
+
+    body = response.json()
+    assert (body["succeeded"], body["failed"]) == (1, 1)
+    good, bad = body["results"]
+    assert good["status"] == 201 and good["item"]["url"] == "https://ik.imagekit.io/demo/good.txt"
+    assert bad["status"] == 502 and bad["item"] is None
+
+
+def test_batch_upload_deduplicates_within_and_across_batches(client, auth_headers, tmp_path):
+    """Test that repeated content is stored once and referenced by every post."""
+    storage = LocalStorage(root=tmp_path)
+    content = unique("repeat")
+    digest = hashlib.sha256(content).hexdigest()
+
+    with patch("app.main.get_storage", return_value=storage), \
+            patch.object(storage, "save", wraps=storage.save) as save:
+        files = [("files", (f"{i}.txt", io.BytesIO(content), "text/plain")) for i in range(2)]
+        first = client.post("/upload/batch", files=files, headers=auth_headers).json()
+        files = [("files", ("again.txt", io.BytesIO(content), "text/plain"))]
+        second = client.post("/upload/batch", files=files, headers=auth_headers).json()
+
+    assert save.call_count == 1
+    assert first["succeeded"] == 2 and second["succeeded"] == 1
+    assert fetch_blob(digest).ref_count == 3
+
+
+def test_batch_upload_limits(client, auth_headers):
+    """Test that oversized batches are rejected and storage errors keep their status."""
+    with patch("app.main.BATCH_UPLOAD_MAX_FILES", 1):
+        files = [("files", (f"{i}.txt", io.BytesIO(b"x"), "text/plain")) for i in range(2)]
+        assert client.post("/upload/batch", files=files, headers=auth_headers).status_code == 413
+
+    busy = HTTPException(status_code=503, detail="Too many uploads in progress, try again later")
+    with patch("app.blobs.hash_upload", side_effect=busy):
+        files = [("files", ("busy.txt", io.BytesIO(b"x"), "text/plain"))]
+        (result,) = client.post("/upload/batch", files=files, headers=auth_headers).json()["results"]
+    assert result["status"] == 503
+
+
+def test_batch_upload_requires_auth(client):
+    """Test that batch uploads need a logged-in user."""
+    files = [("files", ("a.txt", io.BytesIO(b"x"), "text/plain"))]
+    assert client.post("/upload/batch", files=files).status_code == 401
@@ -0,0 +1,146 @@
+import asyncio
+import hashlib
+import io
+import uuid
+from unittest.mock import MagicMock, patch
+
+from fastapi import UploadFile
+from sqlalchemy import select
+
+from app import blobs
+from app.models import Blob, Post
+from app.storage import LocalStorage
+from tests.conftest import TestSessionLocal, add_variant, run_jobs
+
+
+def fetch_blob(content_hash):
+    """Load a blob row straight from the test database."""
+    async def _fetch():
+        async with TestSessionLocal() as session:
+            return await session.get(Blob, content_hash)
+    return asyncio.run(_fetch())
+
+
+def post_hash(post_id):
+    """Return the content hash stored on a post."""
+    async def _fetch():
+        async with TestSessionLocal() as session:
+            result = await session.execute(select(Post.content_hash).where(Post.id == uuid.UUID(post_id)))
+            return result.scalar_one()
+    return asyncio.run(_fetch())
+
+
+async def post_exists(post_id):
+    async with TestSessionLocal() as session:
+        return await session.get(Post, post_id) is not None
+
+
+def upload(client, headers, content, name="photo.txt"):
+    files = {"file": (name, io.BytesIO(content), "text/plain")}
+    response = client.post("/upload", files=files, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+@patch("app.images.imagekit")
+def test_duplicate_upload_reuses_stored_file(mock_imagekit, client, auth_headers):
+    """Test that uploading the same bytes twice pushes them to storage once."""
+    mock_imagekit.upload_file.return_value = MagicMock(url="https://ik.imagekit.io/demo/dup.jpg", file_id="dup")
+    content = f"duplicate {uuid.uuid4()}".encode()
+    digest = hashlib.sha256(content).hexdigest()
+
+    first = upload(client, auth_headers, content)
+    second = upload(client, auth_headers, content, name="again.txt")
+
+    assert mock_imagekit.upload_file.call_count == 1
+    assert first["id"] != second["id"]
+    assert second["url"] == first["url"]
+    assert post_hash(second["id"]) == digest
+    assert fetch_blob(digest).ref_count == 2
+
+
+def test_blob_deleted_with_last_reference(client, auth_headers, tmp_path):
+    """Test that the stored file outlives every post but the last that shares it."""
+    storage = LocalStorage(root=tmp_path)
+    content = f"shared {uuid.uuid4()}".encode()
+    digest = hashlib.sha256(content).hexdigest()
+
+    with patch("app.main.get_storage", return_value=storage), \
+            patch("app.blobs.get_storage", return_value=storage):
+        first = upload(client, auth_headers, content)
+        second = upload(client, auth_headers, content)
+        stored_path = tmp_path / digest
+
+        assert client.delete(f"/items/{first['id']}", headers=auth_headers).status_code == 200
+        assert stored_path.exists()
+        assert fetch_blob(digest).ref_count == 1
+
+        assert client.delete(f"/items/{second['id']}", headers=auth_headers).status_code == 200
+        # The file is removed by a background job, not by the request
+        assert stored_path.exists()
+        assert run_jobs() == 1
+        assert not stored_path.exists()
+        assert fetch_blob(digest) is None
+
+        # The same content can be uploaded again afterwards
+        third = upload(client, auth_headers, content)
+        assert stored_path.exists()
+        assert fetch_blob(digest).ref_count == 1
+        assert third["url"] == f"/uploads/{digest}"
+
+
+def test_deleted_duplicate_removes_its_own_variants(client, auth_headers, tmp_path):
+    """Test that deleting a post whose blob is still shared removes the post's variant files."""
+    storage = LocalStorage(root=tmp_path)
+    content = f"variants {uuid.uuid4()}".encode()
+    digest = hashlib.sha256(content).hexdigest()
+
+    with patch("app.main.get_storage", return_value=storage), \
+            patch("app.blobs.get_storage", return_value=storage):
+        first = upload(client, auth_headers, content)
+        second = upload(client, auth_headers, content)
+        (tmp_path / "second-320.webp").write_bytes(b"variant")
+        add_variant(second["id"], "second-320.webp")
+
+        assert client.delete(f"/items/{second['id']}", headers=auth_headers).status_code == 200
+        assert run_jobs() == 1
+        assert not (tmp_path / "second-320.webp").exists()
+        assert (tmp_path / digest).exists()
+        assert fetch_blob(digest).ref_count == 1
+        assert client.get(f"/items/{first['id']}").status_code == 200
+
+
+def test_losing_the_insert_race_keeps_the_transaction(tmp_path):
+    """Test that a concurrent upload of the same content only rolls back the blob insert."""
+    storage = LocalStorage(root=tmp_path)
+    content = f"race {uuid.uuid4()}".encode()
+    digest = hashlib.sha256(content).hexdigest()
+    claim = blobs._claim
+    calls = []
+
+    async def late_claim(db, content_hash):
+        # The first look misses the blob the other upload has just committed
+        calls.append(content_hash)
+        return None if len(calls) == 1 else await claim(db, content_hash)
+
+    async def scenario():
+        async with TestSessionLocal() as other:
+            other.add(Blob(content_hash=digest, url="/uploads/theirs", file_id="theirs", backend="local", size=1))
+            await other.commit()
+        async with TestSessionLocal() as session:
+            earlier = Post(url="/uploads/earlier", file_type="text", file_name="earlier.txt")
+            session.add(earlier)
+            await session.flush()
+            with patch("app.blobs._claim", late_claim), patch("app.blobs.get_storage", return_value=storage):
+                file = UploadFile(io.BytesIO(content), filename="race.txt")
+                blob, is_new = await blobs.acquire_blob(session, file, storage)
+            await session.commit()
+            return earlier.id, blob.file_id, is_new
+
+    earlier_id, file_id, is_new = asyncio.run(scenario())
+
+    assert (file_id, is_new) == ("theirs", False)
+    assert fetch_blob(digest).ref_count == 2
+    # Our copy of the content was removed again, and the earlier work was committed
+    assert list(tmp_path.iterdir()) == []
+    assert asyncio.run(post_exists(earlier_id))
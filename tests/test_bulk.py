@@ -0,0 +1,109 @@
+import hashlib
+import io
+import uuid
+from unittest.mock import patch
+
+from app.storage import LocalStorage
+from tests.conftest import add_variant, count_statements, register_and_login, run_jobs
+
+
+def upload(client, headers, content=None):
+    content = content or f"bulk {uuid.uuid4()}".encode()
+    files = {"file": ("bulk.txt", io.BytesIO(content), "text/plain")}
+    response = client.post("/upload", files=files, headers=headers)
+    assert response.status_code == 200
+    return response.json()["id"]
+
+
+def test_bulk_caption_only_touches_own_posts(client, auth_headers, tmp_path):
+    """Test that bulk caption edits skip other users' and missing posts."""
+    other_headers = register_and_login(client)
+    with patch("app.main.get_storage", return_value=LocalStorage(root=tmp_path)):
+        mine = [upload(client, auth_headers) for _ in range(3)]
+        theirs = upload(client, other_headers)
+    missing = str(uuid.uuid4())
+    etag_before = client.get(f"/items/{mine[0]}").headers["etag"]
+
+    response = client.post(
+        "/items/bulk/caption",
+        json={"ids": [*mine, theirs, missing], "caption": "moderated"},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 200
+    assert response.json() == {"affected": mine, "skipped": [theirs, missing]}
+    mine_item = client.get(f"/items/{mine[0]}")
+    assert mine_item.json()["caption"] == "moderated"
+    assert mine_item.headers["etag"] != etag_before
+    assert client.get(f"/items/{theirs}").json()["caption"] is None
+
+
+def test_bulk_delete_uses_set_based_statements(client, auth_headers, tmp_path):
+    """Test that bulk deletes run a fixed number of statements however many ids are sent."""
+    storage = LocalStorage(root=tmp_path)
+    other_headers = register_and_login(client)
+    with patch("app.main.get_storage", return_value=storage):
+        few = [upload(client, auth_headers) for _ in range(2)]
+        many = [upload(client, auth_headers) for _ in range(8)]
+        theirs = upload(client, other_headers)
+
+    with patch("app.blobs.get_storage", return_value=storage):
+        few_count = count_statements(
+            lambda: client.post("/items/bulk/delete", json={"ids": few}, headers=auth_headers)
+        )
+        result = {}
+        many_count = count_statements(
+            lambda: result.update(
+                client.post("/items/bulk/delete", json={"ids": [*many, theirs]}, headers=auth_headers).json()
+            )
+        )
+        # One file-deletion job per deleted post with files to remove, queued in the same statement
+        assert run_jobs() == len(few) + len(many)
+
+    assert few_count == many_count
+    assert result == {"affected": many, "skipped": [theirs]}
+    assert all(client.get(f"/items/{post_id}").status_code == 404 for post_id in few + many)
+    assert client.get(f"/items/{theirs}").status_code == 200
+    # Only the other user's file is left
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_bulk_delete_keeps_shared_files(client, auth_headers, tmp_path):
+    """Test that a file shared with a surviving post is not removed."""
+    storage = LocalStorage(root=tmp_path)
+    content = f"shared {uuid.uuid4()}".encode()
+    with patch("app.main.get_storage", return_value=storage):
+        keep, drop = upload(client, auth_headers, content), upload(client, auth_headers, content)
+
+    with patch("app.blobs.get_storage", return_value=storage):
+        client.post("/items/bulk/delete", json={"ids": [drop]}, headers=auth_headers)
+
+    assert (tmp_path / hashlib.sha256(content).hexdigest()).exists()
+    assert client.get(f"/items/{keep}").status_code == 200
+
+
+def test_bulk_delete_removes_variants_of_shared_posts(client, auth_headers, tmp_path):
+    """Test that a deleted post's variant files go even when its original is still shared."""
+    storage = LocalStorage(root=tmp_path)
+    content = f"shared {uuid.uuid4()}".encode()
+    with patch("app.main.get_storage", return_value=storage):
+        keep, drop = upload(client, auth_headers, content), upload(client, auth_headers, content)
+    (tmp_path / "drop-320.webp").write_bytes(b"variant")
+    add_variant(drop, "drop-320.webp")
+
+    with patch("app.blobs.get_storage", return_value=storage):
+        client.post("/items/bulk/delete", json={"ids": [drop]}, headers=auth_headers)
+        assert run_jobs() == 1
+
+    assert not (tmp_path / "drop-320.webp").exists()
+    assert (tmp_path / hashlib.sha256(content).hexdigest()).exists()
+    assert client.get(f"/items/{keep}").status_code == 200
+
+
+def test_bulk_requests_are_validated(client, auth_headers):
+    """Test that empty and oversized id lists are rejected."""
+    assert client.post("/items/bulk/delete", json={"ids": []}, headers=auth_headers).status_code == 422
+    with patch("app.bulk.BULK_MAX_IDS", 2):
+        ids = [str(uuid.uuid4()) for _ in range(3)]
+        assert client.post("/items/bulk/delete", json={"ids": ids}, headers=auth_headers).status_code == 413
+    assert client.post("/items/bulk/delete", json={"ids": [str(uuid.uuid4())]}).status_code == 401
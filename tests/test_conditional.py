@@ -0,0 +1,105 @@
+import asyncio
+import io
+import uuid
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.models import Post
+from app.response_cache import response_cache
+from tests.conftest import TestSessionLocal
+
+
+@pytest.fixture
+def create_post(client, auth_headers):
+    """Return a helper that uploads a post and returns its id."""
+    def _create(caption="caption"):
+        with patch("app.images.imagekit") as mock_imagekit:
+            mock_imagekit.upload_file.return_value = MagicMock(url="https://ik.imagekit.io/demo/etag.jpg", file_id="etag")
+            files = {"file": ("etag.jpg", io.BytesIO(b"etag"), "image/jpeg")}
+            response = client.post("/upload", files=files, data={"caption": caption}, headers=auth_headers)
+        return response.json()["id"]
+    return _create
+
+
+def test_item_if_none_match_returns_304(client, create_post):
+    """Test that a matching ETag yields an empty 304."""
+    post_id = create_post()
+    first = client.get(f"/items/{post_id}")
+    etag = first.headers["etag"]
+    assert first.headers["last-modified"]
+
+    second = client.get(f"/items/{post_id}", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.content == b""
+    assert second.headers["etag"] == etag
+
+
+def test_item_etag_changes_with_revision(client, auth_headers, create_post):
+    """Test that editing a post invalidates its old ETag."""
+    post_id = create_post()
+    etag = client.get(f"/items/{post_id}").headers["etag"]
+
+    client.patch(f"/items/{post_id}", data={"caption": "edited"}, headers=auth_headers)
+
+    response = client.get(f"/items/{post_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["caption"] == "edited"
+
+
+def test_overlapping_writes_both_bump_the_revision(client, auth_headers, create_post):
+    """Test that a write from a stale copy of a post succeeds and still changes the ETag."""
+    post_id = create_post()
+
+    async def stale_write():
+        async with TestSessionLocal() as session:
+            post = await session.get(Post, uuid.UUID(post_id))
+            # Another request edits the post after this copy was loaded
+            assert client.patch(f"/items/{post_id}", data={"caption": "first"}, headers=auth_headers).status_code == 200
+            post.caption = "second"
+            post.revision = Post.revision + 1
+            await session.commit()
+
+    asyncio.run(stale_write())
+
+    response = client.get(f"/items/{post_id}")
+    assert response.headers["etag"].endswith('.3"')
+    assert response.json()["caption"] == "second"
+
+
+def test_item_if_modified_since(client, create_post):
+    """Test that If-Modified-Since at or after Last-Modified yields 304."""
+    post_id = create_post()
+    last_modified = client.get(f"/items/{post_id}").headers["last-modified"]
+
+    response = client.get(f"/items/{post_id}", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+
+def test_conditional_hit_does_not_build_body(client, create_post):
+    """Test that a revalidation on a cold cache is answered from validators alone."""
+    post_id = create_post()
+    etag = client.get(f"/items/{post_id}").headers["etag"]
+    response_cache.clear()
+    misses = response_cache.metrics()["misses"]
+
+    response = client.get(f"/items/{post_id}", headers={"If-None-Match": etag})
+
+    assert response.status_code == 304
+    assert response_cache.metrics()["misses"] == misses
+
+
+def test_feed_etag_changes_when_a_post_is_added(client, create_post):
+    """Test that feed pages revalidate until their contents change."""
+    create_post()
+    etag = client.get("/items/").headers["etag"]
+    assert client.get("/items/", headers={"If-None-Match": etag}).status_code == 304
+
+    response_cache.clear()
+    assert client.get("/items/", headers={"If-None-Match": etag}).status_code == 304
+
+    create_post()
+    response = client.get("/items/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
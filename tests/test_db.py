@@ -0,0 +1,39 @@
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.pool import NullPool
+
+from app.db import create_engine_from_url, normalize_database_url
+
+
+def test_normalize_database_url_selects_async_drivers():
+    """Test that plain URLs are mapped onto the async drivers."""
+    assert normalize_database_url("postgresql://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+    assert normalize_database_url("postgres://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"
+    assert normalize_database_url("sqlite:///./x.db") == "sqlite+aiosqlite:///./x.db"
+    assert normalize_database_url("postgresql+asyncpg://db/app") == "postgresql+asyncpg://db/app"
+
+
+def test_sqlite_connections_use_wal(tmp_path):
+    """Test that file-backed SQLite connections get WAL and the tuned pragmas."""
+    engine = create_engine_from_url(f"sqlite:///{tmp_path / 'wal.db'}", poolclass=NullPool)
+
+    async def read_pragmas():
+        async with engine.connect() as conn:
+            journal_mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+            synchronous = (await conn.execute(text("PRAGMA synchronous"))).scalar()
+            busy_timeout = (await conn.execute(text("PRAGMA busy_timeout"))).scalar()
+        await engine.dispose()
+        return journal_mode, synchronous, busy_timeout
+
+    journal_mode, synchronous, busy_timeout = asyncio.run(read_pragmas())
+    assert journal_mode == "wal"
+    assert synchronous == 1  # NORMAL
+    assert busy_timeout > 0
+
+
+def test_engine_echo_off_by_default(tmp_path):
+    """Test that SQL statement logging is opt-in."""
+    engine = create_engine_from_url(f"sqlite+aiosqlite:///{tmp_path / 'echo.db'}")
+    assert engine.echo is False
+    assert engine.pool.size() > 0
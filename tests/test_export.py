@@ -0,0 +1,122 @@
+import asyncio
+import csv
+import io
+import json
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from sqlalchemy.pool import NullPool
+
+from app import db
+from app.db import READ_YOUR_WRITES_COOKIE, Base, Replica, ReplicaRouter, get_read_db
+from app.export import export_query, stream_export
+from app.main import app
+from app.models import Post, User
+from app.storage import LocalStorage
+from tests.conftest import TestSessionLocal, register_and_login
+
+
+def create_posts(client, headers, storage, count):
+    with patch("app.main.get_storage", return_value=storage):
+        for i in range(count):
+            files = {"file": (f"{i}.txt", io.BytesIO(uuid.uuid4().bytes), "text/plain")}
+            assert client.post("/upload", files=files, data={"caption": f"export {i}"}, headers=headers).status_code == 200
+
+
+def collect(query):
+    """Run an export to completion and return its chunks."""
+    async def _collect():
+        return [chunk async for chunk in stream_export(query, "ndjson", TestSessionLocal)]
+    return asyncio.run(_collect())
+
+
+def username_of(client, headers):
+    return client.get("/auth/me", headers=headers).json()["username"]
+
+
+def test_export_ndjson_for_one_user(client, auth_headers, tmp_path):
+    """Test that the NDJSON export streams one object per post, oldest first, for the requested user."""
+    storage = LocalStorage(root=tmp_path)
+    create_posts(client, auth_headers, storage, 3)
+    create_posts(client, register_and_login(client), storage, 2)
+    username = username_of(client, auth_headers)
+
+    response = client.get("/export/posts", params={"user": username}, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert 'filename="posts.ndjson"' in response.headers["content-disposition"]
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["caption"] for row in rows] == ["export 0", "export 1", "export 2"]
+    assert {row["username"] for row in rows} == {username}
+    assert set(rows[0]) == {"id", "filename", "file_type", "url", "caption", "created_at", "updated_at", "user_id", "username"}
+
+
+def test_export_csv_with_created_at_range(client, auth_headers, tmp_path):
+    """Test CSV output and that the created_at range is inclusive at the start and exclusive at the end."""
+    create_posts(client, auth_headers, LocalStorage(root=tmp_path), 3)
+    username = username_of(client, auth_headers)
+    everything = [json.loads(line) for line in client.get(
+        "/export/posts", params={"user": username}, headers=auth_headers
+    ).text.splitlines()]
+
+    params = {
+        "user": username,
+        "format": "csv",
+        "created_after": everything[1]["created_at"],
+        "created_before": everything[2]["created_at"],
+    }
+    response = client.get("/export/posts", params=params, headers=auth_headers)
+
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["id"] for row in rows] == [everything[1]["id"]]
+    assert rows[0]["username"] == username
+
+
+def test_export_is_streamed_in_batches(client, auth_headers, tmp_path):
+    """Test that rows are fetched and sent one batch at a time."""
+    create_posts(client, auth_headers, LocalStorage(root=tmp_path), 5)
+    user_id = uuid.UUID(client.get("/auth/me", headers=auth_headers).json()["id"])
+
+    with patch("app.export.EXPORT_BATCH_SIZE", 2):
+        chunks = collect(export_query(user_id))
+
+    assert [chunk.count(b"\n") for chunk in chunks] == [2, 2, 1]
+    assert collect(export_query(user_id, created_after=datetime.utcnow() + timedelta(days=1))) == []
+
+
+def test_export_errors(client, auth_headers):
+    """Test authentication, unknown users and unknown formats."""
+    assert client.get("/export/posts").status_code == 401
+    assert client.get("/export/posts", params={"user": "nobody-here"}, headers=auth_headers).status_code == 404
+    assert client.get("/export/posts", params={"format": "xml"}, headers=auth_headers).status_code == 422
+
+
+def test_export_reads_from_the_request_replica(client, auth_headers, tmp_path):
+    """Test that the streamed rows come from the replica the request was routed to, not the primary."""
+    replica = Replica(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}", poolclass=NullPool)
+    me = client.get("/auth/me", headers=auth_headers).json()
+
+    async def seed():
+        async with replica.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with replica.sessionmaker() as session:
+            # The replica has the caller's account, so authentication can read it there too
+            session.add(User(id=uuid.UUID(me["id"]), username=me["username"], email=me["email"], hashed_password="x"))
+            session.add(Post(url="/uploads/r.txt", file_type="text", file_name="r.txt", caption="on the replica"))
+            await session.commit()
+    asyncio.run(seed())
+
+    override = app.dependency_overrides.pop(get_read_db)
+    try:
+        # Outside the read-your-writes window that registering opened
+        client.cookies.delete(READ_YOUR_WRITES_COOKIE)
+        with patch.object(db, "replica_router", ReplicaRouter([replica])):
+            response = client.get("/export/posts", headers=auth_headers)
+    finally:
+        app.dependency_overrides[get_read_db] = override
+
+    assert response.status_code == 200
+    assert [json.loads(line)["caption"] for line in response.text.splitlines()] == ["on the replica"]
@@ -0,0 +1,63 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.hashing import PasswordHashPool, hash_password, verify_password
+
+
+@pytest.mark.asyncio
+async def test_pool_runs_off_event_loop_and_records_metrics():
+    """Test that hashing runs on a pool thread and latency is recorded."""
+    pool = PasswordHashPool(workers=2, queue_size=2)
+    try:
+        thread_name = await pool.run(lambda: threading.current_thread().name)
+        hashed = await pool.run(hash_password, "secret123")
+        assert await pool.run(verify_password, "secret123", hashed)
+    finally:
+        pool.shutdown()
+
+    assert thread_name.startswith("password-hash")
+    metrics = pool.metrics()
+    assert metrics["completed"] == 3
+    assert metrics["queue_depth"] == 0
+    assert metrics["hash_seconds_max"] > 0
+
+
+@pytest.mark.asyncio
+async def test_pool_rejects_when_saturated():
+    """Test that calls beyond workers + queue_size get 503 with Retry-After."""
+    pool = PasswordHashPool(workers=1, queue_size=1)
+    release = threading.Event()
+    try:
+        running = [asyncio.create_task(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert pool.metrics()["queue_depth"] == 1
+
+        with pytest.raises(HTTPException) as exc_info:
+            await pool.run(release.wait)
+        assert exc_info.value.status_code == 503
+        assert "Retry-After" in exc_info.value.headers
+
+        release.set()
+        await asyncio.gather(*running)
+    finally:
+        release.set()
+        pool.shutdown()
+
+    assert pool.metrics()["rejected"] == 1
+    assert pool.metrics()["completed"] == 2
+
+
+def test_pool_rejects_unknown_kind():
+    """Test that a misconfigured PASSWORD_HASH_POOL fails loudly."""
+    with pytest.raises(ValueError):
+        PasswordHashPool(workers=1, queue_size=1, kind="fiber")
+
+
+def test_password_hashing_metrics_endpoint(client, auth_headers):
+    """Test that logins show up in the password hashing metrics."""
+    data = client.get("/metrics/password-hashing").json()
+    assert data["completed"] >= 2
+    assert "queue_depth" in data
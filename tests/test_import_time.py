@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+# Cumulative time to import app.main in a fresh interpreter, as reported by -X importtime
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "2.0"))
+# Loaded on first use, never just by importing the app
+DEFERRED_MODULES = ("imagekitio", "passlib", "PIL", "pyinstrument")
+
+
+def import_times(module: str) -> dict[str, float]:
+    """Import ``module`` in a new interpreter and return each imported module's cumulative seconds."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, env=os.environ.copy(), capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        # import time: <self us> | <cumulative us> | <indented module name>
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) == 3 and fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1]) / 1e6
+    return times
+
+
+def test_importing_the_app_stays_within_budget():
+    """Test that importing app.main skips the lazily loaded subsystems and stays within the budget."""
+    times = import_times("app.main")
+
+    loaded = sorted(name for name in times if name.split(".")[0] in DEFERRED_MODULES)
+    assert not loaded, f"imported eagerly: {loaded}"
+    assert times["app.main"] < IMPORT_BUDGET_SECONDS, f"app.main took {times['app.main']:.2f}s to import"
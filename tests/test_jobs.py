@@ -0,0 +1,195 @@
+import asyncio
+import io
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from sqlalchemy import select, update
+
+from app import jobs
+from app.models import Job
+from app.storage import LocalStorage
+from tests.conftest import TestSessionLocal, run_jobs
+
+calls = []
+
+
+@jobs.handler("test_record")
+async def record_job(job):
+    calls.append(job.payload["n"])
+
+
+@jobs.handler("test_flaky")
+async def flaky_job(job):
+    calls.append(job.attempts)
+    if job.attempts < job.payload["succeed_on"]:
+        raise RuntimeError(f"attempt {job.attempts} failed")
+
+
+async def enqueue(kind, payloads, key=None, **options):
+    async with TestSessionLocal() as session:
+        await jobs.enqueue_many(session, kind, [(payload, key) for payload in payloads], **options)
+        await session.commit()
+
+
+async def all_jobs():
+    async with TestSessionLocal() as session:
+        return list((await session.execute(select(Job).order_by(Job.id))).scalars())
+
+
+async def make_due():
+    """Move every retry's run_at to the past, as if the backoff had elapsed."""
+    async with TestSessionLocal() as session:
+        await session.execute(update(Job).values(run_at=datetime.utcnow() - timedelta(seconds=1)))
+        await session.commit()
+
+
+def test_idempotency_key_stores_a_job_once():
+    """Test that enqueueing the same key again, even after the job ran, adds nothing."""
+    calls.clear()
+    asyncio.run(enqueue("test_record", [{"n": 1}], key="once"))
+    asyncio.run(enqueue("test_record", [{"n": 2}], key="once"))
+    assert run_jobs() == 1
+    asyncio.run(enqueue("test_record", [{"n": 3}], key="once"))
+
+    assert run_jobs() == 0
+    assert calls == [1]
+    (job,) = asyncio.run(all_jobs())
+    assert (job.status, job.attempts) == ("done", 1)
+
+
+def test_failed_jobs_retry_with_backoff_until_attempts_run_out():
+    """Test exponential retry delays, success on a later attempt and the final failed state."""
+    calls.clear()
+    asyncio.run(enqueue("test_flaky", [{"succeed_on": 2}, {"succeed_on": 9}], max_attempts=3))
+
+    before = datetime.utcnow()
+    assert run_jobs() == 2
+    retried = asyncio.run(all_jobs())
+    assert [job.status for job in retried] == ["pending", "pending"]
+    assert all(job.last_error == "RuntimeError: attempt 1 failed" for job in retried)
+    assert all(job.run_at >= before + timedelta(seconds=jobs.retry_delay(1)) for job in retried)
+    assert jobs.retry_delay(2) == 2 * jobs.retry_delay(1)
+
+    asyncio.run(make_due())
+    assert run_jobs() == 2
+    asyncio.run(make_due())
+    assert run_jobs() == 1
+    assert [(job.status, job.attempts) for job in asyncio.run(all_jobs())] == [("done", 2), ("failed", 3)]
+    assert calls == [1, 1, 2, 2, 3]
+
+
+def test_expired_lease_is_claimed_again():
+    """Test that a job left running by a dead worker is rerun, and the dead worker cannot overwrite it."""
+    calls.clear()
+    asyncio.run(enqueue("test_record", [{"n": 7}]))
+    (lost,) = asyncio.run(jobs.claim_jobs(10))
+    assert asyncio.run(jobs.claim_jobs(10)) == []
+
+    asyncio.run(make_due())
+    assert run_jobs() == 1
+    asyncio.run(jobs._finish(lost, status="failed"))
+
+    (job,) = asyncio.run(all_jobs())
+    assert (job.status, job.attempts) == ("done", 2)
+    assert calls == [7]
+
+
+def test_unknown_kinds_fail_without_retrying():
+    """Test that a job nobody handles is marked failed on its first attempt."""
+    asyncio.run(enqueue("test_no_such_handler", [{}]))
+    assert run_jobs() == 1
+    (job,) = asyncio.run(all_jobs())
+    assert job.status == "failed" and "test_no_such_handler" in job.last_error
+
+
+def test_worker_limits_concurrency_and_requeues_on_stop():
+    """Test that the worker runs at most ``concurrency`` jobs at once and hands back unfinished ones."""
+    state = {"active": 0, "peak": 0, "finished": 0}
+
+    async def scenario():
+        release = asyncio.Event()
+
+        @jobs.handler("test_slow")
+        async def slow_job(job):
+            state["active"] += 1
+            state["peak"] = max(state["peak"], state["active"])
+            try:
+                if job.payload["n"] >= 3:
+                    await asyncio.sleep(60)
+                await release.wait()
+                state["finished"] += 1
+            finally:
+                state["active"] -= 1
+
+        await enqueue("test_slow", [{"n": n} for n in range(5)])
+        worker = jobs.JobWorker(concurrency=2, poll_seconds=0.05)
+        worker.start()
+        while state["active"] < 2:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.1)
+        assert worker.metrics() == {"concurrency": 2, "running": 2}
+        release.set()
+        while state["finished"] < 3:
+            await asyncio.sleep(0.01)
+        await worker.stop(timeout=0.1)
+
+    asyncio.run(scenario())
+
+    assert state["peak"] == 2
+    statuses = [(job.status, job.attempts) for job in asyncio.run(all_jobs())]
+    assert statuses.count(("done", 1)) == 3
+    # Interrupted jobs are due again straight away, without the attempt counting
+    assert statuses.count(("pending", 0)) == 2
+
+
+def test_stop_during_a_claim_requeues_the_claimed_jobs():
+    """Test that jobs claimed while the worker is being stopped are handed back, not left leased."""
+    claim_jobs = jobs.claim_jobs
+
+    async def scenario():
+        claimed = asyncio.Event()
+
+        async def slow_claim(limit):
+            # The claim has committed, but has not returned to the poll loop yet
+            result = await claim_jobs(limit)
+            claimed.set()
+            await asyncio.sleep(0.05)
+            return result
+
+        @jobs.handler("test_blocked")
+        async def blocked_job(job):
+            await asyncio.sleep(60)
+
+        await enqueue("test_blocked", [{}, {}])
+        worker = jobs.JobWorker(concurrency=2, poll_seconds=60)
+        with patch("app.jobs.claim_jobs", slow_claim):
+            worker.start()
+            await claimed.wait()
+            await worker.stop(timeout=0)
+
+    asyncio.run(scenario())
+
+    assert [(job.status, job.attempts) for job in asyncio.run(all_jobs())] == [("pending", 0), ("pending", 0)]
+
+
+def test_deletion_job_keeps_files_uploaded_again(client, auth_headers, tmp_path):
+    """Test that a queued file deletion skips content that was re-uploaded before it ran."""
+    storage = LocalStorage(root=tmp_path)
+    content = f"requeued {uuid.uuid4()}".encode()
+
+    def upload():
+        files = {"file": ("again.txt", io.BytesIO(content), "text/plain")}
+        return client.post("/upload", files=files, headers=auth_headers).json()
+
+    with patch("app.main.get_storage", return_value=storage), \
+            patch("app.blobs.get_storage", return_value=storage):
+        first = upload()
+        client.delete(f"/items/{first['id']}", headers=auth_headers)
+        second = upload()
+        assert run_jobs() == 1
+        assert (tmp_path / second["url"].rsplit("/", 1)[1]).exists()
+
+        client.delete(f"/items/{second['id']}", headers=auth_headers)
+        assert run_jobs() == 1
+    assert list(tmp_path.iterdir()) == []
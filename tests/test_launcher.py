@@ -0,0 +1,70 @@
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import time
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+ROOT = Path(__file__).resolve().parent.parent
+# Both workers must answer within this many seconds of launch
+STARTUP_BUDGET_SECONDS = 20
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_workers_skip_schema_creation_when_the_launcher_did_it():
+    """Test that the lifespan leaves the schema alone when DB_INIT_ON_STARTUP is off."""
+    with patch("app.main.DB_INIT_ON_STARTUP", False), patch("app.main.init_db", new_callable=AsyncMock) as init_db:
+        with TestClient(app) as client:
+            assert client.get("/health").status_code == 200
+    init_db.assert_not_called()
+
+
+def test_launcher_prepares_schema_once_and_drains_on_sigterm(tmp_path):
+    """Test that main.py creates the schema, serves from several workers within budget and exits on SIGTERM."""
+    db_path = tmp_path / "launcher.db"
+    port = free_port()
+    env = {**os.environ, "DATABASE_URL": f"sqlite+aiosqlite:///{db_path}", "UPLOAD_DIR": str(tmp_path / "uploads")}
+    launched = time.monotonic()
+    server = subprocess.Popen(
+        [sys.executable, "main.py", "--host", "127.0.0.1", "--port", str(port), "--workers", "2"],
+        cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    try:
+        ready = False
+        while time.monotonic() - launched < STARTUP_BUDGET_SECONDS and server.poll() is None:
+            try:
+                ready = httpx.get(f"http://127.0.0.1:{port}/health", timeout=1).status_code == 200
+            except httpx.TransportError:
+                pass
+            if ready:
+                break
+            time.sleep(0.1)
+        assert ready, "server did not become ready within the startup budget"
+
+        with sqlite3.connect(db_path) as conn:
+            tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert {"users", "posts", "blobs", "post_variants", "posts_fts"} <= tables
+
+        server.send_signal(signal.SIGTERM)
+        output, _ = server.communicate(timeout=30)
+    finally:
+        if server.poll() is None:
+            server.kill()
+            server.communicate()
+
+    assert server.returncode == 0
+    assert "Database schema ready" in output
+    assert output.count("ready in") >= 3  # the schema step, then one line per worker
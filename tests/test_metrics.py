@@ -0,0 +1,114 @@
+import logging
+import uuid
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app.metrics import (
+    Histogram,
+    MetricsMiddleware,
+    password_hash_seconds,
+    request_db_statements,
+    request_seconds,
+)
+from tests.conftest import TestSessionLocal
+
+
+def observations(histogram, *labels):
+    series = histogram.series.get(labels)
+    return series[2] if series else 0
+
+
+def bucket_count(histogram, upper_bound, *labels):
+    """Observations that fell in the bucket ending at ``upper_bound`` (not cumulative)."""
+    series = histogram.series.get(labels)
+    return series[0][histogram.buckets.index(upper_bound)] if series else 0
+
+
+def instrumented_app(**options):
+    """A one-route app that runs two statements, wrapped in the metrics middleware."""
+    inner = FastAPI()
+
+    @inner.get("/probe/{name}")
+    async def probe(name: str):
+        async with TestSessionLocal() as session:
+            await session.execute(text("SELECT 1"))
+            await session.execute(text("SELECT 2"))
+        return {"name": name}
+
+    return TestClient(MetricsMiddleware(inner, **options))
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test the Prometheus text format of a labelled histogram."""
+    histogram = Histogram("demo_seconds", "Demo.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value, "/a")
+
+    lines = list(histogram.render())
+
+    assert lines[:2] == ["# HELP demo_seconds Demo.", "# TYPE demo_seconds histogram"]
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 2' in lines
+    assert 'demo_seconds_bucket{route="/a",le="1.0"} 3' in lines
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 4' in lines
+    assert 'demo_seconds_sum{route="/a"} 3.65' in lines
+    assert 'demo_seconds_count{route="/a"} 4' in lines
+
+
+def test_requests_are_labelled_by_route_with_statement_counts():
+    """Test that latency is recorded per route template and sampled requests count their statements."""
+    client = instrumented_app(sample_rate=1.0, slow_seconds=0)
+    before = observations(request_seconds, "GET", "/probe/{name}", 200)
+    two_statements_before = bucket_count(request_db_statements, 2, "/probe/{name}")
+
+    client.get("/probe/a")
+    client.get("/probe/b")
+    client.get("/nowhere")
+
+    assert observations(request_seconds, "GET", "/probe/{name}", 200) == before + 2
+    assert observations(request_seconds, "GET", "unmatched", 404) >= 1
+    assert bucket_count(request_db_statements, 2, "/probe/{name}") == two_statements_before + 2
+
+
+def test_unsampled_requests_skip_database_tracking():
+    """Test that with sampling off only the request latency is recorded."""
+    client = instrumented_app(sample_rate=0.0, slow_seconds=0)
+    before = observations(request_db_statements, "/probe/{name}")
+    latency_before = observations(request_seconds, "GET", "/probe/{name}", 200)
+
+    client.get("/probe/c")
+
+    assert observations(request_db_statements, "/probe/{name}") == before
+    assert observations(request_seconds, "GET", "/probe/{name}", 200) == latency_before + 1
+
+
+def test_slow_requests_are_logged_with_their_sql(caplog):
+    """Test that the slow-request log names the request and its statements."""
+    client = instrumented_app(sample_rate=1.0, slow_seconds=1e-9)
+
+    with caplog.at_level(logging.WARNING, logger="app.metrics"):
+        client.get("/probe/slow")
+
+    (record,) = [r for r in caplog.records if "Slow request" in r.getMessage()]
+    message = record.getMessage()
+    assert "GET /probe/slow -> 200" in message
+    assert "2 statements" in message
+    assert "SELECT 1" in message and "SELECT 2" in message
+
+
+def test_metrics_endpoint(client):
+    """Test that /metrics exposes request, hashing and pool metrics in Prometheus format."""
+    hashes_before = observations(password_hash_seconds)
+    name = f"metrics-{uuid.uuid4().hex[:8]}"
+    client.post("/auth/register", json={"username": name, "email": f"{name}@example.com", "password": "secret123"})
+    client.get("/health")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'app_request_duration_seconds_count{method="GET",route="/health",status="200"}' in response.text
+    assert "# TYPE app_password_hash_seconds histogram" in response.text
+    assert "app_response_cache_hits " in response.text
+    assert observations(password_hash_seconds) == hashes_before + 1
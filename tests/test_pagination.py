@@ -0,0 +1,95 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete
+
+from app.models import Post
+from app.pagination import decode_cursor, encode_cursor
+from tests.conftest import TestSessionLocal
+
+
+@pytest.fixture
+def seed_posts():
+    """
+    Return a function inserting ``count`` posts sharing a timestamp, and delete them afterwards.
+
+    Seeded posts are dated in the future so they head the feed; removing them
+    keeps them from pushing other tests' posts off the first page.
+    """
+    seeded = []
+
+    def seed(count, created_at):
+        async def _seed():
+            async with TestSessionLocal() as session:
+                posts = [
+                    Post(url=f"https://example.com/{i}.jpg", file_type="image/jpeg",
+                         file_name=f"{i}.jpg", created_at=created_at)
+                    for i in range(count)
+                ]
+                session.add_all(posts)
+                await session.commit()
+                return [p.id for p in posts]
+        ids = asyncio.run(_seed())
+        seeded.extend(ids)
+        return sorted(str(post_id) for post_id in ids)
+
+    yield seed
+
+    async def _remove():
+        async with TestSessionLocal() as session:
+            await session.execute(delete(Post).where(Post.id.in_(seeded)))
+            await session.commit()
+    asyncio.run(_remove())
+
+
+def test_cursor_round_trip():
+    """Test that a cursor decodes back to the position it was built from."""
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    post_id = uuid.uuid4()
+    assert decode_cursor(encode_cursor(created_at, post_id)) == (created_at, post_id)
+
+
+def test_read_items_invalid_cursor(client):
+    """Test that a malformed cursor is rejected with 400."""
+    response = client.get("/items/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_read_items_limit_bounds(client):
+    """Test that out-of-range page sizes are rejected."""
+    assert client.get("/items/", params={"limit": 0}).status_code == 422
+    assert client.get("/items/", params={"limit": 1000}).status_code == 422
+
+
+def test_read_items_walks_pages_without_gaps(client, seed_posts):
+    """Test that following next_cursor visits every post exactly once, even with tied timestamps."""
+    seeded = seed_posts(5, datetime(2100, 1, 1) + timedelta(minutes=uuid.uuid4().int % 10000))
+
+    seen = []
+    cursor = None
+    while len(seen) < len(seeded):
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        data = client.get("/items/", params=params).json()
+        assert len(data["items"]) <= 2
+        seen.extend(item["id"] for item in data["items"])
+        cursor = data["next_cursor"]
+        if len(seen) < len(seeded):
+            assert cursor is not None
+
+    # Tied timestamps fall back to ascending id order
+    assert seen[:5] == seeded
+
+
+def test_read_items_all_opt_in(client, seed_posts):
+    """Test that all=true returns the full listing without a cursor."""
+    seeded = seed_posts(3, datetime(2099, 1, 1))
+    data = client.get("/items/", params={"all": "true", "limit": 1}).json()
+    ids = {item["id"] for item in data["items"]}
+    assert set(seeded) <= ids
+    assert data["next_cursor"] is None
+    assert data["total"] == len(data["items"])
@@ -0,0 +1,96 @@
+import asyncio
+import json
+from unittest.mock import patch
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.auth import create_access_token
+from app.profiling import ProfilingMiddleware
+from tests.conftest import register_and_login
+
+pytest.importorskip("pyinstrument")
+
+
+def profiled_app(tmp_path, **options):
+    """A one-route app that does some work, wrapped in the profiling middleware."""
+    inner = FastAPI()
+
+    @inner.get("/work/{n}")
+    async def work(n: int):
+        await asyncio.sleep(0.01)
+        return {"total": sum(i * i for i in range(n))}
+
+    return TestClient(ProfilingMiddleware(inner, directory=tmp_path, **options))
+
+
+def stored(tmp_path):
+    return sorted(tmp_path.glob("*.speedscope.json"))
+
+
+def test_sampled_requests_are_saved_with_metadata(tmp_path):
+    """Test that a sampled request leaves a speedscope profile with its route and timing."""
+    client = profiled_app(tmp_path, sample_rate=1.0)
+
+    assert client.get("/work/20000").json()["total"] > 0
+
+    (path,) = stored(tmp_path)
+    document = json.loads(path.read_text())
+    assert document["$schema"].startswith("https://www.speedscope.app")
+    metadata = document["metadata"]
+    assert (metadata["method"], metadata["route"], metadata["status"]) == ("GET", "/work/{n}", 200)
+    # The awaited sleep is attributed to the request
+    assert metadata["duration_ms"] >= 10
+    assert path.name == f"{metadata['id']}.speedscope.json"
+
+
+def test_only_admins_can_request_a_profile(tmp_path):
+    """Test that the X-Profile header is honoured for profiling admins only."""
+    client = profiled_app(tmp_path, sample_rate=0.0)
+    admin = {"Authorization": f"Bearer {create_access_token({'sub': 'ops'})}", "X-Profile": "1"}
+    someone = {"Authorization": f"Bearer {create_access_token({'sub': 'mallory'})}", "X-Profile": "1"}
+
+    with patch("app.profiling.PROFILING_ADMINS", frozenset({"ops"})):
+        client.get("/work/10")
+        assert stored(tmp_path) == []
+        client.get("/work/10", headers=someone)
+        client.get("/work/10", headers={"X-Profile": "1", "Authorization": "Bearer not-a-token"})
+        assert stored(tmp_path) == []
+        client.get("/work/10", headers=admin)
+    assert len(stored(tmp_path)) == 1
+
+
+def test_retention_keeps_newest_profiles(tmp_path):
+    """Test that only the newest profiles are kept on disk."""
+    client = profiled_app(tmp_path, sample_rate=1.0, max_files=2)
+
+    for n in (1, 2, 3):
+        client.get(f"/work/{n}")
+
+    kept = [json.loads(path.read_text())["metadata"]["path"] for path in stored(tmp_path)]
+    assert kept == ["/work/2", "/work/3"]
+
+
+def test_profile_endpoints_are_admin_only(client, tmp_path):
+    """Test listing and downloading profiles, and that other users are refused."""
+    (tmp_path / "20240101T000000000000-abc.speedscope.json").write_text(
+        json.dumps({"metadata": {"id": "20240101T000000000000-abc", "route": "/items/"}})
+    )
+    admin_headers = register_and_login(client)
+    admin = client.get("/auth/me", headers=admin_headers).json()["username"]
+
+    with patch("app.profiling.PROFILING_ENABLED", True), \
+            patch("app.profiling.PROFILING_ADMINS", frozenset({admin})), \
+            patch("app.profiling.PROFILING_DIR", tmp_path):
+        listing = client.get("/admin/profiles", headers=admin_headers)
+        download = client.get("/admin/profiles/20240101T000000000000-abc", headers=admin_headers)
+        missing = client.get("/admin/profiles/..%2Fsecret", headers=admin_headers)
+        refused = client.get("/admin/profiles", headers=register_and_login(client))
+
+    assert listing.json() == {"profiles": [{"id": "20240101T000000000000-abc", "route": "/items/"}]}
+    assert download.status_code == 200 and download.json()["metadata"]["route"] == "/items/"
+    assert missing.status_code == 404
+    assert refused.status_code == 403
+    # Disabled by default
+    assert client.get("/admin/profiles", headers=admin_headers).status_code == 404
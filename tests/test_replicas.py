@@ -0,0 +1,74 @@
+import asyncio
+import io
+import time
+from unittest.mock import MagicMock, patch
+
+from sqlalchemy.pool import NullPool
+from starlette.requests import Request
+
+from app import db
+from app.db import READ_YOUR_WRITES_COOKIE, Replica, ReplicaRouter, get_read_db
+
+
+def make_request(cookies=None):
+    """Build a bare request carrying the given cookies."""
+    cookie_header = "; ".join(f"{key}={value}" for key, value in (cookies or {}).items())
+    headers = [(b"cookie", cookie_header.encode())] if cookie_header else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def bound_engines(router, requests):
+    """Return the engine each request's read session was bound to."""
+    async def _collect():
+        engines = []
+        with patch.object(db, "replica_router", router):
+            for request in requests:
+                sessions = get_read_db(request)
+                session = await sessions.__anext__()
+                engines.append(session.bind)
+                await sessions.aclose()
+        return engines
+    return asyncio.run(_collect())
+
+
+def test_reads_round_robin_over_replicas(tmp_path):
+    """Test that read sessions alternate between replicas."""
+    replicas = [Replica(f"sqlite+aiosqlite:///{tmp_path / name}", poolclass=NullPool) for name in ("a.db", "b.db")]
+    engines = bound_engines(ReplicaRouter(replicas), [make_request() for _ in range(4)])
+    assert engines == [replicas[0].engine, replicas[1].engine, replicas[0].engine, replicas[1].engine]
+
+
+def test_unreachable_replica_is_ejected(tmp_path):
+    """Test that a replica that cannot connect is skipped until its ejection expires."""
+    broken = Replica(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'x.db'}", poolclass=NullPool)
+    healthy = Replica(f"sqlite+aiosqlite:///{tmp_path / 'ok.db'}", poolclass=NullPool)
+    router = ReplicaRouter([broken, healthy], eject_seconds=60)
+
+    engines = bound_engines(router, [make_request() for _ in range(3)])
+
+    assert engines == [healthy.engine] * 3
+    assert not broken.healthy
+
+
+def test_recent_writer_reads_from_primary(tmp_path):
+    """Test that clients inside the read-your-writes window bypass replicas."""
+    replica = Replica(f"sqlite+aiosqlite:///{tmp_path / 'r.db'}", poolclass=NullPool)
+    recent = make_request({READ_YOUR_WRITES_COOKIE: str(int(time.time()) + 30)})
+    stale = make_request({READ_YOUR_WRITES_COOKIE: str(int(time.time()) - 30)})
+
+    engines = bound_engines(ReplicaRouter([replica]), [recent, stale])
+
+    # The primary is whatever engine the session factory is bound to (the test database here)
+    assert engines == [db.AsyncSessionLocal.kw["bind"], replica.engine]
+
+
+@patch("app.images.imagekit")
+def test_mutations_set_read_your_writes_cookie(mock_imagekit, client, auth_headers):
+    """Test that a write pins the client's following reads to the primary."""
+    mock_imagekit.upload_file.return_value = MagicMock(url="https://ik.imagekit.io/demo/ryw.jpg", file_id="ryw")
+    files = {"file": ("ryw.jpg", io.BytesIO(b"ryw"), "image/jpeg")}
+
+    response = client.post("/upload", files=files, headers=auth_headers)
+
+    assert response.status_code == 200
+    assert int(response.cookies[READ_YOUR_WRITES_COOKIE]) > time.time()
@@ -0,0 +1,171 @@
+import asyncio
+import io
+import uuid
+from unittest.mock import MagicMock, patch
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.pool import NullPool
+
+from app import db
+from app.cache import MemoryCache
+from app.db import READ_YOUR_WRITES_COOKIE, Base, Replica, ReplicaRouter, get_read_db
+from app.main import app
+from app.models import Post
+from app.response_cache import (
+    RESPONSE_CACHE_LOCAL_TTL,
+    RESPONSE_CACHE_TTL,
+    CachedBody,
+    ResponseCache,
+    _create_response_cache,
+)
+from tests.conftest import count_statements
+
+
+def make_builder(body=b"{}", tags=("post:1",), delay=0.0):
+    """Return a build callable that counts its invocations."""
+    calls = []
+
+    async def build():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return CachedBody(body, etag='"v1"'), tags
+
+    return build, calls
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_build_once():
+    """Test that concurrent requests for a cold key share one build."""
+    cache = ResponseCache(local=MemoryCache())
+    build, calls = make_builder(b'{"a":1}', delay=0.05)
+
+    entries = await asyncio.gather(*(cache.get_or_build("k", build) for _ in range(5)))
+
+    assert [entry.body for entry in entries] == [b'{"a":1}'] * 5
+    assert len(calls) == 1
+    assert cache.metrics()["misses"] == 1
+    assert cache.metrics()["coalesced"] == 4
+
+
+@pytest.mark.asyncio
+async def test_build_errors_are_shared_but_not_cached():
+    """Test that a failing build reaches every waiter and is retried next time."""
+    cache = ResponseCache(local=MemoryCache())
+    calls = []
+
+    async def build():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise HTTPException(status_code=404, detail="Post not found")
+
+    results = await asyncio.gather(*(cache.get_or_build("k", build) for _ in range(3)), return_exceptions=True)
+    assert all(isinstance(result, HTTPException) for result in results)
+    assert len(calls) == 1
+
+    with pytest.raises(HTTPException):
+        await cache.get_or_build("k", build)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_invalidate_only_drops_tagged_keys():
+    """Test that invalidating a tag leaves unrelated entries cached."""
+    cache = ResponseCache(local=MemoryCache())
+    await cache.get_or_build("a", make_builder(tags=["post:1", "feed:head"])[0])
+    await cache.get_or_build("b", make_builder(tags=["post:2"])[0])
+
+    await cache.invalidate("post:1")
+
+    rebuild_a, calls_a = make_builder()
+    rebuild_b, calls_b = make_builder()
+    await cache.get_or_build("a", rebuild_a)
+    await cache.get_or_build("b", rebuild_b)
+    assert (len(calls_a), len(calls_b)) == (1, 0)
+
+
+@pytest.mark.asyncio
+async def test_shared_tier_serves_other_workers():
+    """Test that a body built by one worker is reused by another through the shared tier."""
+    shared = MemoryCache()
+    worker_a = ResponseCache(local=MemoryCache(), shared=shared)
+    worker_b = ResponseCache(local=MemoryCache(), shared=shared)
+
+    await worker_a.get_or_build("k", make_builder(b"shared", tags=["post:9"])[0])
+    build, calls = make_builder()
+    entry = await worker_b.get_or_build("k", build)
+    assert (entry.body, entry.etag) == (b"shared", '"v1"')
+    assert not calls
+    assert worker_b.metrics()["shared_hits"] == 1
+
+    # Invalidation from one worker clears the shared copy and the writer's local copy
+    await worker_a.invalidate("post:9")
+    assert await shared.get("k") is None
+
+
+@patch("app.images.imagekit")
+def test_item_cache_hit_and_write_invalidation(mock_imagekit, client, auth_headers):
+    """Test that cached posts skip the DB and edits invalidate them."""
+    mock_imagekit.upload_file.return_value = MagicMock(url="https://ik.imagekit.io/demo/cached.jpg", file_id="cached")
+    files = {"file": ("cached.jpg", io.BytesIO(b"cached"), "image/jpeg")}
+    post_id = client.post("/upload", files=files, data={"caption": "before"}, headers=auth_headers).json()["id"]
+
+    assert client.get(f"/items/{post_id}").json()["caption"] == "before"
+    assert count_statements(lambda: client.get(f"/items/{post_id}")) == 0
+
+    client.patch(f"/items/{post_id}", data={"caption": "after"}, headers=auth_headers)
+    assert client.get(f"/items/{post_id}").json()["caption"] == "after"
+
+    feed_ids = [item["id"] for item in client.get("/items/").json()["items"]]
+    assert post_id in feed_ids
+    client.delete(f"/items/{post_id}", headers=auth_headers)
+    assert post_id not in [item["id"] for item in client.get("/items/").json()["items"]]
+    assert client.get(f"/items/{post_id}").status_code == 404
+
+
+def test_response_cache_metrics_endpoint(client):
+    """Test that hit/miss counters are exposed."""
+    data = client.get("/metrics/response-cache").json()
+    assert {"hits", "misses", "coalesced", "hit_ratio"} <= set(data)
+
+
+@patch("app.images.imagekit")
+def test_cached_bodies_are_built_from_the_primary(mock_imagekit, client, auth_headers, tmp_path):
+    """Test that a replica lagging behind a write cannot put the old body back in the shared cache."""
+    mock_imagekit.upload_file.return_value = MagicMock(url="https://ik.imagekit.io/demo/lag.jpg", file_id="lag")
+    files = {"file": ("lag.jpg", io.BytesIO(b"lag"), "image/jpeg")}
+    post_id = client.post("/upload", files=files, data={"caption": "edited"}, headers=auth_headers).json()["id"]
+    replica = Replica(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}", poolclass=NullPool)
+
+    async def seed():
+        # The replica has not caught up with the edit yet
+        async with replica.engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with replica.sessionmaker() as session:
+            session.add(Post(id=uuid.UUID(post_id), url="/uploads/lag", file_type="image/jpeg",
+                             file_name="lag.jpg", caption="original"))
+            await session.commit()
+    asyncio.run(seed())
+
+    override = app.dependency_overrides.pop(get_read_db)
+    try:
+        # A reader outside the writer's read-your-writes window
+        client.cookies.delete(READ_YOUR_WRITES_COOKIE)
+        with patch.object(db, "replica_router", ReplicaRouter([replica])):
+            item = client.get(f"/items/{post_id}").json()
+            feed = client.get("/items/", params={"all": "true"}).json()
+    finally:
+        app.dependency_overrides[get_read_db] = override
+
+    assert item["caption"] == "edited"
+    assert next(p for p in feed["items"] if p["id"] == post_id)["caption"] == "edited"
+
+
+def test_memory_cache_entries_are_short_lived_with_several_workers():
+    """Test that per-worker entries expire quickly when other workers' writes cannot invalidate them."""
+    with patch("app.response_cache.WEB_CONCURRENCY", 4):
+        several = _create_response_cache()
+    with patch("app.response_cache.WEB_CONCURRENCY", 1):
+        single = _create_response_cache()
+
+    assert several.local_ttl == RESPONSE_CACHE_LOCAL_TTL < single.local_ttl == RESPONSE_CACHE_TTL
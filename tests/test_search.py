@@ -0,0 +1,136 @@
+import asyncio
+import io
+import uuid
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.search import highlight, install_search, search_terms
+from app.storage import LocalStorage
+from tests.conftest import TestSessionLocal
+
+
+@pytest.fixture
+def post(client, auth_headers, tmp_path):
+    """Create posts through the API and return a helper that makes more."""
+    storage = LocalStorage(root=tmp_path)
+
+    def create(caption, file_name="photo.jpg"):
+        files = {"file": (file_name, io.BytesIO(uuid.uuid4().bytes), "text/plain")}
+        with patch("app.main.get_storage", return_value=storage):
+            response = client.post("/upload", files=files, data={"caption": caption}, headers=auth_headers)
+        assert response.status_code == 200
+        return response.json()["id"]
+    return create
+
+
+def search(client, q, **params):
+    response = client.get("/search", params={"q": q, **params})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_search_ranks_and_highlights(client, post):
+    """Test that captions are matched, ranked and highlighted."""
+    word = f"zebra{uuid.uuid4().hex[:8]}"
+    once = post(f"A {word} at the <zoo>")
+    twice = post(f"{word} and another {word}")
+    post("Nothing to see here")
+
+    result = search(client, word)
+
+    assert [item["id"] for item in result["items"]] == [twice, once]
+    assert result["next_cursor"] is None
+    assert result["items"][1]["highlights"]["caption"] == f"A <mark>{word}</mark> at the &lt;zoo&gt;"
+    assert result["items"][1]["highlights"]["filename"] is None
+
+
+def test_search_matches_file_names_prefixes_and_all_terms(client, post):
+    """Test file-name matches, prefix matching of the last word and AND semantics."""
+    tag = uuid.uuid4().hex[:10]
+    by_name = post("Holiday", file_name=f"IMG_{tag}.JPG")
+    both = post(f"Holiday {tag}")
+
+    assert {item["id"] for item in search(client, tag)["items"]} == {by_name, both}
+    assert {item["id"] for item in search(client, f"holiday {tag[:6]}")["items"]} == {by_name, both}
+    assert [item["id"] for item in search(client, f"holiday {tag}")["items"]][0] == both
+    assert search(client, f"missing{tag}")["items"] == []
+
+
+def test_search_paginates_by_cursor(client, post):
+    """Test that cursor pages cover every hit exactly once, in rank order."""
+    word = f"paged{uuid.uuid4().hex[:8]}"
+    ids = {post(f"{word} " * (i % 3 + 1)) for i in range(7)}
+
+    seen, cursor = [], None
+    while True:
+        page = search(client, word, limit=3, **({"cursor": cursor} if cursor else {}))
+        seen.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert len(seen) == 7 and set(seen) == ids
+    assert seen == [item["id"] for item in search(client, word, limit=50)["items"]]
+
+
+def test_search_index_follows_edits_and_deletes(client, auth_headers, post):
+    """Test that the index is kept in sync with caption edits and deletions."""
+    old, new = f"old{uuid.uuid4().hex[:8]}", f"new{uuid.uuid4().hex[:8]}"
+    post_id = post(old)
+
+    client.patch(f"/items/{post_id}", data={"caption": new}, headers=auth_headers)
+    assert search(client, old)["items"] == []
+    assert [item["id"] for item in search(client, new)["items"]] == [post_id]
+
+    client.delete(f"/items/{post_id}", headers=auth_headers)
+    assert search(client, new)["items"] == []
+
+
+def test_search_index_survives_renumbered_rowids(client, auth_headers, post):
+    """Test that the index does not depend on the posts table's implicit rowid, which VACUUM may renumber."""
+    old, new = f"old{uuid.uuid4().hex[:8]}", f"new{uuid.uuid4().hex[:8]}"
+    post_id = post(old)
+
+    async def renumber():
+        async with TestSessionLocal() as session:
+            await session.execute(text("UPDATE posts SET rowid = rowid + 1000000"))
+            await session.commit()
+    asyncio.run(renumber())
+
+    assert [item["id"] for item in search(client, old)["items"]] == [post_id]
+    client.patch(f"/items/{post_id}", data={"caption": new}, headers=auth_headers)
+    assert search(client, old)["items"] == []
+    assert [item["id"] for item in search(client, new)["items"]] == [post_id]
+    client.delete(f"/items/{post_id}", headers=auth_headers)
+    assert search(client, new)["items"] == []
+
+
+def test_rowid_keyed_index_is_replaced(tmp_path):
+    """Test that an index installed before search_rowid is rebuilt on the new key, keeping existing posts."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE posts (id CHAR(32) PRIMARY KEY, caption VARCHAR, file_name VARCHAR)"))
+        conn.execute(text("INSERT INTO posts VALUES ('a', 'legacy walrus', 'a.jpg')"))
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE posts_fts USING fts5(caption, file_name, content='posts', content_rowid='rowid')"
+        ))
+        conn.execute(text("CREATE TRIGGER posts_fts_insert AFTER INSERT ON posts BEGIN SELECT 1; END"))
+        install_search(None, conn)
+        conn.execute(text("INSERT INTO posts (id, caption, file_name) VALUES ('b', 'new walrus', 'b.jpg')"))
+        hits = conn.execute(text(
+            "SELECT posts.id FROM posts_fts JOIN posts ON posts.search_rowid = posts_fts.rowid "
+            "WHERE posts_fts MATCH 'walrus' ORDER BY posts.id"
+        )).scalars().all()
+    engine.dispose()
+
+    assert hits == ["a", "b"]
+
+
+def test_search_input_is_sanitized(client):
+    """Test that FTS query syntax in user input cannot break the query."""
+    assert search_terms('NEAR("a" b) OR c* -d:e') == ["near", "a", "b", "or", "c", "d", "e"]
+    assert search(client, '" * ( )')["items"] == []
+    assert client.get("/search", params={"q": "x", "cursor": "garbage"}).status_code == 400
+    assert highlight("no match") is None
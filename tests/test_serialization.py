@@ -0,0 +1,54 @@
+import json
+import uuid
+from datetime import datetime
+from unittest.mock import patch
+
+from app import serialization
+from app.models import Post
+from app.schemas import PostResponse
+from app.serialization import dumps, post_payload
+
+
+def make_post(**overrides):
+    """Build a transient post."""
+    fields = dict(
+        id=uuid.uuid4(), url="https://example.com/a.jpg", file_type="image/jpeg",
+        file_name="a.jpg", caption="hello", user_id=uuid.uuid4(),
+        created_at=datetime(2024, 3, 4, 5, 6, 7, 890123),
+    )
+    fields.update(overrides)
+    return Post(**fields)
+
+
+def test_dumps_matches_legacy_string_format():
+    """Test that UUIDs and datetimes encode exactly as the old str()/isoformat() output."""
+    post = make_post()
+    data = json.loads(dumps(post_payload(post)))
+    assert data["id"] == str(post.id)
+    assert data["user_id"] == str(post.user_id)
+    assert data["created_at"] == post.created_at.isoformat()
+    assert data["filename"] == "a.jpg"
+
+
+def test_stdlib_fallback_matches_orjson():
+    """Test that the no-orjson fallback produces the same document."""
+    payload = post_payload(make_post(user_id=None, caption=None))
+    with patch.object(serialization, "orjson", None):
+        fallback = dumps(payload)
+    assert json.loads(fallback) == json.loads(dumps(payload))
+
+
+def test_payload_satisfies_response_model():
+    """Test that post_payload output validates against PostResponse."""
+    post = make_post()
+    model = PostResponse.model_validate(post_payload(post))
+    assert model == PostResponse.model_validate(post)
+    assert model.filename == post.file_name
+
+
+def test_openapi_documents_post_schemas(client):
+    """Test that post endpoints advertise their response models."""
+    schema = client.get("/openapi.json").json()
+    feed = schema["paths"]["/items/"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert feed["$ref"].endswith("/FeedPage")
+    assert "PostResponse" in schema["components"]["schemas"]
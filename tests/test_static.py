@@ -0,0 +1,86 @@
+import gzip
+import re
+
+from app.static import IMMUTABLE, StaticSite, fingerprinted_name
+
+
+def make_frontend(root):
+    (root / "js").mkdir()
+    (root / "css").mkdir()
+    (root / "css" / "styles.css").write_text("body { color: black; }\n" * 50)
+    (root / "js" / "auth.js").write_text("export const token = () => localStorage.getItem('t');\n" * 20)
+    (root / "js" / "api.js").write_text("import { token } from './auth.js';\nexport const get = () => token();\n")
+    (root / "index.html").write_text(
+        '<link href="/frontend/css/styles.css" rel="stylesheet">'
+        '<script type="module" src="/frontend/js/api.js?v=2"></script>'
+    )
+    return StaticSite(root=root)
+
+
+def test_references_are_rewritten_to_fingerprinted_urls(tmp_path):
+    """Test that pages and modules point at fingerprinted assets that change with their imports."""
+    site = make_frontend(tmp_path)
+    site.load()
+    page = site.pages["index.html"].content.decode()
+    api_url, auth_url = site.url_for("js/api.js"), site.url_for("js/auth.js")
+
+    assert site.url_for("css/styles.css") in page
+    assert f'src="{api_url}"' in page and "?v=2" not in page
+    api, immutable = site.asset(api_url.removeprefix("/frontend/"))
+    assert immutable
+    assert f"from './{auth_url.rsplit('/', 1)[1]}'" in api.content.decode()
+
+    # Editing a dependency changes the fingerprint of every module importing it
+    (tmp_path / "js" / "auth.js").write_text("export const token = () => null;\n")
+    site.load()
+    assert site.url_for("js/auth.js") != auth_url
+    assert site.url_for("js/api.js") != api_url
+
+
+def test_reload_picks_up_edits(tmp_path):
+    """Test that reloading mode notices changed files and the default mode does not."""
+    site = make_frontend(tmp_path)
+    site.reload = True
+    site.ensure_loaded()
+    before = site.url_for("css/styles.css")
+    (tmp_path / "css" / "styles.css").write_text("body { color: red; }\n")
+    assert site.url_for("css/styles.css") != before
+
+    assert fingerprinted_name("js/api.js", "abc") == "js/api.abc.js"
+
+
+def test_assets_are_precompressed_and_negotiated(client):
+    """Test that Accept-Encoding picks the best stored encoding and fingerprinted URLs are immutable."""
+    page = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert page.status_code == 200
+    assert page.headers["content-encoding"] == "gzip"
+    assert page.headers["cache-control"] == "no-cache"
+    assert page.headers["vary"] == "Accept-Encoding"
+
+    css_url = re.search(r'/frontend/css/styles\.[0-9a-f]+\.css', page.text).group(0)
+    raw = client.get(css_url, headers={"Accept-Encoding": "identity"})
+    assert raw.headers["cache-control"] == IMMUTABLE
+    assert "content-encoding" not in raw.headers
+
+    # Decode by hand so the test sees the bytes that went over the wire
+    with client.stream("GET", css_url, headers={"Accept-Encoding": "br;q=0, gzip"}) as compressed:
+        assert compressed.headers["content-encoding"] == "gzip"
+        body = b"".join(compressed.iter_raw())
+    assert gzip.decompress(body) == raw.content
+    assert len(body) < len(raw.content)
+
+
+def test_pages_and_plain_assets_revalidate(client):
+    """Test that the page index and unfingerprinted URLs answer conditional requests."""
+    page = client.get("/post.html", headers={"Accept-Encoding": "identity"})
+    assert page.status_code == 200
+    assert client.get("/post.html", headers={"If-None-Match": page.headers["etag"]}).status_code == 304
+
+    plain = client.get("/frontend/js/api.js")
+    assert plain.status_code == 200
+    assert plain.headers["cache-control"] == "no-cache"
+    assert plain.headers["content-type"].startswith("application/javascript")
+
+    assert client.get("/missing.html").status_code == 404
+    assert client.get("/frontend/js/missing.js").status_code == 404
+    assert client.get("/frontend/../app/main.py").status_code == 404
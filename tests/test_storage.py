@@ -0,0 +1,102 @@
+import hashlib
+import io
+from unittest.mock import patch
+
+import pytest
+from fastapi import UploadFile
+
+from app import main
+from app.storage import LocalStorage, get_storage
+
+
+@pytest.mark.asyncio
+async def test_local_storage_is_content_addressed(tmp_path):
+    """Test that the local backend names files by content hash and stores duplicates once."""
+    storage = LocalStorage(root=tmp_path)
+    content = b"local storage content"
+    digest = hashlib.sha256(content).hexdigest()
+
+    first = await storage.save(UploadFile(filename="Photo.JPG", file=io.BytesIO(content)))
+    second = await storage.save(UploadFile(filename="copy.jpg", file=io.BytesIO(content)))
+
+    assert first.url == f"/uploads/{digest}.jpg"
+    assert second.file_id == first.file_id
+    assert sorted(p.name for p in tmp_path.iterdir()) == [f"{digest}.jpg"]
+    assert (tmp_path / f"{digest}.jpg").read_bytes() == content
+
+
+def test_local_storage_resolve_rejects_escapes(tmp_path):
+    """Test that only plain, visible files inside the upload directory resolve."""
+    storage = LocalStorage(root=tmp_path)
+    assert storage.resolve("a.jpg") == (tmp_path / "a.jpg").resolve()
+    assert storage.resolve("../secret") is None
+    assert storage.resolve(".upload-partial") is None
+
+
+def test_get_storage_rejects_unknown_backend():
+    """Test that a misconfigured STORAGE_BACKEND fails loudly."""
+    get_storage.cache_clear()
+    try:
+        with patch("app.storage.STORAGE_BACKEND", "ftp"):
+            with pytest.raises(ValueError):
+                get_storage()
+    finally:
+        get_storage.cache_clear()
+
+
+def test_serve_upload_supports_range_and_immutable_cache(client, tmp_path):
+    """Test that stored uploads are served with Range support and long-lived caching."""
+    content = bytes(range(256))
+    name = f"{hashlib.sha256(content).hexdigest()}.png"
+    (tmp_path / name).write_bytes(content)
+
+    with patch.object(main, "local_uploads", LocalStorage(root=tmp_path)):
+        full = client.get(f"/uploads/{name}")
+        partial = client.get(f"/uploads/{name}", headers={"Range": "bytes=10-19"})
+        missing = client.get("/uploads/missing.png")
+
+    assert full.status_code == 200
+    assert full.content == content
+    assert "immutable" in full.headers["cache-control"]
+    assert partial.status_code == 206
+    assert partial.content == content[10:20]
+    assert missing.status_code == 404
+
+
+def test_upload_with_local_backend(client, auth_headers, tmp_path):
+    """Test that /upload stores through the local backend when it is selected."""
+    with patch("app.main.get_storage", return_value=LocalStorage(root=tmp_path)):
+        files = {"file": ("local.png", io.BytesIO(b"local upload"), "image/png")}
+        response = client.post("/upload", files=files, headers=auth_headers)
+
+    assert response.status_code == 200
+    digest = hashlib.sha256(b"local upload").hexdigest()
+    assert response.json()["url"] == f"/uploads/{digest}.png"
+
+
+@pytest.mark.asyncio
+async def test_local_storage_drops_extensions_that_are_not_media(tmp_path):
+    """Test that only image and video extensions are kept on stored names."""
+    storage = LocalStorage(root=tmp_path)
+    digest = hashlib.sha256(b"<script>alert(1)</script>").hexdigest()
+
+    stored = await storage.save(UploadFile(filename="x.html", file=io.BytesIO(b"<script>alert(1)</script>")))
+
+    assert stored.file_id == digest
+
+
+def test_serve_upload_only_renders_media_inline(client, tmp_path):
+    """Test that files that could run script on the app's origin are only served as downloads."""
+    (tmp_path / "photo.png").write_bytes(b"png")
+    # Stored before extensions were restricted
+    (tmp_path / "drawing.svg").write_bytes(b"<svg onload='alert(1)'/>")
+
+    with patch.object(main, "local_uploads", LocalStorage(root=tmp_path)):
+        media = client.get("/uploads/photo.png")
+        other = client.get("/uploads/drawing.svg")
+
+    assert media.headers["content-type"] == "image/png"
+    assert "content-disposition" not in media.headers
+    assert other.headers["content-type"] == "application/octet-stream"
+    assert other.headers["content-disposition"] == "attachment"
+    assert all(r.headers["x-content-type-options"] == "nosniff" for r in (media, other))
@@ -0,0 +1,90 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+from jose import JWTError, jwt
+from sqlalchemy import select
+
+from app.auth import UserPrincipal, create_access_token, decode_access_token, token_cache
+from app.cache import MemoryCache
+from app.models import User
+from tests.conftest import TestSessionLocal, count_statements
+
+
+def test_me_is_served_from_cache(client, auth_headers):
+    """Test that repeated authenticated calls skip the user lookup."""
+    first = client.get("/auth/me", headers=auth_headers)
+    assert first.status_code == 200
+
+    assert count_statements(lambda: client.get("/auth/me", headers=auth_headers)) == 0
+    assert client.get("/auth/me", headers=auth_headers).json() == first.json()
+
+
+def test_token_signature_is_checked_once(client, auth_headers):
+    """Test that a token presented repeatedly is only decoded and verified the first time."""
+    with patch("app.auth.jwt.decode", wraps=jwt.decode) as decode:
+        for _ in range(3):
+            assert client.get("/auth/me", headers=auth_headers).status_code == 200
+    assert decode.call_count == 1
+
+
+def test_token_cache_only_holds_valid_unexpired_tokens():
+    """Test that invalid and expired tokens are rejected and never cached."""
+    token = create_access_token({"sub": "alice"}, expires_delta=timedelta(minutes=5))
+    assert decode_access_token(token)["sub"] == "alice"
+    key_count = len(token_cache._entries)
+
+    with pytest.raises(JWTError):
+        decode_access_token(token[:-2] + ("AA" if not token.endswith("AA") else "BB"))
+    with pytest.raises(JWTError):
+        decode_access_token(create_access_token({"sub": "alice"}, expires_delta=timedelta(seconds=-1)))
+    assert len(token_cache._entries) == key_count
+
+    # The cached claims expire with the token
+    expires_at, claims, _ = next(reversed(token_cache._entries.values()))
+    assert claims["sub"] == "alice"
+    assert expires_at - time.monotonic() <= claims["exp"] - time.time() + 1
+
+
+def test_deactivating_user_invalidates_cache(client, auth_headers):
+    """Test that committing an is_active change drops the cached principal."""
+    username = client.get("/auth/me", headers=auth_headers).json()["username"]
+
+    async def deactivate():
+        async with TestSessionLocal() as session:
+            result = await session.execute(select(User).where(User.username == username))
+            result.scalar_one().is_active = False
+            await session.commit()
+
+    asyncio.run(deactivate())
+
+    response = client.get("/auth/me", headers=auth_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Inactive user"
+
+
+def test_user_principal_json_round_trip():
+    """Test that principals survive serialization for shared cache backends."""
+    import uuid
+    principal = UserPrincipal(
+        id=uuid.uuid4(), username="alice", email="alice@example.com",
+        is_active=True, created_at=datetime(2024, 1, 2, 3, 4, 5),
+    )
+    assert UserPrincipal.from_json(principal.to_json()) == principal
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_ttl_and_lru():
+    """Test that the memory cache expires entries and evicts the least recently used."""
+    cache = MemoryCache(maxsize=2)
+    await cache.set("a", b"1", ttl=60)
+    await cache.set("b", b"2", ttl=60)
+    assert await cache.get("a") == b"1"
+    await cache.set("c", b"3", ttl=60)
+    assert await cache.get("b") is None
+    assert await cache.get("a") == b"1"
+
+    await cache.set("expired", b"x", ttl=-1)
+    assert await cache.get("expired") is None
@@ -0,0 +1,79 @@
+import io
+import sqlite3
+import uuid
+from unittest.mock import patch
+
+from app.storage import LocalStorage
+from tests.conftest import TEST_DB_PATH, count_statements, register_and_login
+
+
+def create_posts(client, headers, storage, count):
+    ids = []
+    with patch("app.main.get_storage", return_value=storage):
+        for i in range(count):
+            files = {"file": (f"{i}.txt", io.BytesIO(uuid.uuid4().bytes), "text/plain")}
+            response = client.post("/upload", files=files, data={"caption": f"post {i}"}, headers=headers)
+            ids.append(response.json()["id"])
+    return ids
+
+
+def username_of(client, headers):
+    return client.get("/auth/me", headers=headers).json()["username"]
+
+
+def test_user_posts_pages_newest_first(client, auth_headers, tmp_path):
+    """Test that a user's posts are paginated newest first and exclude other users' posts."""
+    storage = LocalStorage(root=tmp_path)
+    mine = create_posts(client, auth_headers, storage, 5)
+    create_posts(client, register_and_login(client), storage, 2)
+    username = username_of(client, auth_headers)
+
+    first = client.get(f"/users/{username}/posts", params={"limit": 3}).json()
+    second = client.get(f"/users/{username}/posts", params={"limit": 3, "cursor": first["next_cursor"]}).json()
+
+    assert [item["id"] for item in first["items"] + second["items"]] == mine[::-1]
+    assert second["next_cursor"] is None
+    assert {item["author"]["username"] for item in first["items"]} == {username}
+    assert client.get("/users/nobody-here/posts").status_code == 404
+
+
+def test_user_posts_statement_count_is_constant(client, auth_headers, tmp_path):
+    """Test that a page costs the same number of queries whether it holds 2 or 20 posts."""
+    storage = LocalStorage(root=tmp_path)
+    few_headers, many_headers = auth_headers, register_and_login(client)
+    create_posts(client, few_headers, storage, 2)
+    create_posts(client, many_headers, storage, 20)
+    few, many = username_of(client, few_headers), username_of(client, many_headers)
+
+    few_count = count_statements(lambda: client.get(f"/users/{few}/posts", params={"limit": 20}))
+    many_count = count_statements(lambda: client.get(f"/users/{many}/posts", params={"limit": 20}))
+
+    # User lookup, the page itself (authors joined in) and one query for all variants
+    assert few_count == many_count == 3
+
+
+def test_feed_includes_authors_without_extra_queries(client, auth_headers, tmp_path):
+    """Test that feed items carry their author and the page cost does not grow with it."""
+    storage = LocalStorage(root=tmp_path)
+    created = set(create_posts(client, auth_headers, storage, 3))
+    created |= set(create_posts(client, register_and_login(client), storage, 3))
+
+    result = {}
+    statements = count_statements(lambda: result.update(client.get("/items/", params={"limit": 6}).json()))
+
+    assert statements == 2
+    assert {item["id"] for item in result["items"]} == created
+    assert all(item["author"]["id"] == item["user_id"] for item in result["items"])
+    assert len({item["author"]["username"] for item in result["items"]}) == 2
+
+
+def test_user_posts_query_uses_index():
+    """Test that per-user pages are served from the (user_id, created_at) index."""
+    with sqlite3.connect(TEST_DB_PATH) as conn:
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM posts WHERE user_id = ? ORDER BY created_at DESC, id LIMIT 21",
+            ("0" * 32,),
+        ).fetchall()
+    details = " ".join(row[-1] for row in plan)
+    assert "ix_posts_user_id_created_at" in details
+    assert "TEMP B-TREE" not in details
@@ -0,0 +1,201 @@
+import asyncio
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
+
+import pytest
+
+from app.imaging import generate_variants
+from app.storage import LocalStorage
+from tests.conftest import run_jobs
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def make_jpeg(path, size=(1600, 1200), orientation=None):
+    """Write a JPEG with some EXIF metadata and return its path."""
+    image = Image.new("RGB", size, (200, 40, 40))
+    exif = Image.Exif()
+    exif[0x010F] = "Test Camera"  # Make
+    if orientation is not None:
+        exif[0x0112] = orientation
+    image.save(path, "JPEG", exif=exif)
+    return str(path)
+
+
+def test_generate_variants_widths_formats_and_no_exif(tmp_path):
+    """Test that each smaller width is rendered in every format without metadata."""
+    source = make_jpeg(tmp_path / "photo.jpg")
+
+    variants = generate_variants(source, [320, 640, 1280, 4000], ["webp", "jpeg"])
+
+    assert sorted((v.width, v.format) for v in variants) == [
+        (320, "jpeg"), (320, "webp"), (640, "jpeg"), (640, "webp"), (1280, "jpeg"), (1280, "webp"),
+    ]
+    for variant in variants:
+        rendered = Image.open(io.BytesIO(variant.data))
+        assert rendered.size == (variant.width, variant.height)
+        assert variant.height == variant.width * 3 // 4
+        assert not rendered.getexif()
+
+
+def test_generate_variants_applies_orientation(tmp_path):
+    """Test that the EXIF orientation is baked into the pixels before it is stripped."""
+    source = make_jpeg(tmp_path / "rotated.jpg", size=(800, 400), orientation=6)
+
+    resizes = []
+    resize = Image.Image.resize
+
+    def recording_resize(image, size, *args, **kwargs):
+        resizes.append((image.width, size[0]))
+        return resize(image, size, *args, **kwargs)
+
+    with patch.object(Image.Image, "resize", recording_resize):
+        (variant,) = generate_variants(source, [320, 640], ["jpeg"])
+
+    # Displayed 400 px wide, so 640 would be an upscale
+    assert (variant.width, variant.height) == (320, 640)
+    # Decoded at least as wide as the target, then only ever scaled down
+    assert resizes and all(decoded >= target for decoded, target in resizes)
+
+
+def test_small_images_are_reencoded_at_their_own_width(tmp_path):
+    """Test that an image narrower than every target still gets one variant."""
+    source = tmp_path / "small.png"
+    Image.new("RGBA", (200, 100), (0, 0, 255, 128)).save(source)
+
+    variants = generate_variants(str(source), [320, 640], ["webp", "jpeg"])
+
+    assert [(v.width, v.format) for v in variants] == [(200, "webp"), (200, "jpeg")]
+
+
+def test_generate_variants_runs_in_process_pool(tmp_path):
+    """Test that the worker function and its results cross a process boundary."""
+    source = make_jpeg(tmp_path / "photo.jpg", size=(700, 700))
+
+    async def run():
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            return await asyncio.get_running_loop().run_in_executor(
+                pool, generate_variants, source, [320], ["webp"]
+            )
+
+    (variant,) = asyncio.run(run())
+    assert (variant.width, variant.format) == (320, "webp")
+
+
+def test_upload_records_variants_after_response(client, auth_headers, tmp_path):
+    """Test that an uploaded image gains srcset-ready variants and a new ETag."""
+    storage = LocalStorage(root=tmp_path)
+    photo = io.BytesIO()
+    Image.new("RGB", (1000, 500), (10, 120, 10)).save(photo, "JPEG")
+    photo.seek(0)
+
+    with patch("app.main.get_storage", return_value=storage), \
+            patch("app.variants.get_storage", return_value=storage):
+        response = client.post(
+            "/upload", files={"file": ("garden.jpg", photo, "image/jpeg")}, headers=auth_headers
+        )
+        assert response.status_code == 200
+        created = response.json()
+        assert created["variants"] == []
+        assert run_jobs() == 1
+
+    item_response = client.get(f"/items/{created['id']}")
+    # Recording the variants bumped the post's revision
+    assert item_response.headers["etag"].endswith('.2"')
+    item = item_response.json()
+    widths = [(v["width"], v["format"]) for v in item["variants"]]
+    assert sorted(widths) == [(320, "jpeg"), (320, "webp"), (640, "jpeg"), (640, "webp")]
+    webp_urls = [v["url"] for v in item["variants"] if v["format"] == "webp"]
+    assert item["srcset"]["webp"] == f"{webp_urls[0]} 320w, {webp_urls[1]} 640w"
+    for variant in item["variants"]:
+        assert storage.resolve(variant["url"].rsplit("/", 1)[1]).exists()
+
+    feed = client.get("/items/").json()
+    assert next(p for p in feed["items"] if p["id"] == created["id"])["srcset"] == item["srcset"]
+
+
+def test_non_images_are_not_processed(client, auth_headers, tmp_path):
+    """Test that uploads that are not images skip the variant stage."""
+    storage = LocalStorage(root=tmp_path)
+    with patch("app.main.get_storage", return_value=storage), \
+            patch("app.variants.process_post_images") as process:
+        response = client.post(
+            "/upload", files={"file": ("notes.txt", io.BytesIO(b"hello"), "text/plain")}, headers=auth_headers
+        )
+
+    assert response.status_code == 200
+    process.assert_not_called()
+
+
+def test_duplicate_upload_shares_variants(client, auth_headers, tmp_path):
+    """Test that re-uploading an image copies the existing variants instead of regenerating them."""
+    storage = LocalStorage(root=tmp_path)
+    photo = io.BytesIO()
+    Image.new("RGB", (700, 350), (90, 10, 200)).save(photo, "JPEG")
+
+    with patch("app.main.get_storage", return_value=storage), \
+            patch("app.variants.get_storage", return_value=storage):
+        first = client.post(
+            "/upload", files={"file": ("a.jpg", io.BytesIO(photo.getvalue()), "image/jpeg")}, headers=auth_headers
+        ).json()
+        run_jobs()
+        with patch("app.variants.process_post_images") as process:
+            second = client.post(
+                "/upload", files={"file": ("b.jpg", io.BytesIO(photo.getvalue()), "image/jpeg")}, headers=auth_headers
+            ).json()
+            assert run_jobs() == 0
+
+    process.assert_not_called()
+    assert second["srcset"] == client.get(f"/items/{first['id']}").json()["srcset"]
+    assert second["srcset"]["webp"]
+
+
+def upload_photo(client, headers, name="photo.jpg"):
+    photo = io.BytesIO()
+    Image.new("RGB", (900, 450), (20, 60, 160)).save(photo, "JPEG")
+    photo.seek(0)
+    response = client.post("/upload", files={"file": (name, photo, "image/jpeg")}, headers=headers)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_variants_of_a_deleted_post_are_removed(client, auth_headers, tmp_path):
+    """Test that variants stored for a post deleted before they were recorded are cleaned up."""
+    storage = LocalStorage(root=tmp_path)
+    with patch("app.main.get_storage", return_value=storage), \
+            patch("app.variants.get_storage", return_value=storage), \
+            patch("app.blobs.get_storage", return_value=storage):
+        created = upload_photo(client, auth_headers)
+        assert client.delete(f"/items/{created['id']}", headers=auth_headers).status_code == 200
+        # Variant generation, the original's deletion, then the unrecorded variants' deletion
+        assert run_jobs() == 3
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_variants_stored_before_a_failure_are_removed(client, auth_headers, tmp_path):
+    """Test that a variant job failing part way queues removal of the files it already stored."""
+    storage = LocalStorage(root=tmp_path)
+    save_bytes = storage.save_bytes
+    saved = []
+
+    async def failing_save_bytes(data, file_name):
+        if len(saved) == 2:
+            raise RuntimeError("storage down")
+        stored = await save_bytes(data, file_name)
+        saved.append(stored.file_id)
+        return stored
+
+    with patch("app.main.get_storage", return_value=storage), \
+            patch("app.variants.get_storage", return_value=storage), \
+            patch("app.blobs.get_storage", return_value=storage), \
+            patch.object(storage, "save_bytes", failing_save_bytes):
+        created = upload_photo(client, auth_headers)
+        # The failed variant job (retried later) and the removal of its two files
+        assert run_jobs() == 2
+
+    assert len(saved) == 2
+    assert not any((tmp_path / file_id).exists() for file_id in saved)
+    assert client.get(f"/items/{created['id']}").json()["variants"] == []